@@ -1,16 +1,26 @@
 import os
-import json
+import re
+import atexit
+import threading
+from array import array
+from bisect import bisect_left
 from datetime import datetime, timedelta, timezone
 from collections import Counter
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 
+import jsonio  # orjson when available, stdlib json otherwise
+
 # ---------------- Paths ----------------
-BASE_DIR = os.path.join(os.path.dirname(__file__), "..")
+BASE_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
 DB_DIR = os.path.join(BASE_DIR, "db")
 os.makedirs(DB_DIR, exist_ok=True)
 
-ACTIVITY_FILE = os.path.join(DB_DIR, "activity_log.json")
+# Activity is binned by UTC day: activity_log.YYYY-MM-DD.jsonl (JSON Lines, one entry per line)
+ACTIVITY_FILE_RE = re.compile(r"^activity_log\.\d{4}-\d{2}-\d{2}\.jsonl$")
+DAY_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
+LEGACY_ACTIVITY_JSONL = os.path.join(DB_DIR, "activity_log.jsonl")  # single-file JSON Lines format
+LEGACY_ACTIVITY_FILE = os.path.join(DB_DIR, "activity_log.json")  # old single JSON array format
 ALERT_LOG_FILE = os.path.join(DB_DIR, "sent_alerts.json")  # track sent alerts (by app.py if needed)
 
 
@@ -38,97 +48,347 @@ def send_email_alert(to_email, subject, message):
 def record_activity(user, action, filename=None):
     if not user:
         return
+    now = datetime.now(timezone.utc).replace(microsecond=0)
     entry = {
         "user": user,
         "action": action,
         "file": filename,
-        "timestamp": datetime.now(timezone.utc).replace(microsecond=0, tzinfo=None).isoformat() + 'Z'
+        "timestamp": now.replace(tzinfo=None).isoformat() + 'Z',
+        # Pre-parsed copies of the timestamp so readers never re-parse the ISO string
+        "hour": now.hour,
+        "epoch": int(now.timestamp())
     }
-    data = []
-    if os.path.exists(ACTIVITY_FILE):
+    # Append-only: one line per event in today's bin, no read/rewrite of the existing log
+    jsonio.append_line(activity_file_for(now.date().isoformat()), entry)
+
+
+# ---------------- Read activity ----------------
+def activity_file_for(day):
+    """Path of the activity log bin for a UTC day given as "YYYY-MM-DD"."""
+    return os.path.join(DB_DIR, f"activity_log.{day}.jsonl")
+
+
+def activity_files(since=None):
+    """
+    Sorted list of existing daily activity log files.
+    If since (aware datetime) is given, only the bins from its UTC date to today are returned,
+    so a 24h query touches at most two files regardless of history size.
+    """
+    if since is not None:
+        day = since.astimezone(timezone.utc).date()
+        today = datetime.now(timezone.utc).date()
+        paths = []
+        while day <= today:
+            path = activity_file_for(day.isoformat())
+            if os.path.exists(path):
+                paths.append(path)
+            day += timedelta(days=1)
+        return paths
+    try:
+        names = os.listdir(DB_DIR)
+    except OSError:
+        return []
+    return [os.path.join(DB_DIR, name) for name in sorted(names) if ACTIVITY_FILE_RE.match(name)]
+
+
+def activity_version(since=None):
+    """Stat signature (path, mtime, size) of the bins since `since`; changes on every append."""
+    signature = []
+    for path in activity_files(since):
         try:
-            with open(ACTIVITY_FILE, "r", encoding="utf-8") as f:
-                data = json.load(f)
-        except Exception:
-            data = []
-    data.append(entry)
-    with open(ACTIVITY_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
-
-
-# ---------------- Sent-alert helpers ----------------
-def load_sent_alerts():
-    if os.path.exists(ALERT_LOG_FILE):
+            st = os.stat(path)
+        except OSError:
+            continue
+        signature.append((path, st.st_mtime_ns, st.st_size))
+    return tuple(signature)
+
+
+def _iter_jsonl(path):
+    with open(path, "rb") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield jsonio.loads(line)
+            except ValueError:
+                continue
+
+
+# Parsed bins: path -> {"mtime_ns", "size", "head", "entries", "epochs", "ordered", "by_user"}.
+# Bins are append-only, so a grown file only has its new tail parsed.
+# "epochs" is a typed column (unix seconds, -1 if unknown) parallel to "entries";
+# "ordered" stays True while the epochs are ascending, which lets readers bisect to a time window.
+# "by_user" maps user -> that user's entries (same dicts, file order), so per-user reads
+# touch only the user's own entries.
+# Cached lists only ever grow in place; one lock per bin serializes the stat, tail read and
+# append, so concurrent requests never parse (and append) the same tail twice.
+_LOG_CACHE = {}
+_LOG_LOCKS = {}
+_LOG_LOCKS_GUARD = threading.Lock()
+_HEAD_BYTES = 64
+_EMPTY_BIN = {"entries": [], "epochs": array("q"), "ordered": True, "by_user": {}}
+
+
+def _entry_epoch(entry):
+    """Unix time of an entry: the stored epoch, else its ISO timestamp read as UTC. -1 if unknown."""
+    epoch = entry.get("epoch")
+    if isinstance(epoch, int):
+        return epoch
+    ts = entry.get("timestamp")
+    if not isinstance(ts, str):
+        return -1
+    try:
+        dt = datetime.fromisoformat(ts.replace("Z", "+00:00"))
+    except ValueError:
+        return -1
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp())
+
+
+def _bin_lock(path):
+    with _LOG_LOCKS_GUARD:
+        lock = _LOG_LOCKS.get(path)
+        if lock is None:
+            lock = _LOG_LOCKS[path] = threading.Lock()
+        return lock
+
+
+def _load_bin(path):
+    """Return the cached record of one bin, re-reading only what changed since the last call."""
+    with _bin_lock(path):
+        return _refresh_bin(path)
+
+
+def _refresh_bin(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        _LOG_CACHE.pop(path, None)
+        return _EMPTY_BIN
+    cached = _LOG_CACHE.get(path)
+    if cached and cached["mtime_ns"] == st.st_mtime_ns and cached["size"] == st.st_size:
+        return cached
+
+    with open(path, "rb") as f:
+        head = f.read(_HEAD_BYTES)
+        if cached and st.st_size >= cached["size"] and head == cached["head"]:
+            # Same file, appended to: parse only the new lines
+            offset, entries, epochs, ordered = cached["size"], cached["entries"], cached["epochs"], cached["ordered"]
+            by_user = cached["by_user"]
+        else:
+            offset, entries, epochs, ordered = 0, [], array("q"), True
+            by_user = {}
+        f.seek(offset)
+        data = f.read()
+
+    # Leave a torn (still being written) last line for the next call
+    end = data.rfind(b"\n") + 1
+    for line in data[:end].splitlines():
+        if not line.strip():
+            continue
         try:
-            with open(ALERT_LOG_FILE, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except Exception:
-            return {}
-    return {}
+            entry = jsonio.loads(line)
+        except ValueError:
+            continue
+        epoch = _entry_epoch(entry)
+        if epochs and epoch < epochs[-1]:
+            ordered = False
+        entries.append(entry)
+        epochs.append(epoch)
+        by_user.setdefault(entry.get("user"), []).append(entry)
+    record = {
+        "mtime_ns": st.st_mtime_ns if end == len(data) else None,
+        "size": offset + end,
+        "head": head,
+        "entries": entries,
+        "epochs": epochs,
+        "ordered": ordered,
+        "by_user": by_user,
+    }
+    _LOG_CACHE[path] = record
+    return record
 
 
-def save_sent_alerts(data):
-    with open(ALERT_LOG_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
+def iter_activity(user=None, since=None):
+    """
+    Yield activity entries, oldest bin first. Blank or torn lines are skipped.
+    Parsed bins are cached (see _load_bin), so back-to-back calls on an unchanged log are cheap.
+    The yielded dicts are shared with the cache and must not be modified.
+
+    user (str, optional): only yield this user's entries.
+    since (datetime, optional): only read the daily bins that can hold entries after it.
+    """
+    for path in activity_files(since):
+        record = _load_bin(path)
+        # Iterate over a copy: the cached lists grow in place when another request reloads
+        if user is None:
+            yield from record["entries"][:]
+        else:
+            yield from record["by_user"].get(user, [])[:]
+
+
+def migrate_legacy_activity():
+    """
+    One-time split of the single-file activity logs (activity_log.jsonl, or the older
+    activity_log.json array) into daily bins. Run at startup (app.run_startup_migrations).
+    The legacy file is claimed by renaming it to *.bak before it is read, so if several
+    processes try at once only one migrates it; a missing file means already migrated.
+    """
+    if activity_files():
+        return
+    for legacy in (LEGACY_ACTIVITY_JSONL, LEGACY_ACTIVITY_FILE):
+        try:
+            os.replace(legacy, legacy + ".bak")
+            break
+        except FileNotFoundError:
+            continue
+    else:
+        return
+    claimed = legacy + ".bak"
+    if legacy == LEGACY_ACTIVITY_JSONL:
+        data = list(_iter_jsonl(claimed))
+    else:
+        data = jsonio.read_json(claimed)
+        if not isinstance(data, list):
+            os.replace(claimed, legacy)
+            print("⚠️ Could not read legacy activity log - skipping migration")
+            return
+
+    bins = {}
+    skipped = 0
+    for entry in data:
+        ts = entry.get("timestamp") if isinstance(entry, dict) else None
+        day = ts[:10] if isinstance(ts, str) else ""
+        if not DAY_RE.fullmatch(day):
+            skipped += 1
+            continue
+        bins.setdefault(day, []).append(jsonio.dumps(entry) + b"\n")
+    for day, lines in bins.items():
+        with open(activity_file_for(day), "ab") as f:
+            f.write(b"".join(lines))
+    print(f"🔄 Migrated {len(data) - skipped} activity entries into {len(bins)} daily log files"
+          + (f" ({skipped} without a timestamp skipped)" if skipped else ""))
+
+
+
+# ---------------- Sent-alert store ----------------
+# sent_alerts.json is read once, then served from memory. Changes are written back by a
+# debounced background flush (at most once per ALERT_FLUSH_DELAY seconds) and at exit.
+ALERT_FLUSH_DELAY = 5  # seconds
+_sent_alerts = None
+_sent_alerts_dirty = False
+_sent_alerts_lock = threading.Lock()
+_flush_timer = None
+
+
+def _alerts_locked():
+    global _sent_alerts
+    if _sent_alerts is None:
+        data = jsonio.read_json(ALERT_LOG_FILE, default={})
+        _sent_alerts = data if isinstance(data, dict) else {}
+    return _sent_alerts
+
+
+def get_sent_alert(key):
+    """Return the recorded value for a sent alert key, or None."""
+    with _sent_alerts_lock:
+        return _alerts_locked().get(key)
+
+
+def set_sent_alert(key, value):
+    """Record a sent alert. The file is only rewritten (by the debounced flush) if the value changed."""
+    global _sent_alerts_dirty, _flush_timer
+    with _sent_alerts_lock:
+        alerts = _alerts_locked()
+        if alerts.get(key) == value:
+            return
+        alerts[key] = value
+        _sent_alerts_dirty = True
+        if _flush_timer is None:
+            _flush_timer = threading.Timer(ALERT_FLUSH_DELAY, flush_sent_alerts)
+            _flush_timer.daemon = True
+            _flush_timer.start()
+
+
+def flush_sent_alerts():
+    """Write pending sent-alert changes to disk atomically."""
+    global _sent_alerts_dirty, _flush_timer
+    with _sent_alerts_lock:
+        if _flush_timer is not None:
+            _flush_timer.cancel()
+            _flush_timer = None
+        if not _sent_alerts_dirty:
+            return
+        jsonio.write_json_atomic(ALERT_LOG_FILE, _sent_alerts, indent=False)
+        _sent_alerts_dirty = False
+
+
+atexit.register(flush_sent_alerts)
+
+
+# ---------------- Action classification ----------------
+BULK_COUNT_RE = re.compile(r"^(\d+) files")
+
+
+def _one(entry):
+    return 1
+
+
+def _extract_count(entry):
+    """Number of files in a bulk entry ("5 files" -> 5), 1 if it cannot be read."""
+    filename = entry.get("file")
+    match = BULK_COUNT_RE.match(filename) if isinstance(filename, str) else None
+    return int(match.group(1)) if match else 1
+
+
+# action -> (action counted in stats, entry -> count). Unlisted actions count once as themselves.
+ACTION_MAP = {
+    "bulk_upload": ("upload", _extract_count),
+    "bulk_download": ("download", _extract_count),
+}
 
 
 # ---------------- Analyze logs (no emailing) ----------------
 def analyze_recent_logs(user_filter=None, hours=24, today_only=False):
     """
-    Analyze activity_log.json for a given user within the last N hours.
+    Analyze the activity log for a given user within the last N hours.
     Returns (stats, alert_message). If no alert, alert_message is "" (empty).
     """
     from datetime import datetime, timedelta
 
-    if not os.path.exists(ACTIVITY_FILE):
-        return {}, ""
-
-    try:
-        with open(ACTIVITY_FILE, "r", encoding="utf-8") as f:
-            logs = json.load(f)
-    except Exception:
-        logs = []
-
     now = datetime.now(timezone.utc)
     cutoff = now - timedelta(hours=hours)
 
-    stats = {}
+    cutoff_epoch = int(cutoff.timestamp())
+
+    counts = Counter()  # (user, action) -> count
     alert_message = ""
 
-    for entry in logs:
-        try:
-            ts = datetime.fromisoformat(entry.get("timestamp", ""))
-            # If timezone-naive (old format), assume UTC and make timezone-aware
-            if ts.tzinfo is None:
-                ts = ts.replace(tzinfo=timezone.utc)
-        except Exception:
-            continue
-        if ts < cutoff:
-            continue
-        user = entry.get("user")
-        if user_filter and user != user_filter:
-            continue
-        action = entry.get("action", "unknown")
-        
-        # Handle bulk operations: extract count from filename like "5 files"
-        count = 1  # Default count for single actions
-        if action in ["bulk_upload", "bulk_download"]:
-            filename = entry.get("file", "")
-            try:
-                # Extract number from "N files" format
-                if " files" in filename:
-                    count = int(filename.split()[0])
-            except (ValueError, IndexError):
-                count = 1
-            
-            # Map bulk actions to their individual equivalents for statistics
-            if action == "bulk_upload":
-                action = "upload"
-            elif action == "bulk_download":
-                action = "download"
-        
-        stats.setdefault(user, {})
-        stats[user][action] = stats[user].get(action, 0) + count
+    # Only the daily bins overlapping the window are read (and they are cached between calls)
+    for path in activity_files(since=cutoff):
+        record = _load_bin(path)
+        entries, epochs = record["entries"], record["epochs"]
+        if record["ordered"]:
+            # Entries are in time order: skip straight to the first one inside the window
+            window = range(bisect_left(epochs, cutoff_epoch), len(entries))
+        else:
+            window = [i for i in range(len(entries)) if epochs[i] >= cutoff_epoch]
+        for i in window:
+            entry = entries[i]
+            user = entry.get("user")
+            if user_filter and user != user_filter:
+                continue
+            action = entry.get("action", "unknown")
+            # One table lookup maps bulk actions to their single equivalent and count
+            action, counter = ACTION_MAP.get(action, (action, _one))
+            counts[(user, action)] += counter(entry)
+
+    # Pivot to the {user: {action: count}} shape expected by callers
+    stats = {}
+    for (user, action), count in counts.items():
+        stats.setdefault(user, {})[action] = count
 
     # Basic anomaly rules (only set alert_message when there's a real alert)
     user_stats = stats.get(user_filter, {}) if isinstance(stats, dict) else {}
@@ -155,33 +415,19 @@ def analyze_recent_logs(user_filter=None, hours=24, today_only=False):
 # ---------------- Detect anomalies for dashboard (no emailing) ----------------
 def detect_anomalies():
     """Return list of alert messages for the dashboard. Does not send emails."""
-    if not os.path.exists(ACTIVITY_FILE):
-        return []
+    logs = iter_activity()
 
-    try:
-        with open(ACTIVITY_FILE, "r", encoding="utf-8") as f:
-            logs = json.load(f)
-    except Exception:
-        logs = []
-
-    user_actions = {}
-    for entry in logs:
-        user = entry.get("user")
-        if not user:
-            continue
-        user_actions[user] = user_actions.get(user, 0) + 1
+    user_actions = Counter(user for user in (entry.get("user") for entry in logs) if user)
 
     alerts = []
-    sent_alerts = load_sent_alerts()
 
     for user, count in user_actions.items():
         if count > 10:
             alert_key = f"{user}_high_activity_dashboard"
-            if not sent_alerts.get(alert_key):
+            if not get_sent_alert(alert_key):
                 message = f"⚠️ High activity detected for {user} ({count} actions)"
                 alerts.append(message)
                 # do NOT call send_email_alert here — app.py will decide when to email
-                sent_alerts[alert_key] = True
+                set_sent_alert(alert_key, True)
 
-    save_sent_alerts(sent_alerts)
     return alerts
@@ -1,35 +1,107 @@
 
 # app.py (complete)
-from flask import Flask, request, jsonify, send_file, send_from_directory, after_this_request, render_template
-import os, json, datetime, random, uuid
+from flask import Flask, Response, request, jsonify, send_file, send_from_directory, after_this_request, render_template
+from flask.json.provider import DefaultJSONProvider
+import os, sys, io, re, gzip, mimetypes, datetime, secrets, zipfile, functools, threading, time, heapq
+import unicodedata
+from itertools import chain
+from urllib.parse import quote
+from collections import OrderedDict, Counter, defaultdict, deque
 import jwt  # pip install PyJWT
 from werkzeug.utils import secure_filename
 from dotenv import load_dotenv
-from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.security import generate_password_hash, check_password_hash, safe_join
 
 # ---------------- Config: load .env early ----------------
-BASE_DIR = os.path.dirname(__file__)
+# Absolute, normalized paths resolved once at import: no per-request path math, and they stay
+# valid whatever the working directory is
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 ENV_PATH = os.path.join(BASE_DIR, "..", ".env")
 load_dotenv(ENV_PATH)  # Ensure environment variables are loaded before importing storage
 
 SECRET = os.getenv("JWT_SECRET", "supersecretjwtkey")
 
-UPLOAD_FOLDER = os.path.join(BASE_DIR, "..", "local_store")
+UPLOAD_FOLDER = os.path.normpath(os.path.join(BASE_DIR, "..", "local_store"))
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
-SHARES_FILE = os.path.join(BASE_DIR, "..", "db", "shares.json")
+MAX_UPLOAD_TOTAL_SIZE = 200 * 1024 * 1024  # 200MB of files per upload request
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # read upload streams 1MB at a time
+
+# db/ paths resolved once at import; the directory is created here, not per request
+DB_DIR = os.path.normpath(os.path.join(BASE_DIR, "..", "db"))
+SHARES_FILE = os.path.join(DB_DIR, "shares.json")
+FOLDERS_FILE = os.path.join(DB_DIR, "folders.json")
+META_FILE = os.path.join(DB_DIR, "files.json")
+os.makedirs(DB_DIR, exist_ok=True)
 
 # ---------------- Now import storage and other modules that rely on .env ----------------
 from storage import (
-    init_keys, encrypt_file_and_store, decrypt_and_get_file, decrypt_and_get_file_by_stored_name,
-    record_access_log, load_users, save_users,
-    save_otp, verify_otp, load_metadata, save_metadata, delete_file,
-    send_email, send_email_with_attachment,
-    restore_file, permanently_delete_file, cleanup_old_trash
+    init_keys, encrypt_stream_and_store, encrypt_streams_and_store,
+    decrypt_and_get_file, decrypt_and_get_file_by_stored_name,
+    find_user_file, iter_decrypted_chunks, decrypted_size,
+    record_access_log, iter_access_log, access_log_key, load_users, save_users, get_user, save_user,
+    save_otp, verify_otp, delete_otp, load_metadata, save_metadata, delete_file,
+    queue_email, send_email_with_attachment,
+    stage_encrypted_upload, commit_staged_uploads, discard_staged_uploads,
+    restore_file, permanently_delete_file, cleanup_old_trash, remove_temp_output,
+    get_schema_version, set_schema_version, search_fields, search_metadata_mongo,
+    migrate_legacy_access_log
 )
 
 # AI module imports (we assume these functions exist in ai_module.py)
-from ai_module import analyze_recent_logs, record_activity, detect_anomalies
+from ai_module import (
+    analyze_recent_logs, record_activity, detect_anomalies, iter_activity, activity_version,
+    get_sent_alert, set_sent_alert, migrate_legacy_activity
+)
+
+import jsonio  # orjson when available, stdlib json otherwise
+import tasks  # background queues (temp file cleanup)
+
+try:
+    from ciso8601 import parse_datetime as _ciso8601_parse  # C ISO8601 parser, accepts a trailing "Z"
+except ImportError:
+    _ciso8601_parse = None
+
+try:
+    from argon2 import PasswordHasher  # pip install argon2-cffi
+    from argon2.exceptions import VerificationError, InvalidHashError
+    _argon2 = PasswordHasher(time_cost=2, memory_cost=65536, parallelism=2)
+except ImportError:
+    _argon2 = None
+
+try:
+    from flask_compress import Compress  # pip install flask-compress
+except ImportError:
+    Compress = None
+
+try:
+    import brotli  # installed with flask-compress; used to precompress the frontend
+except ImportError:
+    brotli = None
+from meta_cache import (  # read-only handlers; edits go through load_metadata()
+    get_metadata_cached, files_of_owner, files_in_folder, files_under_folder, folder_has_files,
+    find_by_owner_and_name, metadata_key, search_candidates
+)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """jsonify()/request.get_json() backed by orjson, with the same output as the default provider."""
+
+    def dumps(self, obj, **kwargs):
+        if jsonio.orjson is None:
+            return super().dumps(obj, **kwargs)
+        orjson = jsonio.orjson
+        # Dates go through the default provider's hook so they keep Flask's HTTP-date format
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if kwargs.get("sort_keys", self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get("indent"):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=kwargs.get("default", self.default), option=option).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        return jsonio.loads(s)
+
 
 # Create the Flask app (set template_folder so render_template finds monitor.html in frontend)
 app = Flask(
@@ -38,11 +110,38 @@ app = Flask(
     template_folder=os.path.join(BASE_DIR, "../frontend")
 )
 app.config["UPLOAD_FOLDER"] = UPLOAD_FOLDER
+# Werkzeug rejects larger request bodies before buffering them (1MB allowance for multipart framing)
+app.config["MAX_CONTENT_LENGTH"] = MAX_UPLOAD_TOTAL_SIZE + 1024 * 1024
+app.json = FastJSONProvider(app)
+
+# Compress JSON and page responses (brotli, falling back to gzip). Only text types are listed.
+app.config["COMPRESS_ALGORITHM"] = ["br", "gzip"]
+app.config["COMPRESS_MIMETYPES"] = [
+    "application/json", "text/html", "text/css", "text/javascript", "application/javascript"
+]
+app.config["COMPRESS_MIN_SIZE"] = 512
+app.config["COMPRESS_LEVEL"] = 5
+# User files keep the mimetype of their name (a stored .json is application/json), so file
+# download endpoints are skipped by endpoint: Flask-Compress reads the whole body into memory,
+# which would undo streamed/sendfile downloads, and it would also compress 206 responses whose
+# Content-Range counts uncompressed bytes.
+UNCOMPRESSED_ENDPOINTS = frozenset({"download", "download_multiple", "bulk_download", "access_shared_file"})
+
+if Compress is not None:
+    class _DownloadSafeCompress(Compress):
+        """Flask-Compress, except for the endpoints in UNCOMPRESSED_ENDPOINTS."""
+
+        def after_request(self, response):
+            if request.endpoint in UNCOMPRESSED_ENDPOINTS:
+                return response
+            return super().after_request(response)
+
+    _DownloadSafeCompress(app)
 
 # ---------------- Helper to send security alert by email ----------------
 def send_security_alert(user_email, message):
     """
-    Use existing send_email(recipient, subject, body) from storage module to notify users.
+    Queue the alert email via storage.queue_email so the request never waits on SMTP.
     """
     if not user_email or not message:
         return False
@@ -58,71 +157,220 @@ If this wasn't you, please change your password and contact support.
 
 — Intelligent Cloud File Sharing System
 """
-        send_email(user_email, subject, body)
-        print(f"✅ Sent security alert to {user_email}")
+        if not queue_email(user_email, subject, body):
+            return False
+        print(f"✅ Queued security alert for {user_email}")
         return True
     except Exception as e:
         print(f"❌ Failed to send security alert to {user_email}: {e}")
         return False
 
+@app.errorhandler(413)
+def request_too_large(e):
+    return jsonify({"error": f"request too large (max {MAX_UPLOAD_TOTAL_SIZE // (1024 * 1024)}MB)"}), 413
+
 # ---------------- Helpers ----------------
+MONITOR_CACHE_SECONDS = 30  # dashboard polling reuses results for this long
+SEARCH_CACHE_SECONDS = 300  # repeated searches (retries, paging back) reuse results; data changes bypass it
+
+def hash_password(pwd):
+    """Hash a password with argon2id (argon2-cffi), or werkzeug's default if it is not installed."""
+    if _argon2 is not None:
+        return _argon2.hash(pwd)
+    return generate_password_hash(pwd)
+
+def verify_password(stored_hash, pwd):
+    """
+    Check pwd against an argon2 or legacy werkzeug hash.
+    Returns (ok, new_hash); new_hash is set when the stored hash should be replaced
+    (legacy werkzeug hash, or argon2 parameters changed).
+    """
+    if not stored_hash:
+        return False, None
+    if stored_hash.startswith("$argon2"):
+        if _argon2 is None:
+            print("❌ argon2 password hash found but argon2-cffi is not installed")
+            return False, None
+        try:
+            _argon2.verify(stored_hash, pwd)
+        except (VerificationError, InvalidHashError):
+            return False, None
+        return True, (_argon2.hash(pwd) if _argon2.check_needs_rehash(stored_hash) else None)
+    if not check_password_hash(stored_hash, pwd):
+        return False, None
+    return True, (hash_password(pwd) if _argon2 is not None else None)
+
+def parse_iso_datetime(value):
+    """Parse an ISO8601 string (trailing "Z" allowed). Uses ciso8601 when installed. Raises ValueError."""
+    if _ciso8601_parse is not None:
+        return _ciso8601_parse(value)
+    return datetime.datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+def datetime_to_epoch(dt):
+    """Unix seconds of a datetime, naive values read as UTC."""
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=datetime.timezone.utc)
+    return int(dt.timestamp())
+
+def iso_to_epoch(value):
+    """Unix seconds of an ISO8601 string, naive values read as UTC. Returns -1 if it can't be parsed."""
+    try:
+        return datetime_to_epoch(parse_iso_datetime(value))
+    except (AttributeError, ValueError, TypeError):
+        return -1
+
+def memoize(timeout):
+    """
+    Cache a function's return value per argument tuple for `timeout` seconds (in-process).
+    Include a data version key (e.g. metadata_key()) in the arguments so changes bypass the cache.
+    Cached values are shared between requests and must not be modified.
+    """
+    def decorator(func):
+        cache = {}
+        lock = threading.Lock()
+
+        @functools.wraps(func)
+        def wrapper(*args):
+            now = time.monotonic()
+            with lock:
+                hit = cache.get(args)
+                if hit and hit[0] > now:
+                    return hit[1]
+            value = func(*args)
+            with lock:
+                # Superseded version keys never hit again; drop expired entries as we go
+                for key in [k for k, (expires, _) in cache.items() if expires <= now]:
+                    del cache[key]
+                cache[args] = (now + timeout, value)
+            return value
+        return wrapper
+    return decorator
+
+def download_etag(user_email, filename):
+    """
+    Strong ETag for a download, derived from the encrypted file (stored name, mtime, size)
+    rather than the per-request decrypted temp copy. None if the file is unknown.
+    """
+    stored_name, _ = find_by_owner_and_name(user_email, filename)
+    if stored_name is None:
+        # The frontend may send the stored name instead
+        details = get_metadata_cached().get(filename)
+        if not details or details.get("owner") != user_email:
+            return None
+        stored_name = filename
+    try:
+        st = os.stat(os.path.join(UPLOAD_FOLDER, os.path.basename(stored_name)))
+    except OSError:
+        return None
+    return f"{stored_name}-{st.st_mtime_ns:x}-{st.st_size:x}"
+
+def _unlink_all(paths):
+    removed = 0
+    for path in paths:
+        try:
+            if remove_temp_output(path):
+                removed += 1
+        except OSError as e:
+            print(f"❌ Temp file cleanup failed for {path}: {e}")
+    if removed:
+        print(f"🗑️ Deleted {removed} temp file(s)")
+
+def remove_temp_files(paths):
+    """
+    Delete decrypted temp files on the background "cleanup" queue, so responses don't wait
+    for one unlink per file. Files already opened for sending stay readable until closed.
+    """
+    paths = [p for p in paths if p]
+    if paths:
+        tasks.enqueue("cleanup", _unlink_all, paths)
+
+# Verified tokens: token -> (sub, exp, cached_until). Polling clients skip the HMAC check
+# for TOKEN_CACHE_TTL seconds; exp is still enforced on every hit.
+TOKEN_CACHE_TTL = 60
+TOKEN_CACHE_MAX = 4096
+_token_cache = OrderedDict()
+_token_cache_lock = threading.Lock()
+
+def decode_token_cached(token):
+    """Return the token's subject, verifying it with jwt.decode unless recently verified."""
+    now = time.time()
+    with _token_cache_lock:
+        hit = _token_cache.get(token)
+        if hit and hit[2] > now and (hit[1] is None or hit[1] > now):
+            _token_cache.move_to_end(token)
+            return hit[0]
+
+    payload = jwt.decode(token, SECRET, algorithms=["HS256"])
+    sub = payload["sub"]
+    with _token_cache_lock:
+        _token_cache[token] = (sub, payload.get("exp"), now + TOKEN_CACHE_TTL)
+        _token_cache.move_to_end(token)
+        while len(_token_cache) > TOKEN_CACHE_MAX:
+            _token_cache.popitem(last=False)
+    return sub
+
 def get_user_from_token():
     auth = request.headers.get("Authorization", "").replace("Bearer ", "")
     if not auth:
         return None, jsonify({"error": "missing token"}), 401
     try:
-        payload = jwt.decode(auth, SECRET, algorithms=["HS256"])
-        return payload["sub"], None, None
+        return decode_token_cached(auth), None, None
     except Exception as e:
         return None, jsonify({"error": "unauthenticated", "detail": str(e)}), 401
 
-def delete_otp(email):
-    otp_file = os.path.join(os.path.dirname(__file__), "..", "db", "otp.json")
-    if os.path.exists(otp_file):
-        with open(otp_file, "r", encoding="utf-8") as f:
-            try:
-                data = json.load(f)
-            except:
-                data = {}
-        if email in data:
-            data.pop(email)
-            with open(otp_file, "w", encoding="utf-8") as f:
-                json.dump(data, f, indent=2)
+METADATA_SCHEMA_VERSION = 5  # every entry has 'folder', 'original_name_lower', 'ext' and 'uploaded_at_epoch' fields,
+                             # and trashed entries 'deleted_at_epoch'
+FOLDERS_SCHEMA_VERSION = 2  # every value is a folder dict keyed "email:path" (no per-user lists)
+
+def run_startup_migrations():
+    """Run the one-time data migrations; called once per deployment start, not on import."""
+    migrate_legacy_access_log()
+    migrate_legacy_activity()
+    migrate_metadata_folders()
 
 def migrate_metadata_folders():
     """
-    Safe migration: ensures all metadata entries have 'folder' field.
+    Safe migration: ensures all metadata entries have 'folder' and search fields.
     
+    - Skipped without reading files.json once db/schema.json records it as migrated
     - Reads existing metadata from files.json
     - Creates backup before modification
     - Adds 'folder': '/' to entries missing the field
+    - Backfills 'original_name_lower' and 'ext' (see storage.search_fields)
+    - Backfills 'uploaded_at_epoch' from 'uploaded_at' (-1 if it can't be parsed)
+    - Backfills 'deleted_at_epoch' from 'deleted_at' for files in the trash
     - Preserves all existing data
     
     This is idempotent - safe to run multiple times.
     """
     try:
-        meta_file = os.path.join(BASE_DIR, "..", "db", "files.json")
-        
-        if not os.path.exists(meta_file):
+        if not os.path.exists(META_FILE):
             print("ℹ️ No metadata file found - skipping migration")
             return
         
+        if get_schema_version("files") >= METADATA_SCHEMA_VERSION:
+            print("✅ Metadata schema is up to date - no migration needed")
+            return
+        
         # Load existing metadata
         meta = load_metadata()
         
         if not meta:
             print("ℹ️ Metadata is empty - skipping migration")
+            set_schema_version("files", METADATA_SCHEMA_VERSION)
             return
         
         # Check if migration is needed
         needs_migration = False
         for stored_name, details in meta.items():
-            if "folder" not in details:
+            if ("folder" not in details or "ext" not in details or "uploaded_at_epoch" not in details
+                    or ("deleted_at" in details and "deleted_at_epoch" not in details)):
                 needs_migration = True
                 break
         
         if not needs_migration:
-            print("✅ Metadata already has folder fields - no migration needed")
+            print("✅ Metadata already has folder and search fields - no migration needed")
+            set_schema_version("files", METADATA_SCHEMA_VERSION)
             return
         
         # Create backup before migration
@@ -132,22 +380,31 @@ def migrate_metadata_folders():
         timestamp = datetime.datetime.now(datetime.UTC).strftime("%Y%m%d_%H%M%S")
         backup_file = os.path.join(backup_dir, f"files_backup_{timestamp}.json")
         
-        with open(backup_file, "w", encoding="utf-8") as f:
-            json.dump(meta, f, indent=2)
+        jsonio.write_json_atomic(backup_file, meta)
         
         print(f"📦 Created metadata backup: {backup_file}")
         
-        # Migrate: add 'folder' field to entries that don't have it
+        # Migrate: add 'folder' and search fields to entries that don't have them
         migrated_count = 0
         for stored_name, details in meta.items():
             if "folder" not in details:
                 details["folder"] = "/"
                 migrated_count += 1
+            if "ext" not in details:
+                details.update(search_fields(details.get("original_name") or ""))
+                migrated_count += 1
+            if "uploaded_at_epoch" not in details:
+                details["uploaded_at_epoch"] = iso_to_epoch(details.get("uploaded_at"))
+                migrated_count += 1
+            if "deleted_at" in details and "deleted_at_epoch" not in details:
+                details["deleted_at_epoch"] = iso_to_epoch(details["deleted_at"])
+                migrated_count += 1
         
         # Save updated metadata
         save_metadata(meta)
+        set_schema_version("files", METADATA_SCHEMA_VERSION)
         
-        print(f"✅ Metadata migration complete: {migrated_count} entries updated with default folder '/'")
+        print(f"✅ Metadata migration complete: {migrated_count} fields backfilled")
         print(f"   Backup saved to: {backup_file}")
         
     except Exception as e:
@@ -156,34 +413,65 @@ def migrate_metadata_folders():
 
 def load_shares():
     if not os.path.exists(SHARES_FILE):
-        os.makedirs(os.path.dirname(SHARES_FILE), exist_ok=True)
-        with open(SHARES_FILE, "w", encoding="utf-8") as f:
-            json.dump({}, f)
-    with open(SHARES_FILE, "r", encoding="utf-8") as f:
-        try:
-            return json.load(f)
-        except:
-            return {}
+        jsonio.write_json_atomic(SHARES_FILE, {}, indent=False)
+    return jsonio.read_json(SHARES_FILE, default={})
 
 def save_shares(data):
-    os.makedirs(os.path.dirname(SHARES_FILE), exist_ok=True)
-    with open(SHARES_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
+    jsonio.write_json_atomic(SHARES_FILE, data)
+    with _shares_cache_lock:
+        _shares_cache.update(key=None, data=None)
+
+# Parsed shares.json for share downloads, reloaded when the file changes on disk
+_shares_cache = {"key": None, "data": None}
+_shares_cache_lock = threading.Lock()
+
+def get_shares_cached():
+    """Return the shares dict, re-reading shares.json only if it changed. Do not modify it."""
+    try:
+        st = os.stat(SHARES_FILE)
+        key = (st.st_mtime_ns, st.st_size)
+    except OSError:
+        key = None
+    with _shares_cache_lock:
+        if key is None or _shares_cache["data"] is None or _shares_cache["key"] != key:
+            _shares_cache.update(key=key, data=load_shares())
+        return _shares_cache["data"]
 
 def find_meta_for_owner_and_name(owner, original_name):
-    meta = load_metadata()
-    for stored, details in meta.items():
-        if details.get("owner") == owner and details.get("original_name") == original_name:
-            return stored, details
-    return None, None
+    return find_by_owner_and_name(owner, original_name)
 
 # ---------------- Log Filtering Helper ----------------
+@functools.lru_cache(maxsize=65536)
+def _parse_log_time(ts_str):
+    """
+    Parse a log timestamp to a naive datetime (any offset is dropped, as before).
+    Returns None if it is not valid ISO8601. Cached: the same log lines are filtered on every query.
+    """
+    try:
+        return parse_iso_datetime(ts_str).replace(tzinfo=None)
+    except ValueError:
+        return None
+
+@functools.lru_cache(maxsize=65536)
+def _lower(s):
+    """Cached str.lower() for log fields (file names, emails) that repeat across entries and queries."""
+    return s.lower()
+
+def _receivers_lc(meta):
+    """Lowercased receiver emails of a share log entry, one per line."""
+    receivers = meta.get('receiver_emails') or ()
+    if isinstance(receivers, str):
+        return _lower(receivers)
+    return "\n".join(_lower(r) for r in receivers if isinstance(r, str))
+
+LOG_FILTER_PARAMS = ('type', 'start', 'end', 'file_type', 'file_name', 'receiver_email')
+
 def filter_logs(logs, params):
     """
     Filter log entries based on query parameters.
     
     Args:
-        logs: List of log dictionaries
+        logs: Iterable of log dictionaries (a generator is consumed once, never copied)
         params: Dict with keys: type, start, end, file_type, file_name, receiver_email
     
     Returns:
@@ -192,14 +480,36 @@ def filter_logs(logs, params):
     Raises:
         ValueError: If date formats are invalid
     """
-    from datetime import datetime
-    
-    filtered = logs[:]  # Start with copy of all logs
+    # Build the active predicates once, then make a single pass over the logs.
+    # Cheap string checks go first so all() short-circuits before the date parse.
+    preds = []
     
     # Filter by action type
     action_type = params.get('type', '').strip().lower()
     if action_type:
-        filtered = [l for l in filtered if l.get('action', '').lower() == action_type]
+        preds.append(lambda l: _lower(l.get('action') or '') == action_type)
+    
+    # Filter by file extension
+    file_type = params.get('file_type', '').strip().lower()
+    if file_type:
+        # Remove leading dot if present
+        if file_type.startswith('.'):
+            file_type = file_type[1:]
+        suffix = f'.{file_type}'
+        preds.append(lambda l: _lower(l.get('file') or '').endswith(suffix))
+    
+    # Filter by file name substring (case-insensitive)
+    file_name = params.get('file_name', '').strip().lower()
+    if file_name:
+        preds.append(lambda l: file_name in _lower(l.get('file') or ''))
+    
+    # Filter by receiver email (for share logs with meta.receiver_emails)
+    receiver_email = params.get('receiver_email', '').strip().lower()
+    if receiver_email:
+        def receiver_matches(l):
+            meta = l.get('meta')
+            return bool(meta) and isinstance(meta, dict) and receiver_email in _receivers_lc(meta)
+        preds.append(receiver_matches)
     
     # Filter by date range (inclusive)
     start_date = params.get('start', '').strip()
@@ -209,12 +519,13 @@ def filter_logs(logs, params):
         start_dt = None
         end_dt = None
         
+        # Bounds are normalized to naive datetimes once, not per log
         if start_date:
             # Support both YYYY-MM-DD and full ISO8601
             if 'T' not in start_date:
                 start_date += 'T00:00:00'
             try:
-                start_dt = datetime.fromisoformat(start_date.replace('Z', '+00:00'))
+                start_dt = parse_iso_datetime(start_date).replace(tzinfo=None)
             except Exception as e:
                 raise ValueError(f"Invalid start date format: {e}")
         
@@ -222,69 +533,66 @@ def filter_logs(logs, params):
             if 'T' not in end_date:
                 end_date += 'T23:59:59'
             try:
-                end_dt = datetime.fromisoformat(end_date.replace('Z', '+00:00'))
+                end_dt = parse_iso_datetime(end_date).replace(tzinfo=None)
             except Exception as e:
                 raise ValueError(f"Invalid end date format: {e}")
         
-        # Filter logs by timestamp
-        filtered_by_date = []
-        for log in filtered:
-            # Handle both 'timestamp' and 'time' fields
-            ts_str = log.get('timestamp') or log.get('time')
-            if not ts_str:
-                continue  # Skip logs without timestamp
-            
-            try:
-                log_dt = datetime.fromisoformat(ts_str.replace('Z', '+00:00'))
-                # Normalize to naive datetime for comparison
-                if log_dt.tzinfo is not None:
-                    log_dt = log_dt.replace(tzinfo=None)
-                
-                # Apply range filters
-                if start_dt and start_dt.replace(tzinfo=None) > log_dt:
-                    continue
-                if end_dt and end_dt.replace(tzinfo=None) < log_dt:
-                    continue
-                
-                filtered_by_date.append(log)
-            except Exception:
-                # Skip logs with invalid timestamp format
-                continue
-        
-        filtered = filtered_by_date
-    
-    # Filter by file extension
-    file_type = params.get('file_type', '').strip().lower()
-    if file_type:
-        # Remove leading dot if present
-        if file_type.startswith('.'):
-            file_type = file_type[1:]
-        filtered = [
-            l for l in filtered 
-            if l.get('file') and l.get('file', '').lower().endswith(f'.{file_type}')
-        ]
-    
-    # Filter by file name substring (case-insensitive)
-    file_name = params.get('file_name', '').strip().lower()
-    if file_name:
-        filtered = [
-            l for l in filtered 
-            if l.get('file') and file_name in l.get('file', '').lower()
-        ]
-    
-    # Filter by receiver email (for share logs with meta.receiver_emails)
-    receiver_email = params.get('receiver_email', '').strip().lower()
-    if receiver_email:
-        filtered = [
-            l for l in filtered
-            if (l.get('meta') and 
-                isinstance(l.get('meta'), dict) and
-                receiver_email in str(l.get('meta', {}).get('receiver_emails', [])).lower())
-        ]
-    
-    return filtered
+        def in_range(l):
+            # Handle both 'timestamp' and 'time' fields; logs without a valid timestamp are skipped
+            ts_str = l.get('timestamp') or l.get('time')
+            log_dt = _parse_log_time(ts_str) if isinstance(ts_str, str) else None
+            if log_dt is None:
+                return False
+            if start_dt and start_dt > log_dt:
+                return False
+            if end_dt and end_dt < log_dt:
+                return False
+            return True
+        preds.append(in_range)
+    
+    if not preds:
+        return list(logs)
+    return [l for l in logs if all(p(l) for p in preds)]
+
+def _iter_user_logs(user_email):
+    """
+    Yield one user's activity and access log entries (activity first), without building
+    a combined list. A log that fails to load is reported and skipped.
+    """
+    sources = (
+        ("activity log", lambda: iter_activity(user=user_email)),
+        ("access log", lambda: iter_access_log(user=user_email)),
+    )
+    for name, source in sources:
+        try:
+            yield from source()
+        except Exception as e:
+            print(f"⚠️ Failed to load {name}: {e}")
 
 # ---------------- Monitor data route (returns analysis JSON & emails alert if present) ----------------
+@memoize(MONITOR_CACHE_SECONDS)
+def _compute_monitor(user_email, meta_key, activity_key):
+    """
+    Last-24h stats, alert message and file count for one user.
+    meta_key / activity_key are only part of the cache key.
+    """
+    # call analyzer for last 24 hours
+    stats, alert_message = analyze_recent_logs(
+        user_filter=user_email,
+        hours=24,
+        today_only=False
+    )
+
+    # Flatten stats for frontend
+    user_stats = stats.get(user_email, {}) if isinstance(stats, dict) else {}
+    flat_stats = {}
+    if isinstance(user_stats, dict):
+        flat_stats = {k: int(v) for k, v in user_stats.items() if isinstance(v, (int, float))}
+
+    # Get user's file count
+    total_files = len(files_of_owner(user_email))
+    return flat_stats, alert_message, total_files
+
 @app.route('/api/monitor-data')
 def monitor_data():
     """Return last-24h activity stats for the logged-in user and email new alerts once."""
@@ -295,13 +603,12 @@ def monitor_data():
     print(f"\n[MONITOR] Request from: {user_email}")
     
     try:
-        # call analyzer for last 24 hours
-        stats, alert_message = analyze_recent_logs(
-            user_filter=user_email,
-            hours=24,
-            today_only=False
+        # Cached per user until the metadata or the last 24h of activity changes (or 30s pass)
+        since = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(hours=24)
+        flat_stats, alert_message, total_files = _compute_monitor(
+            user_email, metadata_key(), activity_version(since)
         )
-        print(f"[MONITOR] Stats returned: {stats}")
+        print(f"[MONITOR] Stats returned: {flat_stats}")
         print(f"[MONITOR] Alert message: '{alert_message}'")
     except Exception as e:
         print(f"[ERROR] analyze_recent_logs failed: {e}")
@@ -309,23 +616,8 @@ def monitor_data():
         traceback.print_exc()
         return jsonify({"stats": {}, "alert": "analysis error"}), 200
 
-    # Flatten stats for frontend
-    user_stats = stats.get(user_email, {}) if isinstance(stats, dict) else {}
-    flat_stats = {}
-    if isinstance(user_stats, dict):
-        flat_stats = {k: int(v) for k, v in user_stats.items() if isinstance(v, (int, float))}
-
-    # Keep track of already-sent alerts so they aren’t resent
-    sent_alerts_file = os.path.join(BASE_DIR, "..", "db", "sent_alerts.json")
-    sent_alerts = {}
-    if os.path.exists(sent_alerts_file):
-        try:
-            with open(sent_alerts_file, "r", encoding="utf-8") as f:
-                sent_alerts = json.load(f)
-        except:
-            sent_alerts = {}
-
-    last_sent = sent_alerts.get(user_email)
+    # Keep track of already-sent alerts so they aren’t resent (in-memory store, see ai_module)
+    last_sent = get_sent_alert(user_email)
 
     # ONLY send real alerts (alert_message must be non-empty string returned by ai_module)
     if alert_message:
@@ -335,9 +627,7 @@ def monitor_data():
             print(f"📧 Sending new alert to {user_email} (last sent: {last_sent})")
             try:
                 send_security_alert(user_email, alert_message)
-                sent_alerts[user_email] = alert_message
-                with open(sent_alerts_file, "w", encoding="utf-8") as f:
-                    json.dump(sent_alerts, f, indent=2)
+                set_sent_alert(user_email, alert_message)
                 print(f"✅ Alert email sent and logged for {user_email}")
             except Exception as e:
                 print(f"❌ send_security_alert failed: {e}")
@@ -346,10 +636,6 @@ def monitor_data():
     else:
         print(f"✅ No alerts for {user_email}")
 
-    # Get user's file count
-    meta = load_metadata()
-    total_files = sum(1 for d in meta.values() if d.get("owner") == user_email)
-
     # Build anomalies list if there are alerts
     anomalies_list = []
     if alert_message:
@@ -377,7 +663,7 @@ def monitor_data():
 # ---------------- User Management ----------------
 @app.route("/api/register", methods=["POST"])
 def register():
-    data = request.json
+    data = request.get_json(silent=True) or {}
     email = (data.get("email") or "").strip().lower()
     pwd = data.get("password")
     username = data.get("username", "").strip()
@@ -392,7 +678,7 @@ def register():
     if email in users:
         return jsonify({"error": "user already exists"}), 400
 
-    pwd_hash = generate_password_hash(pwd)
+    pwd_hash = hash_password(pwd)
     users[email] = {
         "password_hash": pwd_hash,
         "username": username,
@@ -408,19 +694,18 @@ def register():
 # ---------------- Login + OTP ----------------
 @app.route("/api/login", methods=["POST"])
 def login():
-    data = request.json
+    data = request.get_json(silent=True) or {}
     email = (data.get("email") or "").strip().lower()
     pwd = data.get("password")
 
     if not email or not pwd:
         return jsonify({"error": "email & password required"}), 400
 
-    users = load_users()
-    user = users.get(email)
+    user = get_user(email)
 
     # Check if account is locked
     if user and user.get("locked_until"):
-        locked_until = datetime.datetime.fromisoformat(user["locked_until"])
+        locked_until = parse_iso_datetime(user["locked_until"])
         now = datetime.datetime.utcnow()
         if now < locked_until:
             minutes_left = int((locked_until - now).total_seconds() / 60)
@@ -432,11 +717,12 @@ def login():
             # Lock expired, clear it
             user["locked_until"] = None
             user["failed_attempts"] = 0
-            save_users(users)
+            save_user(email, user)
 
     # Track failed login attempts and successes
     try:
-        if not user or not check_password_hash(user.get("password_hash", ""), pwd):
+        password_ok, upgraded_hash = verify_password(user.get("password_hash", ""), pwd) if user else (False, None)
+        if not password_ok:
             # record failed login for monitoring
             try:
                 record_activity(email, "failed_login")
@@ -451,7 +737,7 @@ def login():
                 if user["failed_attempts"] >= 5:
                     lockout_time = datetime.datetime.utcnow() + datetime.timedelta(minutes=15)
                     user["locked_until"] = lockout_time.isoformat()
-                    save_users(users)
+                    save_user(email, user)
                     
                     # Send security alert
                     send_security_alert(
@@ -464,16 +750,19 @@ def login():
                         "message": "Account locked for 15 minutes due to multiple failed attempts. Check your email."
                     }), 403
                 
-                save_users(users)
+                save_user(email, user)
             
             return jsonify({"error": "invalid credentials"}), 401
         else:
             # successful password check (OTP still required)
-            # Reset failed attempts on successful login
-            if user:
+            # Reset failed attempts on successful login (and upgrade a legacy password hash);
+            # users.json is only rewritten when one of those changed
+            if user and (user.get("failed_attempts") or user.get("locked_until") or upgraded_hash):
                 user["failed_attempts"] = 0
                 user["locked_until"] = None
-                save_users(users)
+                if upgraded_hash:
+                    user["password_hash"] = upgraded_hash
+                save_user(email, user)
             
             try:
                 record_activity(email, "login_success")
@@ -482,16 +771,16 @@ def login():
     except Exception as e:
         print("❌ login monitoring error:", e)
 
-    otp_code = str(random.randint(100000, 999999))
+    otp_code = str(100000 + secrets.randbelow(900000))
     save_otp(email, otp_code)
     
-    send_email(email, "Your OTP Code", f"Your OTP code is: {otp_code}\n\nValid for 3 minutes.")
+    queue_email(email, "Your OTP Code", f"Your OTP code is: {otp_code}\n\nValid for 3 minutes.")
     return jsonify({"message": "OTP sent to email"}), 200
 
 # ---------------- Verify OTP ----------------
 @app.route("/api/verify-otp", methods=["POST"])
 def verify_otp_endpoint():
-    data = request.get_json()
+    data = request.get_json(silent=True) or {}
     email = (data.get("email") or "").strip().lower()
     otp_code = str(data.get("otp") or "").strip()
 
@@ -540,10 +829,10 @@ def upload():
     f = request.files["file"]
     folder = request.form.get("folder", "/").strip() or "/"
     filename = secure_filename(f.filename)
-    filepath = os.path.join(app.config["UPLOAD_FOLDER"], filename)
-    f.save(filepath)
 
-    stored = encrypt_file_and_store(filepath, filename, user_email, folder=folder)
+    # Encrypted straight from the request stream, the plaintext never lands on disk
+    stored, _ = encrypt_stream_and_store(f.stream, filename, user_email, folder=folder,
+                                         chunk_size=UPLOAD_CHUNK_SIZE)
     try:
         record_activity(user_email, "upload", filename)
     except Exception:
@@ -562,7 +851,8 @@ def upload_multiple():
     
     Validates:
         - Max 20 files per request
-        - Total size limit: 200MB
+        - Total size limit: 200MB (Content-Length gate, then counted while reading;
+          over the limit nothing is stored and 413 is returned)
         - Authentication required
     
     Returns:
@@ -580,7 +870,10 @@ def upload_multiple():
 
     # Configuration limits
     MAX_FILES = 20
-    MAX_TOTAL_SIZE = 200 * 1024 * 1024  # 200MB in bytes
+
+    # Quick size gate from the Content-Length header, before touching the uploaded files
+    if request.content_length and request.content_length > app.config["MAX_CONTENT_LENGTH"]:
+        return jsonify({"error": "total size exceeds limit (max 200MB)"}), 413
 
     # Get files from request
     files = request.files.getlist("files[]")
@@ -594,23 +887,11 @@ def upload_multiple():
     # Get folder parameter
     folder = request.form.get("folder", "/").strip() or "/"
 
-    # Calculate total size and validate
-    total_size = 0
-    for file in files:
-        # Seek to end to get size, then reset to beginning
-        file.seek(0, 2)  # Seek to end
-        file_size = file.tell()
-        file.seek(0)  # Reset to beginning
-        total_size += file_size
-
-    if total_size > MAX_TOTAL_SIZE:
-        return jsonify({
-            "error": f"total size exceeds limit (max 200MB, got {total_size / 1024 / 1024:.2f}MB)"
-        }), 400
-
-    # Process each file
-    stored_files = []
+    # Encrypt each file into a staged temp file (the total size is counted while reading, no
+    # separate pass over the files); nothing is stored until the whole request fits the limit
+    staged = []
     errors = []
+    total_size = 0
 
     for file in files:
         try:
@@ -625,28 +906,14 @@ def upload_multiple():
                 errors.append({"filename": file.filename, "error": "invalid filename"})
                 continue
 
-            # Save to upload folder
-            filepath = os.path.join(app.config["UPLOAD_FOLDER"], filename)
-            file.save(filepath)
-
-            # Encrypt and store
-            stored = encrypt_file_and_store(filepath, filename, user_email, folder=folder)
-            
-            # Log the upload
-            record_access_log(filename, "upload", user_email)
-            
-            # Record activity for monitoring
-            try:
-                record_activity(user_email, "upload", filename)
-            except Exception as e:
-                print(f"⚠️ Failed to record activity for {filename}: {e}")
-
-            # Add to successful uploads
-            stored_files.append({
-                "original_name": filename,
-                "stored_name": stored.get("stored_as"),
-                "folder": folder
-            })
+            # Stop as soon as the request total goes over the limit
+            tmp_path, written = stage_encrypted_upload(file.stream, limit=MAX_UPLOAD_TOTAL_SIZE - total_size,
+                                                       chunk_size=UPLOAD_CHUNK_SIZE)
+            if tmp_path is None:
+                discard_staged_uploads([path for path, _, _ in staged])
+                return jsonify({"error": "total size exceeds limit (max 200MB)"}), 413
+            total_size += written
+            staged.append((tmp_path, filename, written))
 
         except Exception as e:
             errors.append({
@@ -655,6 +922,32 @@ def upload_multiple():
             })
             print(f"❌ Failed to upload {file.filename}: {e}")
 
+    try:
+        stored = commit_staged_uploads(staged, user_email, folder=folder)
+    except Exception:
+        discard_staged_uploads([path for path, _, _ in staged])
+        raise
+
+    stored_files = []
+    for info in stored:
+        filename = info["original"]
+
+        # Log the upload
+        record_access_log(filename, "upload", user_email)
+
+        # Record activity for monitoring
+        try:
+            record_activity(user_email, "upload", filename)
+        except Exception as e:
+            print(f"⚠️ Failed to record activity for {filename}: {e}")
+
+        # Add to successful uploads
+        stored_files.append({
+            "original_name": filename,
+            "stored_name": info["stored_as"],
+            "folder": folder
+        })
+
     # Record bulk upload summary activity
     if len(stored_files) > 0:
         try:
@@ -678,8 +971,13 @@ def list_files():
         return err_resp, code
 
     folder_path = request.args.get("folder", "/").strip() or "/"
-    meta = load_metadata()
-    user_files = [
+    return jsonify(_list_folder_files(user_email, folder_path, metadata_key())), 200
+
+@memoize(MONITOR_CACHE_SECONDS)
+def _list_folder_files(user_email, folder_path, meta_key):
+    """File list for one user's folder; meta_key is only part of the cache key."""
+    # Indexed by owner and folder, soft-deleted files are already excluded
+    return [
         {
             "filename": k,
             "original_name": d["original_name"], 
@@ -687,12 +985,8 @@ def list_files():
             "folder": d.get("folder", "/"),
             "size": d.get("size", 0)
         }
-        for k, d in meta.items() 
-        if d["owner"] == user_email 
-        and d.get("folder", "/") == folder_path
-        and "deleted_at" not in d  # Filter out soft-deleted files
+        for k, d in files_in_folder(user_email, folder_path)
     ]
-    return jsonify(user_files), 200
 
 # ---------------- File Download ----------------
 @app.route("/api/download/<filename>", methods=["GET"])
@@ -701,6 +995,16 @@ def download(filename):
     if err_resp:
         return err_resp, code
 
+    # Revalidation of an unchanged file is answered without decrypting it
+    etag = download_etag(user_email, filename)
+    if etag and etag in request.if_none_match:
+        return "", 304, {"ETag": f'"{etag}"', "Cache-Control": "private, max-age=0"}
+
+    # Plain downloads are decrypted straight into the response. Range requests need a
+    # seekable copy, so they go through a decrypted temp file below.
+    if request.range is None:
+        return stream_download(filename, user_email, etag)
+
     # Try to find file by original name first, then by stored name
     outpath = decrypt_and_get_file(filename, user_email)
     
@@ -718,17 +1022,123 @@ def download(filename):
 
     @after_this_request
     def cleanup(response):
-        try:
-            if os.path.exists(outpath):
-                os.remove(outpath)
-                print(f"🗑️ Deleted temp file: {outpath}")
-        except Exception as e:
-            print("❌ Temp file cleanup failed:", str(e))
+        remove_temp_files([outpath])
         return response
 
-    return send_file(outpath, as_attachment=True)
+    # conditional=True: Range / If-Range support, and the WSGI file wrapper (sendfile) when the server has one
+    response = send_from_directory(
+        os.path.dirname(outpath), os.path.basename(outpath),
+        as_attachment=True, conditional=True, etag=etag or True, max_age=0
+    )
+    response.cache_control.private = True
+    return response
+
+def attachment_disposition(name):
+    """Content-Disposition options for an attachment, with an RFC 5987 name for non-ASCII."""
+    try:
+        name.encode("ascii")
+    except UnicodeEncodeError:
+        simple = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii")
+        return {"filename": simple, "filename*": f"UTF-8''{quote(name, safe='!#$&+-.^_`|~')}"}
+    return {"filename": name}
+
+def stream_download(filename, user_email, etag):
+    """Send a user's file decrypted chunk by chunk, without a plaintext copy on disk."""
+    stored_name, record = find_user_file(filename, user_email)
+    if record is None:
+        return jsonify({"error": "not found"}), 404
+
+    # The first chunk is decrypted before answering, so a missing file or wrong key
+    # still gets an error status instead of a broken 200
+    chunks = iter_decrypted_chunks(stored_name)
+    try:
+        first = next(chunks, b"")
+    except FileNotFoundError:
+        return jsonify({"error": "not found"}), 404
+    except Exception as e:
+        print(f"❌ Decryption failed for {stored_name}: {e!r}")
+        return jsonify({"error": "not found"}), 404
+
+    try:
+        record_activity(user_email, "download", filename)
+    except Exception:
+        pass
+
+    name = record["original_name"]
+    response = Response(chain((first,), chunks),
+                        mimetype=mimetypes.guess_type(name)[0] or "application/octet-stream")
+    response.headers.set("Content-Disposition", "attachment", **attachment_disposition(name))
+    size = decrypted_size(stored_name)
+    if size is not None:
+        response.content_length = size
+    if etag:
+        response.set_etag(etag)
+    response.headers["Accept-Ranges"] = "bytes"
+    response.cache_control.private = True
+    response.cache_control.max_age = 0
+    return response
 
 # ---------------- Multiple File Download (ZIP) ----------------
+# Formats that are already compressed: deflate can't shrink them and only burns CPU
+ZIP_STORED_EXTENSIONS = frozenset({
+    "jpg", "jpeg", "png", "gif", "webp", "heic", "mp3", "mp4", "m4a", "mov", "avi", "mkv", "webm",
+    "zip", "gz", "tgz", "bz2", "xz", "7z", "rar", "zst", "docx", "xlsx", "pptx", "odt", "epub", "pdf"
+})
+
+def zip_compression_for(arcname):
+    """ZIP_STORED for already-compressed formats (by extension), ZIP_DEFLATED otherwise."""
+    ext = arcname.rsplit(".", 1)[-1].lower() if "." in arcname else ""
+    return zipfile.ZIP_STORED if ext in ZIP_STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+
+
+class _ZipStreamSink(io.RawIOBase):
+    """Unseekable write target for zipfile; collects output until the generator drains it."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._chunks.append(bytes(b))
+        return len(b)
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_zip(entries, compression=None):
+    """
+    Yield a ZIP archive of stored files, given as (stored_name, arcname) entries, chunk by chunk.
+    Each file is decrypted straight into its entry (iter_decrypted_chunks), so no plaintext copy
+    is written to disk, and zipfile writes data descriptors when its target is not seekable,
+    so no temp archive is needed either.
+    compression applies to every entry; by default it is picked per entry (zip_compression_for).
+    """
+    sink = _ZipStreamSink()
+    with zipfile.ZipFile(sink, "w", zipfile.ZIP_DEFLATED) as zipf:
+        for stored_name, arcname in entries:
+            info = zipfile.ZipInfo(arcname, date_time=time.localtime()[:6])
+            info.external_attr = 0o644 << 16
+            info.compress_type = compression if compression is not None else zip_compression_for(arcname)
+            # Fernet files have no size header: allow ZIP64 sizes since it is only known at the end
+            size = decrypted_size(stored_name)
+            if size is not None:
+                info.file_size = size
+            with zipf.open(info, "w", force_zip64=size is None) as dst:
+                for chunk in iter_decrypted_chunks(stored_name):
+                    dst.write(chunk)
+                    data = sink.drain()
+                    if data:
+                        yield data
+            yield sink.drain()
+    # Central directory
+    yield sink.drain()
+
+
 @app.route("/api/download-multiple", methods=["POST"])
 def download_multiple():
     """
@@ -739,8 +1149,8 @@ def download_multiple():
     
     Features:
         - Validates ownership and existence for each file
-        - Creates streaming ZIP archive to avoid memory issues
-        - Automatic cleanup of temporary decrypted files
+        - Streams the ZIP archive to the client as it is built, decrypting each file
+          into it (nothing staged on disk)
         - Logs access for each file downloaded
     
     Returns:
@@ -751,14 +1161,13 @@ def download_multiple():
         - Ownership validation
         - Non-existent file handling
         - Streaming ZIP creation
-        - Temp file cleanup verification
     """
     user_email, err_resp, code = get_user_from_token()
     if err_resp:
         return err_resp, code
 
     # Parse request body
-    data = request.json or {}
+    data = request.get_json(silent=True) or {}
     filenames = data.get("filenames", [])
 
     if not filenames or not isinstance(filenames, list):
@@ -772,24 +1181,20 @@ def download_multiple():
     if len(filenames) > MAX_FILES:
         return jsonify({"error": f"too many files (max {MAX_FILES})"}), 400
 
-    # Track decrypted files for cleanup
-    temp_files = []
+    # (stored name, archive name) of the files to put in the archive
+    entries = []
     invalid_files = []
     
     try:
-        # Decrypt all files first and validate ownership
+        # Validate ownership and existence of every file before streaming
         for filename in filenames:
-            # Decrypt and get file (validates ownership automatically)
-            outpath = decrypt_and_get_file(filename, user_email)
-            
-            if not outpath or not os.path.exists(outpath):
+            stored_name, _ = find_by_owner_and_name(user_email, filename)
+            # None if missing or not owned by the user
+            if not stored_name or not os.path.exists(os.path.join(UPLOAD_FOLDER, stored_name)):
                 invalid_files.append(filename)
                 continue
             
-            temp_files.append({
-                "path": outpath,
-                "name": filename
-            })
+            entries.append((stored_name, filename))
             
             # Log access for each file
             record_access_log(filename, "download", user_email)
@@ -800,104 +1205,68 @@ def download_multiple():
 
         # Check if any files were invalid
         if invalid_files:
-            # Cleanup any successfully decrypted files
-            for temp_file in temp_files:
-                try:
-                    if os.path.exists(temp_file["path"]):
-                        os.remove(temp_file["path"])
-                except Exception:
-                    pass
-            
             return jsonify({
                 "error": "some files not found or access denied",
                 "invalid_files": invalid_files
             }), 404
 
-        if not temp_files:
+        if not entries:
             return jsonify({"error": "no valid files to download"}), 404
 
-        # Create streaming ZIP archive
-        import zipfile
-        import tempfile
-        from io import BytesIO
-
-        # Use temporary file for ZIP to support streaming
-        temp_zip_fd, temp_zip_path = tempfile.mkstemp(suffix='.zip')
-        os.close(temp_zip_fd)  # Close the file descriptor, we'll open it with zipfile
-
+        # Record bulk download summary activity
         try:
-            # Create ZIP archive
-            with zipfile.ZipFile(temp_zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                for temp_file in temp_files:
-                    # Add file to ZIP with original filename
-                    zipf.write(temp_file["path"], arcname=temp_file["name"])
-            
-            # Record bulk download summary activity
+            record_activity(user_email, "bulk_download", f"{len(entries)} files")
+            print(f"📊 Recorded bulk download activity: {len(entries)} files")
+        except Exception as e:
+            print(f"⚠️ Failed to record bulk download activity: {e}")
+
+        def generate():
+            # The archive is built and each file decrypted while it is sent
             try:
-                record_activity(user_email, "bulk_download", f"{len(temp_files)} files")
-                print(f"📊 Recorded bulk download activity: {len(temp_files)} files")
+                yield from stream_zip(entries)
             except Exception as e:
-                print(f"⚠️ Failed to record bulk download activity: {e}")
-            
-            # Cleanup handler for both temp decrypted files and zip file
-            @after_this_request
-            def cleanup(response):
-                try:
-                    # Remove decrypted temp files
-                    for temp_file in temp_files:
-                        if os.path.exists(temp_file["path"]):
-                            os.remove(temp_file["path"])
-                            print(f"🗑️ Cleaned up temp file: {temp_file['name']}")
-                    
-                    # Remove ZIP file
-                    if os.path.exists(temp_zip_path):
-                        os.remove(temp_zip_path)
-                        print(f"🗑️ Cleaned up temp ZIP: {temp_zip_path}")
-                        
-                except Exception as e:
-                    print(f"❌ Cleanup failed: {e}")
-                
-                return response
-
-            # Send ZIP file
-            return send_file(
-                temp_zip_path,
-                as_attachment=True,
-                download_name=f"files_{datetime.datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.zip",
-                mimetype='application/zip'
-            )
-
-        except Exception as e:
-            # Emergency cleanup if ZIP creation fails
-            for temp_file in temp_files:
-                try:
-                    if os.path.exists(temp_file["path"]):
-                        os.remove(temp_file["path"])
-                except Exception:
-                    pass
-            
-            if os.path.exists(temp_zip_path):
-                try:
-                    os.remove(temp_zip_path)
-                except Exception:
-                    pass
-            
-            print(f"❌ ZIP creation failed: {e}")
-            return jsonify({"error": f"failed to create archive: {str(e)}"}), 500
+                print(f"❌ ZIP streaming failed: {e!r}")
+                raise
+
+        download_name = f"files_{datetime.datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.zip"
+        return Response(
+            generate(),
+            mimetype="application/zip",
+            headers={"Content-Disposition": f'attachment; filename="{download_name}"'}
+        )
 
     except Exception as e:
-        # Emergency cleanup on any error
-        for temp_file in temp_files:
-            try:
-                if os.path.exists(temp_file["path"]):
-                    os.remove(temp_file["path"])
-            except Exception:
-                pass
-        
         print(f"❌ Download multiple failed: {e}")
         return jsonify({"error": str(e)}), 500
 
 # ---------------- File Delete ----------------
+def check_unusual_deletion(user_email):
+    """
+    Scan the user's last 24h of activity and email an unusual-deletion alert once per day.
+    Runs on the "anomaly" task queue; tasks.py logs any exception.
+    """
+    stats, alert_msg = analyze_recent_logs(user_filter=user_email, hours=24)
+    
+    print(f"📊 User stats after delete: {stats.get(user_email, {})}")
+    print(f"🔔 Alert message: '{alert_msg}'")
+    
+    if alert_msg and "deletion" in alert_msg.lower():
+        # Create unique alert key for this user and alert type
+        alert_key = f"{user_email}_unusual_deletion_{datetime.datetime.utcnow().strftime('%Y%m%d')}"
+        already_sent = get_sent_alert(alert_key)
+        
+        print(f"🔑 Alert key: {alert_key}")
+        print(f"📋 Already sent: {already_sent}")
+        
+        # Only send if not already sent today
+        if not already_sent:
+            print(f"📧 Sending unusual deletion alert to {user_email}")
+            send_security_alert(user_email, alert_msg)
+            set_sent_alert(alert_key, datetime.datetime.utcnow().isoformat() + 'Z')
+            print(f"✅ Alert sent and logged")
+        else:
+            print(f"⏭️ Alert already sent today, skipping")
+
 @app.route("/api/delete/<filename>", methods=["DELETE"])
 def delete_file_route(filename):
     user_email, err_resp, code = get_user_from_token()
@@ -912,35 +1281,9 @@ def delete_file_route(filename):
     record_activity(user_email, "delete", filename)
     print(f"✅ Recorded delete activity for {user_email}: {filename}")
     
-    try:
-        # Check for unusual deletion activity immediately
-        from ai_module import load_sent_alerts, save_sent_alerts
-        stats, alert_msg = analyze_recent_logs(user_filter=user_email, hours=24)
-        
-        print(f"📊 User stats after delete: {stats.get(user_email, {})}")
-        print(f"🔔 Alert message: '{alert_msg}'")
-        
-        if alert_msg and "deletion" in alert_msg.lower():
-            # Create unique alert key for this user and alert type
-            sent_alerts = load_sent_alerts()
-            alert_key = f"{user_email}_unusual_deletion_{datetime.datetime.utcnow().strftime('%Y%m%d')}"
-            
-            print(f"🔑 Alert key: {alert_key}")
-            print(f"📋 Already sent: {sent_alerts.get(alert_key)}")
-            
-            # Only send if not already sent today
-            if not sent_alerts.get(alert_key):
-                print(f"📧 Sending unusual deletion alert to {user_email}")
-                send_security_alert(user_email, alert_msg)
-                sent_alerts[alert_key] = datetime.datetime.utcnow().isoformat() + 'Z'
-                save_sent_alerts(sent_alerts)
-                print(f"✅ Alert sent and logged")
-            else:
-                print(f"⏭️ Alert already sent today, skipping")
-    except Exception as e:
-        print(f"⚠️ Anomaly check failed: {e}")
-        import traceback
-        traceback.print_exc()
+    # The 24h log scan and alert only gate an email, so run them off the request thread.
+    # One "anomaly" queue also serializes the already-sent check for concurrent deletes.
+    tasks.enqueue("anomaly", check_unusual_deletion, user_email)
 
     return jsonify({"message": f"{filename} deleted successfully"}), 200
 
@@ -952,11 +1295,10 @@ def get_trash():
     if err_resp:
         return err_resp, code
     
-    meta = load_metadata()
     trash_files = []
     
-    for stored_name, details in meta.items():
-        if details.get("owner") == user_email and "deleted_at" in details:
+    for stored_name, details in files_of_owner(user_email):
+        if "deleted_at" in details:
             trash_files.append({
                 "original_name": details["original_name"],
                 "deleted_at": details["deleted_at"],
@@ -1000,13 +1342,18 @@ def empty_trash():
     if err_resp:
         return err_resp, code
     
+    trashed = [stored_name for stored_name, details in files_of_owner(user_email) if "deleted_at" in details]
+    if not trashed:
+        return jsonify({"message": "Emptied trash (0 files deleted)"}), 200
+    
+    # One load and one save for the whole trash instead of one per file
     meta = load_metadata()
     deleted_count = 0
-    
-    for stored_name, details in list(meta.items()):
-        if details.get("owner") == user_email and "deleted_at" in details:
-            if permanently_delete_file(details["original_name"], user_email):
-                deleted_count += 1
+    for stored_name in trashed:
+        if permanently_delete_file(stored_name, user_email, meta=meta, save=False):
+            deleted_count += 1
+    if deleted_count:
+        save_metadata(meta)
     
     return jsonify({"message": f"Emptied trash ({deleted_count} files deleted)"}), 200
 
@@ -1020,41 +1367,47 @@ def load_and_migrate_folders(folders_file):
     - New format: {"email:path": {folder_obj}}
     - Mixed format: combination of both
     
-    Returns: dict with consistent structure
-    """
-    os.makedirs(os.path.dirname(folders_file), exist_ok=True)
+    Once a check has passed, db/schema.json records it and later loads skip it.
     
+    Returns: dict of folder_id -> folder dict. Entries in any other shape are dropped
+    and the file rewritten, so callers can rely on that invariant without re-checking.
+    """
     if not os.path.exists(folders_file):
-        with open(folders_file, "w") as f:
-            json.dump({}, f)
+        jsonio.write_json_atomic(folders_file, {}, indent=False)
         return {}
     
     # Handle corrupted/empty JSON file
     try:
-        with open(folders_file, "r") as f:
+        with open(folders_file, "rb") as f:
             content = f.read().strip()
-            if not content:
-                # File is empty, initialize it
-                with open(folders_file, "w") as fw:
-                    json.dump({}, fw)
-                return {}
-            data = json.loads(content)
-    except json.JSONDecodeError:
+        if not content:
+            # File is empty, initialize it
+            jsonio.write_json_atomic(folders_file, {}, indent=False)
+            return {}
+        data = jsonio.loads(content)
+    except ValueError:  # json.JSONDecodeError and orjson.JSONDecodeError
         # File is corrupted, backup and reinitialize
         print(f"⚠️ Corrupted folders.json detected, reinitializing...")
         backup_file = folders_file.replace(".json", "_corrupted_backup.json")
         import shutil
         shutil.copy2(folders_file, backup_file)
-        with open(folders_file, "w") as f:
-            json.dump({}, f)
+        jsonio.write_json_atomic(folders_file, {}, indent=False)
         return {}
     
+    # Already migrated (recorded in db/schema.json): skip the per-entry format check
+    if get_schema_version("folders") >= FOLDERS_SCHEMA_VERSION:
+        return data
+    
     # Check if migration is needed
     needs_migration = False
     migrated_data = {}
     migration_count = 0
     
-    for key, value in data.items():
+    if not isinstance(data, dict):
+        print(f"⚠️ Unexpected folders.json root: {type(data)}, reinitializing...")
+        needs_migration = True
+    
+    for key, value in (data.items() if isinstance(data, dict) else ()):
         # If value is a list (old format), convert to dict entries
         if isinstance(value, list):
             needs_migration = True
@@ -1075,7 +1428,8 @@ def load_and_migrate_folders(folders_file):
         elif isinstance(value, dict):
             migrated_data[key] = value
         else:
-            # Unknown format, skip
+            # Unknown format, drop it so the saved file only holds folder dicts
+            needs_migration = True
             print(f"⚠️ Unknown format for key {key}: {type(value)}")
     
     # Save migrated data if changes were made
@@ -1084,18 +1438,73 @@ def load_and_migrate_folders(folders_file):
         timestamp = datetime.datetime.utcnow().strftime("%Y%m%d_%H%M%S")
         backup_file = folders_file.replace(".json", f"_premigration_{timestamp}.json")
         
-        with open(backup_file, "w") as f:
-            json.dump(data, f, indent=2)
+        jsonio.write_json_atomic(backup_file, data)
         
         print(f"📦 Folders migration backup: {backup_file}")
         print(f"🔄 Migrated {migration_count} folder entries from list to dict format")
         
         # Save migrated data
-        with open(folders_file, "w") as f:
-            json.dump(migrated_data, f, indent=2)
+        jsonio.write_json_atomic(folders_file, migrated_data, fsync=True)
     
+    set_schema_version("folders", FOLDERS_SCHEMA_VERSION)
     return migrated_data
 
+# Parsed folders.json for read-only handlers, reloaded when the file changes on disk.
+# by_owner: owner -> [folder dict]; by_parent: owner -> parent path -> [folder_id]. Rebuilt with the data.
+_folders_cache = {"key": None, "data": None, "by_owner": {}, "by_parent": {}}
+_folders_cache_lock = threading.Lock()
+
+def _refresh_folders(folders_file):
+    try:
+        st = os.stat(folders_file)
+        key = (folders_file, st.st_mtime_ns, st.st_size)
+    except OSError:
+        key = None
+    with _folders_cache_lock:
+        if key is None or _folders_cache["data"] is None or _folders_cache["key"] != key:
+            data = load_and_migrate_folders(folders_file)
+            if key is not None:
+                # Migration or reinitialization rewrites the file, so take the key afresh
+                st = os.stat(folders_file)
+                key = (folders_file, st.st_mtime_ns, st.st_size)
+            by_owner = {}
+            by_parent = {}
+            # load_and_migrate_folders guarantees a dict of folder dicts
+            for fid, folder in data.items():
+                owner = folder.get("owner")
+                by_owner.setdefault(owner, []).append(folder)
+                by_parent.setdefault(owner, {}).setdefault(folder.get("parent", "/"), []).append(fid)
+            _folders_cache.update(key=key, data=data, by_owner=by_owner, by_parent=by_parent)
+        return dict(_folders_cache)
+
+def get_folders_cached(folders_file):
+    """
+    Return the folders dict, re-reading folders.json only if it changed (mtime + size)
+    or was invalidated since the last call. Shared between requests: do not modify it.
+    Handlers that edit folders keep using load_and_migrate_folders().
+    """
+    return _refresh_folders(folders_file)["data"]
+
+def folders_under(folders_file, owner, path):
+    """Return the ids of an owner's folders whose parent is path or any folder below it."""
+    prefix = path.rstrip("/") + "/"
+    by_parent = _refresh_folders(folders_file)["by_parent"].get(owner, {})
+    return [fid for parent, ids in by_parent.items()
+            if parent == path or parent.startswith(prefix) for fid in ids]
+
+def invalidate_folders_cache():
+    """Drop the cached folders; called after every folders.json write."""
+    with _folders_cache_lock:
+        _folders_cache.update(key=None, data=None, by_owner={}, by_parent={})
+
+def save_folders(folders_file, data):
+    """
+    Serialize once and atomically replace folders.json (temp file + fsync + rename),
+    so a crash mid-write can no longer leave a truncated file behind.
+    """
+    jsonio.write_json_atomic(folders_file, data, fsync=True)
+    invalidate_folders_cache()
+
 # ---------------- Folder Management ----------------
 @app.route("/api/folders", methods=["GET"])
 def list_folders():
@@ -1104,27 +1513,9 @@ def list_folders():
     if err_resp:
         return err_resp, code
 
-    folders_file = os.path.join(BASE_DIR, "..", "db", "folders.json")
-    
-    # Load and migrate if needed
-    all_folders = load_and_migrate_folders(folders_file)
-    
-    # Defensive: handle both dict and list returns
-    if isinstance(all_folders, dict):
-        items = list(all_folders.values())
-        data_shape = "dict"
-    elif isinstance(all_folders, list):
-        items = all_folders
-        data_shape = "list"
-    else:
-        items = []
-        data_shape = "unknown"
-    
-    # Filter for current user
-    user_folders = [f for f in items if isinstance(f, dict) and f.get("owner") == user_email]
-    
-    print(f"📊 list_folders: Loaded {len(items)} total folders (shape: {data_shape}), returning {len(user_folders)} for user {user_email}")
-    
+    # Load and migrate if needed (cached until folders.json changes), with the
+    # per-user list prebuilt on reload
+    user_folders = _refresh_folders(FOLDERS_FILE)["by_owner"].get(user_email, [])
     return jsonify(user_folders), 200
 
 @app.route("/api/folders", methods=["POST"])
@@ -1134,7 +1525,7 @@ def create_folder():
     if err_resp:
         return err_resp, code
 
-    data = request.json or {}
+    data = request.get_json(silent=True) or {}
     folder_name = data.get("name", "").strip()
     parent_path = data.get("parent", "/").strip() or "/"
     
@@ -1147,10 +1538,8 @@ def create_folder():
     else:
         folder_path = f"{parent_path}/{folder_name}"
     
-    folders_file = os.path.join(BASE_DIR, "..", "db", "folders.json")
-    
     # Load and migrate if needed
-    all_folders = load_and_migrate_folders(folders_file)
+    all_folders = load_and_migrate_folders(FOLDERS_FILE)
     
     # Check if folder already exists
     folder_id = f"{user_email}:{folder_path}"
@@ -1167,8 +1556,7 @@ def create_folder():
         "created_at": datetime.datetime.utcnow().isoformat() + 'Z'
     }
     
-    with open(folders_file, "w") as f:
-        json.dump(all_folders, f, indent=2)
+    save_folders(FOLDERS_FILE, all_folders)
     
     print(f"✅ Created folder: {folder_id}")
     
@@ -1181,16 +1569,14 @@ def rename_folder(folder_id):
     if err_resp:
         return err_resp, code
 
-    data = request.json or {}
+    data = request.get_json(silent=True) or {}
     new_name = data.get("name", "").strip()
     
     if not new_name:
         return jsonify({"error": "New folder name required"}), 400
     
-    folders_file = os.path.join(BASE_DIR, "..", "db", "folders.json")
-    
     # Load and migrate if needed
-    all_folders = load_and_migrate_folders(folders_file)
+    all_folders = load_and_migrate_folders(FOLDERS_FILE)
     
     if folder_id not in all_folders or all_folders[folder_id]["owner"] != user_email:
         return jsonify({"error": "Folder not found or access denied"}), 404
@@ -1204,6 +1590,11 @@ def rename_folder(folder_id):
     else:
         new_path = f"{parent}/{new_name}"
     
+    # Subfolders and files below the old path, looked up in the cached indexes
+    # (both still describe the state just loaded) instead of scanning everything
+    child_ids = folders_under(FOLDERS_FILE, user_email, old_path)
+    moved_files = files_under_folder(user_email, old_path)
+    
     # Update folder
     new_id = f"{user_email}:{new_path}"
     all_folders[new_id] = all_folders.pop(folder_id)
@@ -1211,20 +1602,24 @@ def rename_folder(folder_id):
     all_folders[new_id]["name"] = new_name
     all_folders[new_id]["path"] = new_path
     
-    # Update all child folders and files
-    for fid, folder in list(all_folders.items()):
-        if folder["owner"] == user_email and folder["parent"].startswith(old_path):
-            folder["parent"] = folder["parent"].replace(old_path, new_path, 1)
+    # Update all child folders and files. The indexes only return paths that start
+    # with old_path, so swap the prefix by slicing instead of searching with replace()
+    old_len = len(old_path)
+    for fid in child_ids:
+        folder = all_folders.get(fid)
+        if folder is not None:
+            folder["parent"] = new_path + folder["parent"][old_len:]
     
-    with open(folders_file, "w") as f:
-        json.dump(all_folders, f, indent=2)
+    save_folders(FOLDERS_FILE, all_folders)
     
     # Update files in this folder
-    meta = load_metadata()
-    for k, v in meta.items():
-        if v["owner"] == user_email and v.get("folder", "/").startswith(old_path):
-            v["folder"] = v["folder"].replace(old_path, new_path, 1)
-    save_metadata(meta)
+    if moved_files:
+        meta = load_metadata()
+        for stored in moved_files:
+            v = meta.get(stored)
+            if v is not None:
+                v["folder"] = new_path + v["folder"][old_len:]
+        save_metadata(meta)
     
     return jsonify(all_folders[new_id]), 200
 
@@ -1235,10 +1630,8 @@ def delete_folder(folder_id):
     if err_resp:
         return err_resp, code
 
-    folders_file = os.path.join(BASE_DIR, "..", "db", "folders.json")
-    
     # Load and migrate if needed
-    all_folders = load_and_migrate_folders(folders_file)
+    all_folders = load_and_migrate_folders(FOLDERS_FILE)
     
     if folder_id not in all_folders or all_folders[folder_id]["owner"] != user_email:
         return jsonify({"error": "Folder not found or access denied"}), 404
@@ -1246,22 +1639,20 @@ def delete_folder(folder_id):
     folder_path = all_folders[folder_id]["path"]
     
     # Check if folder has files
-    meta = load_metadata()
-    has_files = any(v["owner"] == user_email and v.get("folder") == folder_path for v in meta.values())
+    has_files = folder_has_files(user_email, folder_path)
     
     if has_files:
         return jsonify({"error": "Cannot delete folder with files. Move or delete files first."}), 400
     
-    # Check if folder has subfolders
-    has_subfolders = any(f["owner"] == user_email and f["parent"] == folder_path for f in all_folders.values())
+    # Check if folder has subfolders (cached parent index, same state as all_folders)
+    has_subfolders = bool(_refresh_folders(FOLDERS_FILE)["by_parent"].get(user_email, {}).get(folder_path))
     
     if has_subfolders:
         return jsonify({"error": "Cannot delete folder with subfolders. Delete subfolders first."}), 400
     
     del all_folders[folder_id]
     
-    with open(folders_file, "w") as f:
-        json.dump(all_folders, f, indent=2)
+    save_folders(FOLDERS_FILE, all_folders)
     
     return jsonify({"message": "Folder deleted successfully"}), 200
 
@@ -1272,7 +1663,7 @@ def move_file():
     if err_resp:
         return err_resp, code
 
-    data = request.json or {}
+    data = request.get_json(silent=True) or {}
     filename = data.get("filename", "").strip()
     target_folder = data.get("target_folder", "/").strip() or "/"
     
@@ -1307,7 +1698,7 @@ def share_file():
     if err_resp:
         return err_resp, code
 
-    data = request.json or {}
+    data = request.get_json(silent=True) or {}
     filename = (data.get("filename") or "").strip()
 
     print(f"\n[SHARE] User: {user_email}")
@@ -1333,19 +1724,16 @@ def share_file():
     
     # If not found, check if frontend sent the stored name instead of original name
     if not details:
-        meta = load_metadata()
-        for stored, d in meta.items():
-            if d.get("owner") == user_email and stored == filename:
-                # Found by stored name, use it
-                stored_name = stored
-                details = d
-                print(f"✅ Found file by stored name: {stored} -> original: {d.get('original_name')}")
-                break
+        d = get_metadata_cached().get(filename)
+        if d and d.get("owner") == user_email:
+            # Found by stored name, use it
+            stored_name = filename
+            details = d
+            print(f"✅ Found file by stored name: {filename} -> original: {d.get('original_name')}")
     
     if not details:
         # Debug: show what files user owns
-        meta = load_metadata()
-        user_files = [d.get("original_name") for k, d in meta.items() if d.get("owner") == user_email]
+        user_files = [d.get("original_name") for k, d in files_of_owner(user_email)]
         print(f"❌ File '{filename}' not found for {user_email}")
         print(f"   Available files: {user_files}")
         return jsonify({
@@ -1354,13 +1742,13 @@ def share_file():
             "your_files": user_files
         }), 404
 
-    token = uuid.uuid4().hex
+    token = secrets.token_hex(16)
     created_at = datetime.datetime.utcnow()
     expires_at = created_at + datetime.timedelta(seconds=expiry_seconds)
 
     # If sender provided a password, use it; otherwise generate one
-    provided_password = data.get("password") or ''.join(random.choice("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789") for _ in range(8))
-    password_hash = generate_password_hash(provided_password)
+    provided_password = data.get("password") or secrets.token_urlsafe(6)  # 8 chars from the OS CSPRNG
+    password_hash = hash_password(provided_password)
 
     shares = load_shares()
     shares[token] = {
@@ -1378,12 +1766,9 @@ def share_file():
     host = request.host_url.rstrip("/")
     share_link = f"{host}/api/share/{token}"
 
-    # Send the secure link to each recipient
-    for r in recipients:
-        try:
-            print(f"📧 Attempting to send secure link to {r}")
-
-            email_body = f"""
+    # Queue the secure link for each recipient; the background mail queue sends
+    # (and retries) them, so the response does not wait on SMTP
+    email_body = f"""
 Hello,
 
 A file "{filename}" has been shared with you by {data.get('sender_username', 'a user')}.
@@ -1397,10 +1782,9 @@ Once you have the password, click the link above to access the file.
 
 - Intelligent Cloud File Sharing System
 """
-            send_email(r, f"Shared File: {filename}", email_body)
-            print(f"✅ Secure share link sent to {r}")
-        except Exception as e:
-            print(f"❌ Email send failed for {r}: {e}")
+    for r in recipients:
+        if queue_email(r, f"Shared File: {filename}", email_body):
+            print(f"📧 Secure share link queued for {r}")
 
     # Log share creation with receiver emails in metadata
     record_access_log(filename, "share_create", user_email, meta={"receiver_emails": recipients})
@@ -1421,11 +1805,10 @@ Once you have the password, click the link above to access the file.
 @app.route("/api/share/<token>", methods=["POST"])
 def access_shared_file(token):
     """Receiver downloads shared file by entering password."""
-    data = request.json or {}
+    data = request.get_json(silent=True) or {}
     input_password = (data.get("password") or "").strip()
 
-    shares = load_shares()
-    share = shares.get(token)
+    share = get_shares_cached().get(token)
     if not share:
         return jsonify({"error": "invalid or expired link"}), 404
 
@@ -1436,7 +1819,7 @@ def access_shared_file(token):
         return jsonify({"error": "link expired"}), 403
 
     # Check password
-    if not check_password_hash(share["password_hash"], input_password):
+    if not verify_password(share["password_hash"], input_password)[0]:
         return jsonify({"error": "invalid password"}), 401
 
     stored_path = os.path.join(UPLOAD_FOLDER, share["stored_name"])
@@ -1450,11 +1833,7 @@ def access_shared_file(token):
 
     @after_this_request
     def cleanup(response):
-        try:
-            if os.path.exists(outpath):
-                os.remove(outpath)
-        except:
-            pass
+        remove_temp_files([outpath])
         return response
 
     # Record activity for shared downloads
@@ -1465,41 +1844,45 @@ def access_shared_file(token):
 
     return send_file(outpath, as_attachment=True, download_name=share["original_name"])
 
-@app.route("/api/share/<token>", methods=["GET"])
-def get_share_page(token):
-    """Simple landing page for receivers to enter password"""
-    return f"""
+# Same page for every share link: the script posts back to its own URL, so the token is
+# never formatted into the HTML and the page is built once at import.
+SHARE_PAGE_HTML = """
     <html>
       <body style='font-family:sans-serif; text-align:center; margin-top:50px'>
         <h2>Enter password to download file</h2>
-        <form method="post" action="/api/share/{token}" onsubmit="event.preventDefault(); handleSubmit();">
+        <form method="post" action="" onsubmit="event.preventDefault(); handleSubmit();">
           <input id="pw" type="password" placeholder="Enter password" required style="padding:5px">
           <button type="submit" style="padding:5px 10px">Download</button>
         </form>
         <script>
-          async function handleSubmit(){{
+          async function handleSubmit(){
             const pw = document.getElementById('pw').value;
-            const res = await fetch('/api/share/{token}', {{
+            const res = await fetch(location.pathname, {
               method: 'POST',
-              headers: {{ 'Content-Type': 'application/json' }},
-              body: JSON.stringify({{ password: pw }})
-            }});
-            if (res.ok) {{
+              headers: { 'Content-Type': 'application/json' },
+              body: JSON.stringify({ password: pw })
+            });
+            if (res.ok) {
               const blob = await res.blob();
               const a = document.createElement('a');
               a.href = URL.createObjectURL(blob);
               a.download = "shared_file";
               a.click();
-            }} else {{
-              const data = await res.json().catch(()=>({{}}));
+            } else {
+              const data = await res.json().catch(()=>({}));
               alert(data.error || 'Invalid password or link expired');
-            }}
-          }}
+            }
+          }
         </script>
       </body>
     </html>
     """
 
+@app.route("/api/share/<token>", methods=["GET"])
+def get_share_page(token):
+    """Simple landing page for receivers to enter password"""
+    return SHARE_PAGE_HTML
+
 # ---------------- Logs ----------------
 @app.route("/api/logs", methods=["GET"])
 def get_logs():
@@ -1521,64 +1904,22 @@ def get_logs():
     if err_resp:
         return err_resp, code
 
-    # Read both activity_log and access_log for comprehensive results
-    activity_log_file = os.path.join(os.path.dirname(__file__), "..", "db", "activity_log.json")
-    access_log_file = os.path.join(os.path.dirname(__file__), "..", "db", "access_log.json")
-    
-    all_logs = []
-    
-    # Load activity logs
-    if os.path.exists(activity_log_file):
-        try:
-            with open(activity_log_file, "r", encoding="utf-8") as f:
-                activity_logs = json.load(f)
-                print(f"📋 Loaded {len(activity_logs)} entries from activity_log.json")
-                all_logs.extend(activity_logs)
-        except Exception as e:
-            print(f"⚠️ Failed to load activity_log.json: {e}")
-    
-    # Load access logs
-    if os.path.exists(access_log_file):
-        try:
-            with open(access_log_file, "r", encoding="utf-8") as f:
-                access_logs = json.load(f)
-                # Normalize old 'time' field to 'timestamp'
-                for log in access_logs:
-                    if 'time' in log and 'timestamp' not in log:
-                        log['timestamp'] = log['time']
-                all_logs.extend(access_logs)
-        except Exception as e:
-            print(f"⚠️ Failed to load access_log.json: {e}")
-    
-    # Filter by current user only
-    user_logs = [l for l in all_logs if l.get("user") == user_email]
-    print(f"📊 Total logs for {user_email}: {len(user_logs)} (from {len(all_logs)} total)")
-    
-    # Debug: Show action types
-    action_types = {}
-    for log in user_logs:
-        action = log.get('action', 'unknown')
-        action_types[action] = action_types.get(action, 0) + 1
-    print(f"📈 Action breakdown: {action_types}")
-    
-    # Apply query parameter filters using helper function
+    # Apply query parameter filters using helper function.
+    # The user's activity and access logs are streamed through the filters and materialized once.
     try:
-        filter_params = {
-            'type': request.args.get('type', ''),
-            'start': request.args.get('start', ''),
-            'end': request.args.get('end', ''),
-            'file_type': request.args.get('file_type', ''),
-            'file_name': request.args.get('file_name', ''),
-            'receiver_email': request.args.get('receiver_email', '')
-        }
+        args = request.args
+        filter_params = {name: args.get(name, '') for name in LOG_FILTER_PARAMS}
         
-        user_logs = filter_logs(user_logs, filter_params)
+        user_logs = filter_logs(_iter_user_logs(user_email), filter_params)
         
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": f"Filter error: {str(e)}"}), 400
     
+    print(f"📊 Total logs for {user_email}: {len(user_logs)}")
+    print(f"📈 Action breakdown: {dict(Counter(l.get('action', 'unknown') for l in user_logs))}")
+    
     # Sort by timestamp descending (newest first)
     def get_timestamp(log):
         ts = log.get('timestamp') or log.get('time') or ''
@@ -1615,9 +1956,16 @@ def get_logs():
 
 # ---------------- Advanced Search ----------------
 # Simple rate limiting storage (in-memory, resets on restart)
-_search_rate_limit = {}
+_search_rate_limit = defaultdict(deque)  # user -> request times (monotonic), oldest first
+_search_rate_limit_lock = threading.Lock()  # gthread workers run searches concurrently
 _SEARCH_RATE_LIMIT_WINDOW = 60  # seconds
 _SEARCH_RATE_LIMIT_MAX = 30  # max requests per window
+_SEARCH_ACTIONS = ('upload', 'download', 'delete', 'share', 'share_create', 'shared_download')
+_SEARCH_VALID_ACTIONS = frozenset(_SEARCH_ACTIONS)
+_SEARCH_INVALID_ACTION = {
+    "error": "invalid action",
+    "message": f"action must be one of: {', '.join(_SEARCH_ACTIONS)}"
+}
 
 @app.route("/api/search", methods=["GET"])
 def search():
@@ -1655,21 +2003,26 @@ def search():
         return err_resp, code
 
     # --- Rate Limiting ---
-    now = datetime.datetime.utcnow().timestamp()
-    user_requests = _search_rate_limit.get(user_email, [])
-    
-    # Clean old requests outside the window
-    user_requests = [ts for ts in user_requests if now - ts < _SEARCH_RATE_LIMIT_WINDOW]
+    now = time.monotonic()
+    # Check and record under one lock, so concurrent requests can't all pass the same check
+    with _search_rate_limit_lock:
+        user_requests = _search_rate_limit[user_email]
+        
+        # Drop old requests outside the window (oldest first, so stop at the first recent one)
+        cutoff = now - _SEARCH_RATE_LIMIT_WINDOW
+        while user_requests and user_requests[0] <= cutoff:
+            user_requests.popleft()
+        
+        rate_limited = len(user_requests) >= _SEARCH_RATE_LIMIT_MAX
+        if not rate_limited:
+            # Add current request
+            user_requests.append(now)
     
-    if len(user_requests) >= _SEARCH_RATE_LIMIT_MAX:
+    if rate_limited:
         return jsonify({
             "error": "rate limit exceeded",
             "message": f"max {_SEARCH_RATE_LIMIT_MAX} requests per {_SEARCH_RATE_LIMIT_WINDOW} seconds"
         }), 429
-    
-    # Add current request
-    user_requests.append(now)
-    _search_rate_limit[user_email] = user_requests
 
     # --- Parse and Validate Parameters ---
     query = request.args.get("query", "").strip().lower()
@@ -1691,117 +2044,102 @@ def search():
     
     if date_from:
         try:
-            # Support both date and datetime formats
+            # Support both date and datetime formats (ciso8601 when installed)
             if 'T' in date_from:
-                date_from_obj = datetime.datetime.fromisoformat(date_from.replace('Z', '+00:00'))
+                date_from_obj = parse_iso_datetime(date_from)
             else:
-                date_from_obj = datetime.datetime.fromisoformat(date_from + 'T00:00:00')
+                date_from_obj = parse_iso_datetime(date_from + 'T00:00:00')
         except ValueError:
             return jsonify({"error": "invalid 'from' date format (use ISO: YYYY-MM-DD or YYYY-MM-DDTHH:MM:SS)"}), 400
     
     if date_to:
         try:
             if 'T' in date_to:
-                date_to_obj = datetime.datetime.fromisoformat(date_to.replace('Z', '+00:00'))
+                date_to_obj = parse_iso_datetime(date_to)
             else:
-                date_to_obj = datetime.datetime.fromisoformat(date_to + 'T23:59:59')
+                date_to_obj = parse_iso_datetime(date_to + 'T23:59:59')
         except ValueError:
             return jsonify({"error": "invalid 'to' date format (use ISO: YYYY-MM-DD or YYYY-MM-DDTHH:MM:SS)"}), 400
 
     # Validate action filter
-    valid_actions = ['upload', 'download', 'delete', 'share', 'share_create', 'shared_download']
-    if action_filter and action_filter not in valid_actions:
-        return jsonify({
-            "error": "invalid action",
-            "message": f"action must be one of: {', '.join(valid_actions)}"
-        }), 400
+    if action_filter and action_filter not in _SEARCH_VALID_ACTIONS:
+        return jsonify(_SEARCH_INVALID_ACTION), 400
+
+    # Date bounds as unix seconds, parsed once; rows carry pre-parsed epochs
+    df_epoch = datetime_to_epoch(date_from_obj) if date_from_obj else None
+    dt_epoch = datetime_to_epoch(date_to_obj) if date_to_obj else None
+
+    # Identical searches are answered from cache until the files or the access log change
+    results, total = _run_search(user_email, metadata_key(), access_log_key() if action_filter else None,
+                                 query, file_type, df_epoch, dt_epoch, action_filter, offset, limit)
+    return _search_page(results, total, limit, offset)
+
+@memoize(SEARCH_CACHE_SECONDS)
+def _run_search(user_email, meta_key, log_key, query, file_type, df_epoch, dt_epoch, action_filter, offset, limit):
+    """
+    One page of /api/search results as (results, total). meta_key and log_key (access log
+    version, None without an action filter) are only part of the cache key.
+    """
+    has_date_filter = df_epoch is not None or dt_epoch is not None
+
+    # --- MongoDB: filter, sort and page server-side on its index ---
+    # File-only searches; with an action filter, log results are merged and paged below
+    if not action_filter:
+        page = search_metadata_mongo(user_email, query, ext=file_type or None,
+                                     epoch_from=df_epoch, epoch_to=dt_epoch, offset=offset, limit=limit)
+        if page is not None:
+            docs, total = page
+            return [_file_search_result(details) for _, details in docs], total
 
     # --- Search Files Metadata ---
-    meta = load_metadata()
-    matching_files = []
+    # Row check built once from the active filters only: name query on the name lowercased
+    # at upload, date range on the stored epoch (-1: upload time unknown, never matches)
+    lo = max(df_epoch or 0, 0)
+    hi = dt_epoch if dt_epoch is not None else sys.maxsize
+    if query and has_date_filter:
+        keep = lambda d: query in d["original_name_lower"] and lo <= d["uploaded_at_epoch"] <= hi
+    elif query:
+        keep = lambda d: query in d["original_name_lower"]
+    elif has_date_filter:
+        keep = lambda d: lo <= d["uploaded_at_epoch"] <= hi
+    else:
+        keep = None
 
-    for stored_name, details in meta.items():
-        # Only search user's own files
-        if details.get("owner") != user_email:
-            continue
-        
-        original_name = details.get("original_name", "").lower()
-        
-        # Filter by query (filename search)
-        if query and query not in original_name:
-            continue
-        
-        # Filter by file type
-        if file_type:
-            file_ext = original_name.split('.')[-1] if '.' in original_name else ''
-            if file_ext != file_type:
-                continue
-        
-        # Filter by date range
-        if date_from_obj or date_to_obj:
-            try:
-                uploaded_at = datetime.datetime.fromisoformat(details.get("uploaded_at", ""))
-                if date_from_obj and uploaded_at < date_from_obj:
-                    continue
-                if date_to_obj and uploaded_at > date_to_obj:
-                    continue
-            except (ValueError, TypeError):
-                continue
-        
-        matching_files.append({
-            "type": "file",
-            "filename": details.get("original_name"),
-            "uploaded_at": details.get("uploaded_at"),
-            "folder": details.get("folder", "/"),
-            "size": details.get("size", 0),
-            "owner": details.get("owner")
-        })
+    # Only search user's own files; the file type filter is an index lookup
+    candidates = search_candidates(user_email, ext=file_type or None)
+    matching_files = [_file_search_result(details) for _, details in candidates
+                      if keep is None or keep(details)]
 
     # --- Search Access Logs (if action filter specified) ---
     matching_logs = []
     
     if action_filter:
-        log_file = os.path.join(os.path.dirname(__file__), "..", "db", "access_log.json")
-        
-        if os.path.exists(log_file):
-            try:
-                with open(log_file, "r", encoding="utf-8") as f:
-                    logs = json.load(f)
+        try:
+            # Only user's own logs with that action: a lookup in the (user, action) index
+            for log in iter_access_log(user=user_email, action=action_filter):
+                # Filter by filename query
+                if query and query not in log.get("file", "").lower():
+                    continue
                 
-                for log in logs:
-                    # Only user's own logs
-                    if log.get("user") != user_email:
+                # Filter by date range (entries written before "epoch" existed are parsed)
+                if has_date_filter:
+                    ts = log.get("epoch")
+                    if ts is None:
+                        ts = iso_to_epoch(log.get("timestamp"))
+                    if ts < 0 or (df_epoch is not None and ts < df_epoch) or (dt_epoch is not None and ts > dt_epoch):
                         continue
-                    
-                    # Filter by action
-                    if action_filter and log.get("action") != action_filter:
-                        continue
-                    
-                    # Filter by filename query
-                    if query and query not in log.get("file", "").lower():
-                        continue
-                    
-                    # Filter by date range
-                    if date_from_obj or date_to_obj:
-                        try:
-                            log_time = datetime.datetime.fromisoformat(log.get("time", ""))
-                            if date_from_obj and log_time < date_from_obj:
-                                continue
-                            if date_to_obj and log_time > date_to_obj:
-                                continue
-                        except (ValueError, TypeError):
-                            continue
-                    
-                    matching_logs.append({
-                        "type": "log",
-                        "filename": log.get("file"),
-                        "action": log.get("action"),
-                        "time": log.get("time"),
-                        "user": log.get("user")
-                    })
-            
-            except Exception as e:
-                print(f"⚠️ Failed to read access logs: {e}")
+                
+                matching_logs.append({
+                    "type": "log",
+                    "filename": log.get("file"),
+                    "action": log.get("action"),
+                    # iter_access_log normalizes old 'time' fields to 'timestamp'
+                    "time": log.get("timestamp"),
+                    "user": log.get("user")
+                })
+        
+        except Exception as e:
+            print(f"⚠️ Failed to read access logs: {e}")
 
     # --- Combine and Sort Results ---
     all_results = matching_files + matching_logs
@@ -1809,18 +2147,49 @@ def search():
     # Sort by date (newest first)
     def get_sort_date(item):
         if item["type"] == "file":
-            return item.get("uploaded_at", "")
+            return item.get("uploaded_at") or ""
         else:
-            return item.get("time", "")
+            return item.get("time") or ""
     
-    all_results.sort(key=get_sort_date, reverse=True)
-
     # --- Apply Pagination ---
+    # Only the first offset + limit results are ever returned, so select those with a
+    # bounded heap instead of sorting everything (same order as a stable reverse sort)
     total = len(all_results)
-    paginated_results = all_results[offset:offset + limit]
+    paginated_results = heapq.nlargest(offset + limit, all_results, key=get_sort_date)[offset:]
+
+    return paginated_results, total
+
+def _file_search_result(details):
+    """One file entry of an /api/search response."""
+    return {
+        "type": "file",
+        "filename": details.get("original_name"),
+        "uploaded_at": details.get("uploaded_at"),
+        "folder": details.get("folder", "/"),
+        "size": details.get("size", 0),
+        "owner": details.get("owner")
+    }
+
+def _search_page(results, total, limit, offset):
+    """
+    Paginated /api/search response.
+    Clients sending "Accept: application/x-ndjson" get it as JSON Lines instead: a header line
+    with the paging fields, then one line per result, serialized while the response is sent.
+    """
+    if "application/x-ndjson" in request.headers.get("Accept", ""):
+        def generate():
+            yield jsonio.dumps({
+                "total": total,
+                "limit": limit,
+                "offset": offset,
+                "has_more": (offset + limit) < total
+            }) + b"\n"
+            for item in results:
+                yield jsonio.dumps(item) + b"\n"
+        return Response(generate(), mimetype="application/x-ndjson"), 200
 
     return jsonify({
-        "results": paginated_results,
+        "results": results,
         "total": total,
         "limit": limit,
         "offset": offset,
@@ -1843,20 +2212,19 @@ def analyze():
 # ---------------- Forgot Password ----------------
 @app.route("/api/forgot-password", methods=["POST"])
 def forgot_password():
-    data = request.json
+    data = request.get_json(silent=True) or {}
     email = (data.get("email") or "").strip().lower()
-    users = load_users()
-    if email not in users:
+    if get_user(email) is None:
         return jsonify({"error": "email not registered"}), 400
 
-    otp_code = str(random.randint(100000, 999999))
+    otp_code = str(100000 + secrets.randbelow(900000))
     save_otp(email, otp_code)
 
     return jsonify({"message": "Password reset OTP sent to email"}), 200
 
 @app.route("/api/reset-password", methods=["POST"])
 def reset_password():
-    data = request.json
+    data = request.get_json(silent=True) or {}
     email = (data.get("email") or "").strip().lower()
     otp_code = str(data.get("otp") or "").strip()
     new_pwd = data.get("new_password")
@@ -1871,7 +2239,7 @@ def reset_password():
     if email not in users:
         return jsonify({"error": "user not found"}), 404
 
-    users[email]["password_hash"] = generate_password_hash(new_pwd)
+    users[email]["password_hash"] = hash_password(new_pwd)
     save_users(users)
 
     delete_otp(email)
@@ -1893,13 +2261,17 @@ def bulk_upload():
     uploaded = []
     failed = []
 
-    for f in files:
-        try:
-            filename = secure_filename(f.filename)
-            filepath = os.path.join(app.config["UPLOAD_FOLDER"], filename)
-            f.save(filepath)
+    # Encrypted straight from the request streams, several files at a time,
+    # with one metadata save for the batch
+    names = [secure_filename(f.filename) for f in files]
+    results = encrypt_streams_and_store([(f.stream, name) for f, name in zip(files, names)],
+                                        user_email, folder=folder)
 
-            stored = encrypt_file_and_store(filepath, filename, user_email, folder=folder)
+    for f, filename, (info, error) in zip(files, names, results):
+        if error is not None:
+            failed.append({"filename": f.filename, "error": error})
+            continue
+        try:
             record_access_log(filename, "upload", user_email)
             try:
                 record_activity(user_email, "upload", filename)
@@ -1922,44 +2294,36 @@ def bulk_download():
     if err_resp:
         return err_resp, code
 
-    data = request.json or {}
+    data = request.get_json(silent=True) or {}
     filenames = data.get("filenames", [])
 
     if not filenames:
         return jsonify({"error": "no filenames provided"}), 400
 
-    import zipfile
-    import tempfile
-
-    # Create temporary zip file
-    temp_zip = tempfile.NamedTemporaryFile(delete=False, suffix='.zip')
-    temp_paths = []
+    # (stored name, archive name) of the files to put in the archive; files that are
+    # missing or not owned are skipped
+    entries = []
 
     try:
-        with zipfile.ZipFile(temp_zip.name, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for filename in filenames:
-                outpath = decrypt_and_get_file(filename, user_email)
-                if outpath and os.path.exists(outpath):
-                    zipf.write(outpath, arcname=filename)
-                    temp_paths.append(outpath)
-                    try:
-                        record_activity(user_email, "download", filename)
-                    except Exception:
-                        pass
-
-        @after_this_request
-        def cleanup(response):
-            try:
-                for path in temp_paths:
-                    if os.path.exists(path):
-                        os.remove(path)
-                if os.path.exists(temp_zip.name):
-                    os.remove(temp_zip.name)
-            except Exception as e:
-                print("❌ Cleanup failed:", str(e))
-            return response
+        for filename in filenames:
+            stored_name, _ = find_by_owner_and_name(user_email, filename)
+            if stored_name and os.path.exists(os.path.join(UPLOAD_FOLDER, stored_name)):
+                entries.append((stored_name, filename))
+                try:
+                    record_activity(user_email, "download", filename)
+                except Exception:
+                    pass
+
+        def generate():
+            # Same streaming ZIP as /api/download-multiple: each file is decrypted into the
+            # archive while it is sent, with no temp archive or plaintext copies on disk
+            yield from stream_zip(entries)
 
-        return send_file(temp_zip.name, as_attachment=True, download_name="files.zip")
+        return Response(
+            generate(),
+            mimetype="application/zip",
+            headers={"Content-Disposition": 'attachment; filename="files.zip"'}
+        )
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -1971,33 +2335,20 @@ def search_files():
     if err_resp:
         return err_resp, code
 
-    data = request.json or {}
+    data = request.get_json(silent=True) or {}
     query = data.get("query", "").lower()
     folder = data.get("folder", "").strip()
     date_from = data.get("date_from")
     date_to = data.get("date_to")
 
-    meta = load_metadata()
     user_files = []
 
-    for stored_name, details in meta.items():
-        if details["owner"] != user_email:
-            continue
-
+    # Folder and date range filters are index lookups; only the name query scans the candidates
+    candidates = search_candidates(user_email, folder=folder or None,
+                                   date_from=date_from or None, date_to=date_to or None)
+    for stored_name, details in candidates:
         # Search by filename
-        if query and query not in details["original_name"].lower():
-            continue
-
-        # Filter by folder
-        file_folder = details.get("folder", "/")
-        if folder and file_folder != folder:
-            continue
-
-        # Filter by date range
-        uploaded_at = details.get("uploaded_at", "")
-        if date_from and uploaded_at < date_from:
-            continue
-        if date_to and uploaded_at > date_to:
+        if query and query not in details["original_name_lower"]:
             continue
 
         user_files.append({
@@ -2009,13 +2360,92 @@ def search_files():
     return jsonify(user_files), 200
 
 # ---------------- Frontend ----------------
+STATIC_MAX_AGE = 60  # seconds; unhashed files (index.html) are revalidated with their ETag after this
+HASHED_ASSET_MAX_AGE = 31536000  # content-hashed names (app.3f9a2c1d.js) never change
+HASHED_ASSET_RE = re.compile(r"\.[0-9a-f]{8,}\.\w+$")
+PRECOMPRESS_EXTENSIONS = (".html", ".css", ".js", ".json", ".svg", ".txt")
+# Preferred first; the sibling file is <name><suffix>
+PRECOMPRESSED_ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+def _precompressed_path(filename, suffix):
+    """Path of an up-to-date compressed sibling of a static file, or None."""
+    path = safe_join(app.static_folder, filename)
+    if path is None:
+        return None
+    try:
+        if os.stat(path + suffix).st_mtime_ns >= os.stat(path).st_mtime_ns:
+            return path + suffix
+    except OSError:
+        pass
+    return None
+
+def send_static(filename):
+    """
+    Serve a frontend file with cache headers. When the client accepts it, an up-to-date
+    .br/.gz sibling (see precompress_static) is sent instead, so nothing is compressed per request.
+    """
+    response = None
+    for encoding, suffix in PRECOMPRESSED_ENCODINGS:
+        if request.accept_encodings[encoding] and _precompressed_path(filename, suffix):
+            mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+            response = send_from_directory(app.static_folder, filename + suffix, mimetype=mimetype)
+            # Flask-Compress leaves responses that already have a Content-Encoding alone
+            response.headers["Content-Encoding"] = encoding
+            break
+    if response is None:
+        response = send_from_directory(app.static_folder, filename)
+    response.vary.add("Accept-Encoding")
+    # send_file marks responses no-cache unless given a max_age; set ours instead
+    response.cache_control.no_cache = None
+    response.cache_control.public = True
+    if HASHED_ASSET_RE.search(filename):
+        response.cache_control.max_age = HASHED_ASSET_MAX_AGE
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.max_age = STATIC_MAX_AGE
+    return response
+
+def precompress_static():
+    """
+    Write .br (if brotli is installed) and .gz siblings next to each text asset in the frontend
+    folder, skipping ones that are already newer than their source. Run once at startup.
+    """
+    count = 0
+    for root, _, names in os.walk(app.static_folder):
+        for name in names:
+            if not name.endswith(PRECOMPRESS_EXTENSIONS):
+                continue
+            path = os.path.join(root, name)
+            data = None
+            for encoding, suffix in PRECOMPRESSED_ENCODINGS:
+                if encoding == "br" and brotli is None:
+                    continue
+                try:
+                    if os.stat(path + suffix).st_mtime_ns >= os.stat(path).st_mtime_ns:
+                        continue
+                except OSError:
+                    pass
+                if data is None:
+                    with open(path, "rb") as f:
+                        data = f.read()
+                if encoding == "br":
+                    compressed = brotli.compress(data, quality=11)
+                else:
+                    compressed = gzip.compress(data, compresslevel=9, mtime=0)
+                tmp_path = f"{path}{suffix}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(compressed)
+                os.replace(tmp_path, path + suffix)
+                count += 1
+    print(f"🗜️ Precompressed {count} static file(s)")
+
 @app.route('/')
 def index():
-    return send_from_directory(app.static_folder, 'index.html')
+    return send_static('index.html')
 
 @app.route('/<path:filename>')
 def static_files(filename):
-    return send_from_directory(app.static_folder, filename)
+    return send_static(filename)
 
 @app.route('/monitor')
 def monitor_page():
@@ -2027,7 +2457,8 @@ if __name__ == "__main__":
     
     # Run metadata migration to ensure all files have folder field
     print("\n🔄 Running metadata migration...")
-    migrate_metadata_folders()
+    run_startup_migrations()
+    precompress_static()
     
     print("\nStarting app; email user from env:", os.getenv("EMAIL_USER"))
     app.run(host="0.0.0.0", port=5000, debug=True)
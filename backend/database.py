@@ -7,13 +7,17 @@ Features:
 - MongoDB Atlas cloud integration
 - Automatic connection pooling
 - Graceful fallback to JSON storage
-- Connection health monitoring
+- Connection health monitoring (ping at most once per MONGODB_PING_INTERVAL seconds)
 - Thread-safe operations
+- Indexes for the queries the app runs, created on connect
+- Lazy connect on first use, so importing the module never blocks worker startup
 """
 
 import os
 import json
-from pymongo import MongoClient
+import time
+import threading
+from pymongo import MongoClient, ASCENDING, DESCENDING
 from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError
 from dotenv import load_dotenv
 
@@ -24,10 +28,18 @@ load_dotenv()
 MONGODB_URI = os.getenv("MONGODB_URI")
 USE_MONGODB = os.getenv("USE_MONGODB", "false").lower() == "true"
 DB_NAME = "securecloud_db"
+# Connection pool per process, sized for the gunicorn thread count
+MONGODB_MAX_POOL_SIZE = int(os.getenv("MONGODB_MAX_POOL_SIZE", 50))
+MONGODB_MIN_POOL_SIZE = int(os.getenv("MONGODB_MIN_POOL_SIZE", 5))
+# A health check within this many seconds of the last good ping is trusted without a round trip
+MONGODB_PING_INTERVAL = 30
 
 # Global MongoDB client
 _mongo_client = None
 _mongodb_available = False
+_init_attempted = False
+_init_lock = threading.Lock()
+_last_ping_ok = 0.0
 
 
 def init_mongodb():
@@ -37,7 +49,7 @@ def init_mongodb():
     Returns:
         bool: True if MongoDB is available, False otherwise
     """
-    global _mongo_client, _mongodb_available
+    global _mongo_client, _mongodb_available, _last_ping_ok
     
     if not USE_MONGODB or not MONGODB_URI:
         print("ℹ️ MongoDB disabled or not configured - using JSON storage")
@@ -52,16 +64,21 @@ def init_mongodb():
             MONGODB_URI,
             serverSelectionTimeoutMS=5000,  # 5 second timeout
             connectTimeoutMS=10000,
-            socketTimeoutMS=10000
+            socketTimeoutMS=10000,
+            maxPoolSize=MONGODB_MAX_POOL_SIZE,
+            minPoolSize=MONGODB_MIN_POOL_SIZE,
+            waitQueueTimeoutMS=1000  # fail fast instead of queueing behind a saturated pool
         )
         
         # Test connection
         _mongo_client.admin.command('ping')
         
+        _last_ping_ok = time.monotonic()
         _mongodb_available = True
         print("✅ MongoDB Atlas connected successfully!")
         print(f"📊 Database: {DB_NAME}")
         
+        ensure_indexes()
         return True
         
     except (ConnectionFailure, ServerSelectionTimeoutError) as e:
@@ -78,15 +95,42 @@ def init_mongodb():
         return False
 
 
+def ensure_indexes():
+    """
+    Create the indexes behind the file search (owner + extension + upload time, newest first).
+    create_index is a no-op for indexes that already exist, so this is safe on every start.
+    """
+    if _mongo_client is None:
+        return
+    try:
+        files = _mongo_client[DB_NAME][FILES_COLLECTION]
+        files.create_index([("owner", ASCENDING), ("ext", ASCENDING), ("uploaded_at_epoch", DESCENDING)])
+        files.create_index([("owner", ASCENDING), ("uploaded_at_epoch", DESCENDING)])
+    except Exception as e:
+        print(f"⚠️ Could not create MongoDB indexes: {e}")
+
+
+def _ensure_init():
+    """Connect on first use; later calls return immediately."""
+    global _init_attempted
+    if _init_attempted:
+        return
+    with _init_lock:
+        if not _init_attempted:
+            init_mongodb()
+            _init_attempted = True
+
+
 def get_database():
     """
-    Get MongoDB database instance.
+    Get MongoDB database instance, connecting on first use.
     
     Returns:
         Database: MongoDB database object or None
     """
     global _mongo_client, _mongodb_available
     
+    _ensure_init()
     if not _mongodb_available or _mongo_client is None:
         return None
     
@@ -120,19 +164,25 @@ def get_collection(collection_name):
 
 def is_mongodb_available():
     """
-    Check if MongoDB is currently available.
+    Check if MongoDB is currently available, connecting on first use.
+    A successful ping is reused for MONGODB_PING_INTERVAL seconds.
     
     Returns:
         bool: True if MongoDB is connected and working
     """
-    global _mongodb_available, _mongo_client
+    global _mongodb_available, _mongo_client, _last_ping_ok
     
+    _ensure_init()
     if not _mongodb_available or _mongo_client is None:
         return False
     
+    now = time.monotonic()
+    if now - _last_ping_ok < MONGODB_PING_INTERVAL:
+        return True
     try:
         # Ping to verify connection is alive
         _mongo_client.admin.command('ping')
+        _last_ping_ok = now
         return True
     except Exception:
         _mongodb_available = False
@@ -165,10 +215,6 @@ SHARES_COLLECTION = "shares"
 ALERTS_COLLECTION = "sent_alerts"
 
 
-# Initialize MongoDB on module import
-init_mongodb()
-
-
 if __name__ == "__main__":
     # Test connection
     print("\n🧪 Testing MongoDB connection...")
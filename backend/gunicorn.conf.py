@@ -0,0 +1,48 @@
+"""
+Gunicorn Configuration
+======================
+Production server settings, picked up automatically by `cd backend && gunicorn`.
+
+Features:
+- Threaded workers (gthread): requests waiting on disk, decryption or a slow client
+  no longer hold the whole worker, and the in-process caches and background
+  queues (tasks.py) keep working without monkeypatching
+- send_file() downloads (ZIPs, shared files) go out through sendfile(2): the kernel copies
+  the bytes, not the worker
+- Encryption key, metadata migration and frontend precompression run once at startup,
+  before workers fork
+- Every setting can be overridden from the environment
+"""
+
+import os
+import subprocess
+import sys
+
+wsgi_app = "app:app"
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5000")
+worker_class = "gthread"
+workers = int(os.getenv("GUNICORN_WORKERS", 2))
+threads = int(os.getenv("GUNICORN_THREADS", 16))
+# Large uploads and streamed ZIP downloads can legitimately take a while
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 120))
+keepalive = 5
+# Werkzeug hands send_file() responses to gunicorn's wsgi.file_wrapper, which then uses
+# os.sendfile(). Downloads are temp files deleted right after the response, so this is
+# used instead of X-Accel-Redirect/X-Sendfile: the proxy would open them too late.
+sendfile = os.getenv("GUNICORN_SENDFILE", "1") != "0"
+accesslog = "-"
+
+
+def on_starting(server):
+    """
+    Create the encryption key, run the data migrations and precompress the frontend once,
+    so workers don't race on first run.
+    Done in a child process: importing the app here would leave its MongoDB client
+    and background threads in the master, to be inherited by every forked worker.
+    """
+    print("\n🔄 Running metadata migration...")
+    subprocess.run(
+        [sys.executable, "-c", "import app; app.run_startup_migrations(); app.precompress_static()"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        check=True,
+    )
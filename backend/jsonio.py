@@ -0,0 +1,113 @@
+"""
+Fast JSON Helpers
+=================
+Thin wrapper around orjson with a fallback to the standard json module.
+
+Features:
+- orjson (C extension) for parsing and serialization when installed
+- Always works with UTF-8 bytes so files can be opened in binary mode
+- Same output shape with or without orjson
+- Large files are parsed straight from a read-only memory map (no read() copy) with orjson
+- Atomic (temp file + rename) writes for crash-safe saves
+- JSON Lines appends in a single O_APPEND write, safe across threads and worker processes
+"""
+
+import os
+import json
+import mmap
+import tempfile
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def loads(data):
+    """Parse JSON from bytes or str."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj, indent=False):
+    """
+    Serialize obj to UTF-8 bytes.
+
+    Args:
+        obj: JSON-serializable object
+        indent (bool): pretty-print with 2 spaces (default: compact)
+
+    Returns:
+        bytes: encoded JSON document
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+    if indent:
+        return json.dumps(obj, indent=2, ensure_ascii=False).encode("utf-8")
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+# Below this size a plain read() is cheaper than setting up a mapping
+MMAP_MIN_SIZE = 256 * 1024
+
+
+def read_json(path, default=None):
+    """Load a JSON file, returning default if it is missing or unreadable."""
+    try:
+        with open(path, "rb") as f:
+            if orjson is not None and os.fstat(f.fileno()).st_size >= MMAP_MIN_SIZE:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    # orjson reads the mapping through the buffer protocol
+                    with memoryview(mm) as view:
+                        return orjson.loads(view)
+            return loads(f.read())
+    except Exception:
+        return default
+
+
+def write_json(path, data, indent=True):
+    """Serialize data once and write it with a single write() call."""
+    with open(path, "wb") as f:
+        f.write(dumps(data, indent=indent))
+
+
+def append_line(path, obj):
+    """
+    Append obj as one JSON Lines record.
+    The line goes out in a single unbuffered O_APPEND write, so concurrent writers
+    (threads or gunicorn workers) never interleave partial lines.
+    """
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, dumps(obj) + b"\n")
+    finally:
+        os.close(fd)
+
+
+def write_json_atomic(path, data, indent=True, fsync=False):
+    """
+    Write data to a temp file in the same directory, then os.replace() it over path.
+    Readers always see either the old or the new document, never a truncated one.
+
+    Args:
+        path (str): destination file
+        data: JSON-serializable object
+        indent (bool): pretty-print with 2 spaces
+        fsync (bool): flush the temp file to disk before the rename
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(dumps(data, indent=indent))
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
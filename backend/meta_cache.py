@@ -0,0 +1,164 @@
+"""
+File Metadata Cache
+===================
+Process-local cache of the file metadata for read-only request handlers.
+
+Features:
+- Reloads only when files.json changes on disk (mtime + size) or this process saves metadata
+- Works the same with MongoDB enabled, since every save also rewrites files.json
+- Secondary indexes (owner -> files, owner -> folder -> files, (owner, original_name) -> file,
+  owner -> extension -> files, owner -> files sorted by upload time) rebuilt on reload,
+  so per-user lookups and search filters scale with that user's matching files
+- Records written before the search fields existed get them computed on load
+- The returned dict is shared between requests: do not modify it.
+  Handlers that edit metadata keep using storage.load_metadata() / save_metadata().
+"""
+
+import os
+import threading
+from bisect import bisect_left, bisect_right
+
+import storage
+
+_cache = {"key": None, "data": None, "owner_files": {}, "by_owner": {}, "by_owner_all": {}, "by_name": {},
+          "by_ext": {}, "by_date": {}}
+# Sorts after any stored name, so (date, _MAX_NAME) is an inclusive upper bound for that date
+_MAX_NAME = "\U0010ffff"
+_lock = threading.Lock()
+
+
+def metadata_key():
+    """Cheap version key of the metadata: changes whenever files.json is saved."""
+    try:
+        st = os.stat(storage.META_FILE)
+        file_key = (st.st_mtime_ns, st.st_size)
+    except OSError:
+        file_key = None
+    return file_key, storage.metadata_version
+
+
+def _build_indexes(meta):
+    """
+    owner_files: owner -> [stored_name], all files (trashed included) in metadata order.
+    by_owner: owner -> folder -> [stored_name], live (not soft-deleted) files only.
+    by_owner_all: same, including files in the trash.
+    by_name: (owner, original_name) -> stored_name, first match in metadata order.
+    by_ext: owner -> lowercase extension ("" if none) -> [stored_name], all files.
+    by_date: owner -> [(uploaded_at, stored_name)] sorted by the ISO upload time string.
+    """
+    owner_files = {}
+    by_owner = {}
+    by_owner_all = {}
+    by_name = {}
+    by_ext = {}
+    by_date = {}
+    for stored, details in meta.items():
+        # meta is this cache's own copy, so records that predate the search fields are
+        # completed here once instead of on every lookup
+        storage.backfill_search_fields(details)
+        owner = details.get("owner")
+        folder = details.get("folder", "/")
+        owner_files.setdefault(owner, []).append(stored)
+        by_name.setdefault((owner, details.get("original_name")), stored)
+        by_owner_all.setdefault(owner, {}).setdefault(folder, []).append(stored)
+        if "deleted_at" not in details:
+            by_owner.setdefault(owner, {}).setdefault(folder, []).append(stored)
+        by_ext.setdefault(owner, {}).setdefault(details["ext"], []).append(stored)
+        by_date.setdefault(owner, []).append((details.get("uploaded_at") or "", stored))
+    for entries in by_date.values():
+        entries.sort()
+    return owner_files, by_owner, by_owner_all, by_name, by_ext, by_date
+
+
+def _refresh():
+    """Reload metadata and indexes if files.json changed; return the current cache state."""
+    key = metadata_key()
+    with _lock:
+        if _cache["data"] is None or _cache["key"] != key:
+            data = storage.load_metadata()
+            owner_files, by_owner, by_owner_all, by_name, by_ext, by_date = _build_indexes(data)
+            # Replace the whole state at once so readers never mix old and new indexes
+            _cache.update(key=key, data=data, owner_files=owner_files, by_owner=by_owner,
+                          by_owner_all=by_owner_all, by_name=by_name, by_ext=by_ext, by_date=by_date)
+        return dict(_cache)
+
+
+def get_metadata_cached():
+    """Return the metadata dict, re-reading it only if it changed since the last call."""
+    return _refresh()["data"]
+
+
+def files_of_owner(owner):
+    """Return [(stored_name, details)] for all of an owner's files, trashed ones included."""
+    state = _refresh()
+    meta = state["data"]
+    return [(stored, meta[stored]) for stored in state["owner_files"].get(owner, [])]
+
+
+def folder_has_files(owner, folder):
+    """True if the owner has any file (trashed ones included) directly in folder."""
+    return bool(_refresh()["by_owner_all"].get(owner, {}).get(folder))
+
+
+def files_in_folder(owner, folder):
+    """Return [(stored_name, details)] for an owner's live files in one folder."""
+    state = _refresh()
+    meta = state["data"]
+    return [(stored, meta[stored]) for stored in state["by_owner"].get(owner, {}).get(folder, [])]
+
+
+def files_under_folder(owner, path):
+    """
+    Return the stored names of an owner's files (trashed ones included) in folder path
+    or any folder below it. Scans the owner's folder names, not the whole metadata.
+    """
+    prefix = path.rstrip("/") + "/"
+    folders = _refresh()["by_owner_all"].get(owner, {})
+    return [stored for folder, names in folders.items()
+            if folder == path or folder.startswith(prefix) for stored in names]
+
+
+def find_by_owner_and_name(owner, original_name):
+    """Return (stored_name, details) for an owner's file by original name, or (None, None)."""
+    state = _refresh()
+    stored = state["by_name"].get((owner, original_name))
+    if stored is None:
+        return None, None
+    return stored, state["data"][stored]
+
+
+def search_candidates(owner, ext=None, folder=None, date_from=None, date_to=None):
+    """
+    Return [(stored_name, details)] for an owner's files (trashed ones included) matching
+    every given filter, using the indexes instead of scanning all of the owner's files.
+
+    Args:
+        owner (str): file owner
+        ext (str): lowercase extension without the dot ("" for files without one)
+        folder (str): exact folder path
+        date_from (str): keep files with uploaded_at >= date_from (ISO string comparison)
+        date_to (str): keep files with uploaded_at <= date_to (ISO string comparison)
+
+    Results follow the order of the most selective filter's index.
+    """
+    state = _refresh()
+    meta = state["data"]
+    lists = []
+    if ext is not None:
+        lists.append(state["by_ext"].get(owner, {}).get(ext, []))
+    if folder is not None:
+        lists.append(state["by_owner_all"].get(owner, {}).get(folder, []))
+    if date_from is not None or date_to is not None:
+        entries = state["by_date"].get(owner, [])
+        lo = bisect_left(entries, (date_from,)) if date_from is not None else 0
+        hi = bisect_right(entries, (date_to, _MAX_NAME)) if date_to is not None else len(entries)
+        lists.append([stored for _, stored in entries[lo:hi]])
+    if not lists:
+        lists.append(state["owner_files"].get(owner, []))
+
+    lists.sort(key=len)
+    names = lists[0]
+    for other in lists[1:]:
+        allowed = set(other)
+        names = [stored for stored in names if stored in allowed]
+    return [(stored, meta[stored]) for stored in names]
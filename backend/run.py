@@ -1,4 +1,5 @@
-from app import app, init_keys
+from app import app, init_keys, run_startup_migrations
 if __name__ == "__main__":
     init_keys()
+    run_startup_migrations()
     app.run(host="0.0.0.0", port=5000, debug=True)
\ No newline at end of file
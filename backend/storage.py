@@ -1,9 +1,18 @@
-import os, json, datetime, smtplib
+import os, re, base64, heapq, hmac, struct, datetime, smtplib, queue, time, tempfile, threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 from cryptography.fernet import Fernet
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 from email.mime.text import MIMEText
 from dotenv import load_dotenv
 from email.message import EmailMessage
 
+import tasks  # background queue for SMTP delivery
+import jsonio  # orjson when available, stdlib json otherwise
+import meta_cache  # parsed metadata reused until files.json changes, for read-only lookups
+
 # MongoDB integration
 try:
     from database import (
@@ -17,7 +26,7 @@ except ImportError:
 
 
 # ---------------- Load Environment ----------------
-BASE_DIR = os.path.dirname(__file__)   # define BASE_DIR again
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))   # define BASE_DIR again
 load_dotenv()  # loads .env from project root automatically
 
 EMAIL_USER = os.getenv("EMAIL_USER")
@@ -25,28 +34,91 @@ EMAIL_PASS = os.getenv("EMAIL_PASS")
 SMTP_SERVER = os.getenv("SMTP_SERVER", "smtp.gmail.com")
 SMTP_PORT = int(os.getenv("SMTP_PORT", 587))
 OTP_EXPIRY = int(os.getenv("OTP_EXPIRY", 180))  # must be OTP_EXPIRY in .env
+MAIL_MAX_RETRIES = int(os.getenv("MAIL_MAX_RETRIES", 5))
+MAIL_RETRY_BACKOFF = float(os.getenv("MAIL_RETRY_BACKOFF", 2))  # seconds, doubled per retry
+SMTP_POOL_SIZE = 4
+SMTP_IDLE_TIMEOUT = 60  # seconds a pooled SMTP connection may sit unused before it is dropped
 
 # ---------------- Paths ----------------
-USERS_FILE = os.path.join(BASE_DIR, "..", "db", "users.json")
-OTP_FILE = os.path.join(BASE_DIR, "..", "db", "otp.json")
-LOG_FILE = os.path.join(BASE_DIR, "..", "db", "access_log.json")
-META_FILE = os.path.join(BASE_DIR, "..", "db", "files.json")
-LOCAL_STORE = os.path.join(BASE_DIR, "..", "local_store")
-TEMP_STORE = os.path.join(BASE_DIR, "..", "temp")
-KEY_FILE = os.path.join(BASE_DIR, "..", "db", "secret.key")
-
-
-# Make sure db directory exists
-os.makedirs(os.path.dirname(USERS_FILE), exist_ok=True)
-os.makedirs(os.path.dirname(META_FILE), exist_ok=True)
-os.makedirs(os.path.dirname(OTP_FILE), exist_ok=True)
-os.makedirs(os.path.dirname(LOG_FILE), exist_ok=True)
-os.makedirs(LOCAL_STORE, exist_ok=True)
-os.makedirs(TEMP_STORE, exist_ok=True)
+# Absolute, normalized paths resolved once at import
+DB_DIR = os.path.normpath(os.path.join(BASE_DIR, "..", "db"))
+USERS_FILE = os.path.join(DB_DIR, "users.json")
+OTP_FILE = os.path.join(DB_DIR, "otp.json")
+LOG_FILE = os.path.join(DB_DIR, "access_log.jsonl")  # JSON Lines, append-only
+LEGACY_LOG_FILE = os.path.join(DB_DIR, "access_log.json")  # pre-JSONL array format
+META_FILE = os.path.join(DB_DIR, "files.json")
+LOCAL_STORE = os.path.normpath(os.path.join(BASE_DIR, "..", "local_store"))
+TEMP_STORE = os.path.normpath(os.path.join(BASE_DIR, "..", "temp"))
+KEY_FILE = os.path.join(DB_DIR, "secret.key")
+SCHEMA_FILE = os.path.join(DB_DIR, "schema.json")  # {store name: migrated schema version}
+
+
+# Data directories are created once here; functions below assume they exist
+for _dir in (DB_DIR, LOCAL_STORE, TEMP_STORE):
+    os.makedirs(_dir, exist_ok=True)
+
+# ---------------- Parsed Store Cache ----------------
+# users.json, files.json and otp.json are re-parsed (or re-read from MongoDB) only when the file
+# changes on disk: every save rewrites the file, MongoDB enabled or not. The cached dicts are
+# never modified; callers get their own copy two levels deep, so they can edit it and save it.
+# Single-record lookups (get_user, get_otp) copy only that record.
+# Saves drop the entry only after MongoDB is written too, so a load racing a save can't keep
+# the old MongoDB data under the new file key.
+_store_cache = {}  # path -> (file key, parsed dict)
+_store_cache_lock = threading.RLock()
+
+def _file_key(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+def _cached_data(path, read):
+    """The shared cached result of read() (do not modify), calling read() again only if path changed."""
+    with _store_cache_lock:
+        key = _file_key(path)
+        cached = _store_cache.get(path)
+        if key is None or cached is None or cached[0] != key:
+            # Stat taken before the read: a concurrent write makes the next call reload
+            cached = (key or _file_key(path), read())
+            _store_cache[path] = cached
+        return cached[1]
+
+def _cached_load(path, read):
+    """Return a copy of read()'s result, calling read() again only if path changed."""
+    data = _cached_data(path, read)
+    return {k: dict(v) if isinstance(v, dict) else v for k, v in data.items()}
+
+def _cached_get(path, read, key):
+    """Return a copy of one record of read()'s result (None if missing), without copying the map."""
+    value = _cached_data(path, read).get(key)
+    return dict(value) if isinstance(value, dict) else value
+
+def _invalidate_cache(path):
+    with _store_cache_lock:
+        _store_cache.pop(path, None)
 
 # ---------------- User Helpers ----------------
 def load_users():
-    """Load users map from MongoDB or JSON file. Returns {} if not present."""
+    """
+    Load users map from MongoDB or JSON file. Returns {} if not present.
+    Cached until users.json changes (see _cached_load).
+    """
+    return _cached_load(USERS_FILE, _read_users)
+
+def get_user(email):
+    """Return a copy of one user's record, or None. Cached like load_users()."""
+    return _cached_get(USERS_FILE, _read_users, email)
+
+def save_user(email, user):
+    """Store one user's record: the users map is reloaded, updated and saved."""
+    users = load_users()
+    users[email] = user
+    save_users(users)
+
+def _read_users():
+    """Read the users map from MongoDB, falling back to users.json."""
     # Try MongoDB first
     if MONGODB_ENABLED and is_mongodb_available():
         try:
@@ -66,19 +138,17 @@ def load_users():
     
     # Fallback to JSON
     if not os.path.exists(USERS_FILE):
-        with open(USERS_FILE, "w", encoding="utf-8") as f:
-            json.dump({}, f)
-    with open(USERS_FILE, "r", encoding="utf-8") as f:
-        try:
-            return json.load(f)
-        except Exception:
-            return {}
+        jsonio.write_json_atomic(USERS_FILE, {}, indent=False)
+    return jsonio.read_json(USERS_FILE, default={})
 
 def save_users(users):
     """Save users to both MongoDB and JSON file."""
-    # Save to JSON (backup)
-    with open(USERS_FILE, "w", encoding="utf-8") as f:
-        json.dump(users, f, indent=2)
+    _save_users(users)
+    _invalidate_cache(USERS_FILE)
+
+def _save_users(users):
+    # Save to JSON (backup); temp file + rename so a crash never leaves a truncated users.json
+    jsonio.write_json_atomic(USERS_FILE, users)
     
     # Save to MongoDB if available
     if MONGODB_ENABLED and is_mongodb_available():
@@ -99,113 +169,361 @@ def save_users(users):
             print(f"⚠️ MongoDB write error: {e}")
 
 
+# ---------------- SMTP Connection Pool ----------------
+# Logged-in SMTP sessions are reused so each mail skips the TCP + STARTTLS + AUTH round trips.
+# LIFO so the most recently used (least likely to have timed out) connection is picked first.
+_smtp_pool = queue.LifoQueue(maxsize=SMTP_POOL_SIZE)
+
+def _smtp_close(server):
+    try:
+        server.quit()
+    except Exception:
+        server.close()
+
+def _smtp_connect():
+    server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT, timeout=30)
+    try:
+        server.starttls()
+        server.login(EMAIL_USER, EMAIL_PASS)
+    except Exception:
+        server.close()
+        raise
+    return server
+
+@contextmanager
+def smtp_connection():
+    """
+    Borrow a logged-in SMTP connection from the pool, opening a new one if none is usable.
+    It goes back to the pool on success and is closed if the send raised.
+    """
+    server = None
+    while server is None:
+        try:
+            pooled, last_used = _smtp_pool.get_nowait()
+        except queue.Empty:
+            server = _smtp_connect()
+            break
+        if time.monotonic() - last_used > SMTP_IDLE_TIMEOUT:
+            _smtp_close(pooled)
+            continue
+        try:
+            if pooled.noop()[0] == 250:
+                server = pooled
+                continue
+        except smtplib.SMTPException:
+            pass
+        except OSError:
+            pass
+        _smtp_close(pooled)
+
+    try:
+        yield server
+    except Exception:
+        _smtp_close(server)
+        raise
+    try:
+        _smtp_pool.put_nowait((server, time.monotonic()))
+    except queue.Full:
+        _smtp_close(server)
+
+
 # ---------------- OTP Helpers ----------------
+def _deliver_email(to_email, subject, message):
+    """Send a simple text email over SMTP. Raises on failure."""
+    msg = MIMEText(message)
+    msg["Subject"] = subject
+    msg["From"] = EMAIL_USER
+    msg["To"] = to_email
+
+    with smtp_connection() as server:
+        server.send_message(msg)
+    print(f"📧 Email sent to {to_email}")
+
+
 def send_email(to_email, subject, message):
-    """Send a simple text email. Uses SMTP settings from env."""
+    """Send a simple text email and wait for the result. Uses SMTP settings from env."""
     if not EMAIL_USER or not EMAIL_PASS:
         print("❌ Email credentials not configured (EMAIL_USER / EMAIL_PASS missing).")
         return False
     try:
-        msg = MIMEText(message)
-        msg["Subject"] = subject
-        msg["From"] = EMAIL_USER
-        msg["To"] = to_email
-
-        with smtplib.SMTP(SMTP_SERVER, SMTP_PORT, timeout=30) as server:
-            server.starttls()
-            server.login(EMAIL_USER, EMAIL_PASS)
-            server.send_message(msg)
-        print(f"📧 Email sent to {to_email}")
+        _deliver_email(to_email, subject, message)
         return True
     except Exception as e:
         print("❌ Email sending failed:", str(e))
         return False
 
+
+def queue_email(to_email, subject, message):
+    """
+    Send a simple text email from the background "mail" queue and return immediately.
+    SMTP and network errors are retried with exponential backoff.
+    Returns False only if email is not configured.
+    """
+    if not EMAIL_USER or not EMAIL_PASS:
+        print("❌ Email credentials not configured (EMAIL_USER / EMAIL_PASS missing).")
+        return False
+    tasks.enqueue(
+        "mail", _deliver_email, to_email, subject, message,
+        retry_on=(smtplib.SMTPException, OSError),
+        max_retries=MAIL_MAX_RETRIES,
+        backoff=MAIL_RETRY_BACKOFF
+    )
+    return True
+
+def _read_otps():
+    data = jsonio.read_json(OTP_FILE, default={})
+    return data if isinstance(data, dict) else {}
+
+def load_otps():
+    """Return {email: {"otp", "created_at"}}, cached until otp.json changes (see _cached_load)."""
+    return _cached_load(OTP_FILE, _read_otps)
+
+def get_otp(email):
+    """Return a copy of one user's OTP record, or None. Cached like load_otps()."""
+    return _cached_get(OTP_FILE, _read_otps, email)
+
+# Min-heap of (expires at, email, created_at) over the OTP records, so save_otp() evicts expired
+# codes in O(log N) each instead of parsing every record. Entries for replaced or deleted codes
+# are skipped when popped. Rebuilt only when otp.json was last written by another process.
+_otp_heap = []
+_otp_heap_key = None
+_otp_lock = threading.RLock()
+
+def _iso_to_epoch(value):
+    """Unix seconds of an ISO8601 UTC string (trailing "Z" or naive), or -1 if it can't be parsed."""
+    try:
+        dt = datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except (AttributeError, TypeError, ValueError):
+        return -1
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=datetime.timezone.utc)
+    return int(dt.timestamp())
+
+def _otp_expires_at(record):
+    """Unix time an OTP record expires at; 0 (already expired) if its creation time is unreadable."""
+    created = record.get("created_epoch")
+    if created is None:
+        # Written before created_epoch existed
+        created = _iso_to_epoch(record.get("created_at"))
+    return created + OTP_EXPIRY if created >= 0 else 0
+
+def _save_otps(data):
+    global _otp_heap_key
+    with _otp_lock:
+        jsonio.write_json_atomic(OTP_FILE, data)
+        _invalidate_cache(OTP_FILE)
+        _otp_heap_key = _file_key(OTP_FILE)
+
 def save_otp(email, otp_code):
     """Save OTP (with created_at) and send it to the user's email."""
-    os.makedirs(os.path.dirname(OTP_FILE), exist_ok=True)
-    data = {}
-    if os.path.exists(OTP_FILE):
-        with open(OTP_FILE, "r", encoding="utf-8") as f:
-            try:
-                data = json.load(f)
-            except Exception:
-                data = {}
+    global _otp_heap
+    with _otp_lock:
+        data = load_otps()
+        if _otp_heap_key is None or _otp_heap_key != _file_key(OTP_FILE):
+            _otp_heap = [(_otp_expires_at(record), user, record.get("created_at")) for user, record in data.items()]
+            heapq.heapify(_otp_heap)
 
-    # Clean expired OTPs
-    now = datetime.datetime.now(datetime.timezone.utc)
-    for user, record in list(data.items()):
-        try:
-            created_at = datetime.datetime.fromisoformat(record.get("created_at"))
-            if (now - created_at).total_seconds() > OTP_EXPIRY:
-                data.pop(user, None)
-        except Exception:
-            data.pop(user, None)
+        # Clean expired OTPs
+        now = datetime.datetime.now(datetime.timezone.utc)
+        now_ts = now.timestamp()
+        while _otp_heap and _otp_heap[0][0] < now_ts:
+            _, user, created_at = heapq.heappop(_otp_heap)
+            record = data.get(user)
+            if record is not None and record.get("created_at") == created_at:
+                data.pop(user)
 
-    data[email] = {
-        "otp": str(otp_code),
-        "created_at": now.replace(microsecond=0, tzinfo=None).isoformat() + 'Z'
-    }
-    with open(OTP_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
+        record = {
+            "otp": str(otp_code),
+            "created_at": now.replace(microsecond=0, tzinfo=None).isoformat() + 'Z',
+            # Unix seconds of created_at, so expiry checks are integer math
+            "created_epoch": int(now_ts)
+        }
+        data[email] = record
+        heapq.heappush(_otp_heap, (_otp_expires_at(record), email, record["created_at"]))
+        _save_otps(data)
 
-    # Send OTP via email
-    sent = send_email(email, "Your OTP Code", f"Your OTP is: {otp_code}")
+    # Send OTP via email (background queue, the request does not wait for SMTP)
+    sent = queue_email(email, "Your OTP Code", f"Your OTP is: {otp_code}")
     if not sent:
         print(f"⚠️ Unable to send OTP email to {email} (check SMTP settings).")
 
 def verify_otp(email, otp_code):
-    """Validate OTP: existence and not expired."""
-    if not os.path.exists(OTP_FILE):
-        return False
-
-    try:
-        with open(OTP_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-    except Exception:
+    """
+    Validate OTP: existence and not expired. Reads the cached OTP map (no file parse unless
+    otp.json changed) and compares codes in constant time.
+    """
+    input_otp = str(otp_code or "").strip()
+    if not input_otp:
         return False
-
-    record = data.get(email)
+    record = get_otp(email)
     if not record:
         return False
 
-    try:
-        created_at = datetime.datetime.fromisoformat(record.get("created_at"))
-    except Exception:
-        return False
-
-    now = datetime.datetime.now(datetime.timezone.utc)
-    if (now - created_at).total_seconds() > OTP_EXPIRY:
+    if time.time() > _otp_expires_at(record):
         return False
 
     stored_otp = str(record.get("otp", "")).strip()
-    input_otp = str(otp_code or "").strip()
-    return stored_otp == input_otp
+    return hmac.compare_digest(stored_otp.encode("utf-8"), input_otp.encode("utf-8"))
+
+def delete_otp(email):
+    """Remove a user's OTP once it has been used."""
+    with _otp_lock:
+        data = load_otps()
+        if email in data:
+            data.pop(email)
+            _save_otps(data)
+
+# ---------------- Encryption (AES-GCM, Fernet for older files) ----------------
+# Stored file format: a header (magic, plaintext chunk size, random 8-byte nonce prefix), then
+# one AES-GCM record (ciphertext + 16-byte tag) per chunk. Chunk i is sealed with nonce
+# prefix + i, and the last chunk with different associated data, so reordered, dropped or
+# truncated chunks fail to decrypt. Files are encrypted and decrypted one chunk at a time,
+# never fully in memory. Files stored before this format are single Fernet tokens.
+FILE_MAGIC = b"SCE1"
+FILE_CHUNK_SIZE = 1024 * 1024
+_FILE_HEADER = struct.Struct(">4sI8s")
+_GCM_TAG_SIZE = 16
+_AAD_MORE = b"\x00"
+_AAD_LAST = b"\x01"
+
+def _derive_file_key(key):
+    """AES-256 key for stored files, derived from the Fernet key so KEY_FILE stays the only secret."""
+    return HKDF(algorithm=hashes.SHA256(), length=32, salt=None,
+                info=b"securecloud file encryption v1").derive(base64.urlsafe_b64decode(key))
+
+def _create_key_file():
+    """
+    Write a new key to KEY_FILE, complete and synced to disk before it becomes visible.
+    os.link() fails if the file exists, so when several processes start at once only the
+    first key is kept and the others read it.
+    """
+    fd, tmp_path = tempfile.mkstemp(prefix=".secret.", suffix=".tmp", dir=DB_DIR)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(Fernet.generate_key())
+            f.flush()
+            os.fsync(f.fileno())
+        os.link(tmp_path, KEY_FILE)
+        print("🔐 Generated new encryption key")
+    except FileExistsError:
+        pass
+    finally:
+        os.remove(tmp_path)
 
-# ---------------- Encryption (Fernet) ----------------
 def init_keys():
-    """Initialize or load a Fernet key stored at KEY_FILE and return a Fernet instance."""
-    os.makedirs(os.path.dirname(KEY_FILE), exist_ok=True)
+    """
+    Initialize or load a Fernet key stored at KEY_FILE and return a Fernet instance
+    (used for files stored before AES-GCM). Also sets the AES-GCM file cipher.
+    """
+    global file_cipher
     if not os.path.exists(KEY_FILE):
-        key = Fernet.generate_key()
-        with open(KEY_FILE, "wb") as f:
-            f.write(key)
-        print("🔐 Generated new encryption key")
-    else:
-        with open(KEY_FILE, "rb") as f:
-            key = f.read()
+        _create_key_file()
+    with open(KEY_FILE, "rb") as f:
+        key = f.read()
     try:
-        return Fernet(key)
+        f = Fernet(key)
     except Exception as e:
         print("❌ Failed to initialize Fernet with key:", e)
         raise
+    file_cipher = AESGCM(_derive_file_key(key))
+    return f
+
+def decrypted_size(stored_filename):
+    """
+    Plaintext size of a stored file, from its length and header without decrypting.
+    None for files stored as Fernet tokens or missing files.
+    """
+    try:
+        with open(os.path.join(LOCAL_STORE, stored_filename), "rb") as f:
+            header = f.read(_FILE_HEADER.size)
+            size = os.fstat(f.fileno()).st_size
+    except OSError:
+        return None
+    if len(header) < _FILE_HEADER.size or header[:4] != FILE_MAGIC:
+        return None
+    chunk_size = _FILE_HEADER.unpack(header)[1]
+    body = size - _FILE_HEADER.size
+    records = max(1, -(-body // (chunk_size + _GCM_TAG_SIZE)))
+    return body - records * _GCM_TAG_SIZE
+
+def _read_full(stream, size):
+    """Read size bytes, looping over short reads; fewer only at the end of the stream."""
+    data = stream.read(size)
+    while data and len(data) < size:
+        more = stream.read(size - len(data))
+        if not more:
+            break
+        data += more
+    return data
+
+def _nonce(prefix, counter):
+    return prefix + counter.to_bytes(4, "big")
+
+def _encrypt_stream(stream, out, limit=None, chunk_size=FILE_CHUNK_SIZE):
+    """
+    Encrypt stream into the binary file out, one chunk in memory at a time.
+    Returns the plaintext size; stops early (returning a size > limit) once more than
+    limit bytes have been read, leaving out incomplete.
+    """
+    prefix = os.urandom(8)
+    out.write(_FILE_HEADER.pack(FILE_MAGIC, chunk_size, prefix))
+    size = 0
+    counter = 0
+    chunk = _read_full(stream, chunk_size)
+    while True:
+        size += len(chunk)
+        if limit is not None and size > limit:
+            return size
+        # One chunk of lookahead tells whether this one is the last
+        following = _read_full(stream, chunk_size) if len(chunk) == chunk_size else b""
+        last = not following
+        out.write(file_cipher.encrypt(_nonce(prefix, counter), chunk, _AAD_LAST if last else _AAD_MORE))
+        if last:
+            return size
+        chunk = following
+        counter += 1
+
+def iter_decrypted_chunks(stored_filename):
+    """
+    Yield the plaintext of LOCAL_STORE/stored_filename, one chunk at a time, so it can be
+    streamed to a response without a decrypted copy on disk.
+    Raises FileNotFoundError if the file is missing, and cryptography's InvalidTag /
+    InvalidToken if it was tampered with or truncated (possibly after earlier chunks).
+    """
+    with open(os.path.join(LOCAL_STORE, stored_filename), "rb") as f:
+        header = f.read(_FILE_HEADER.size)
+        if len(header) < _FILE_HEADER.size or header[:4] != FILE_MAGIC:
+            # Stored before chunked AES-GCM: one Fernet token
+            yield fernet.decrypt(header + f.read())
+            return
+        _, chunk_size, prefix = _FILE_HEADER.unpack(header)
+        record_size = chunk_size + _GCM_TAG_SIZE
+        record = f.read(record_size)
+        counter = 0
+        while True:
+            following = f.read(record_size) if len(record) == record_size else b""
+            last = not following
+            yield file_cipher.decrypt(_nonce(prefix, counter), record, _AAD_LAST if last else _AAD_MORE)
+            if last:
+                return
+            record = following
+            counter += 1
 
 # initialize module-level fernet (app can call init_keys() too)
 fernet = init_keys()
 
 # ---------------- File Metadata ----------------
+# Bumped on every save_metadata() so in-process caches (meta_cache.py) reload
+metadata_version = 0
+
 def load_metadata():
-    """Return metadata dict stored in MongoDB or META_FILE (create if missing)."""
+    """
+    Return metadata dict stored in MongoDB or META_FILE (create if missing).
+    Cached until files.json changes (see _cached_load); the copy is the caller's to edit.
+    """
+    return _cached_load(META_FILE, _read_metadata)
+
+def _read_metadata():
     # Try MongoDB first
     if MONGODB_ENABLED and is_mongodb_available():
         try:
@@ -223,22 +541,51 @@ def load_metadata():
             print(f"⚠️ MongoDB read error: {e}, falling back to JSON")
     
     # Fallback to JSON
-    os.makedirs(os.path.dirname(META_FILE), exist_ok=True)
     if not os.path.exists(META_FILE):
-        with open(META_FILE, "w", encoding="utf-8") as f:
-            json.dump({}, f)
-    with open(META_FILE, "r", encoding="utf-8") as f:
-        try:
-            return json.load(f)
-        except Exception:
-            return {}
+        jsonio.write_json_atomic(META_FILE, {}, indent=False)
+    return jsonio.read_json(META_FILE, default={})
+
+def search_metadata_mongo(owner, query="", ext=None, epoch_from=None, epoch_to=None, offset=0, limit=50):
+    """
+    Search an owner's files in MongoDB, newest first, with filtering, sorting and paging done
+    server-side on the (owner, ext, uploaded_at_epoch) index (see database.ensure_indexes).
+
+    Returns:
+        tuple: ([(stored_name, details)] for the requested page, total match count),
+        or None when MongoDB is not in use or the query failed (callers search locally).
+    """
+    if not (MONGODB_ENABLED and is_mongodb_available()):
+        return None
+    try:
+        collection = get_collection(FILES_COLLECTION)
+        if collection is None:
+            return None
+        flt = {"owner": owner}
+        if ext is not None:
+            flt["ext"] = ext
+        if epoch_from is not None or epoch_to is not None:
+            # -1 marks an unknown upload time, which never matches a date filter
+            epoch_range = {"$gte": max(epoch_from or 0, 0)}
+            if epoch_to is not None:
+                epoch_range["$lte"] = epoch_to
+            flt["uploaded_at_epoch"] = epoch_range
+        if query:
+            flt["original_name_lower"] = {"$regex": re.escape(query)}
+        total = collection.count_documents(flt)
+        cursor = collection.find(flt, {"_id": 0}).sort("uploaded_at_epoch", -1).skip(offset).limit(limit)
+        return [(doc.pop("_key", None), doc) for doc in cursor], total
+    except Exception as e:
+        print(f"⚠️ MongoDB search error: {e}, falling back to local search")
+        return None
 
 def save_metadata(data):
     """Save metadata to both MongoDB and JSON file."""
+    _save_metadata(data)
+    _invalidate_cache(META_FILE)
+
+def _save_metadata(data):
     # Save to JSON (backup)
-    os.makedirs(os.path.dirname(META_FILE), exist_ok=True)
-    with open(META_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
+    jsonio.write_json_atomic(META_FILE, data)
     
     # Save to MongoDB if available
     if MONGODB_ENABLED and is_mongodb_available():
@@ -257,72 +604,277 @@ def save_metadata(data):
         except Exception as e:
             print(f"⚠️ MongoDB write error: {e}")
 
+    global metadata_version
+    metadata_version += 1
+
+# ---------------- Schema Versions ----------------
+# Kept next to the data instead of inside it, so files.json stays a plain {stored_name: details} map.
+# Read once per process: a version only ever goes up, and a stale lower value just means
+# the caller re-checks its data.
+_schema_versions = None
+
+def get_schema_version(name):
+    """Return the schema version recorded for a store (e.g. "files"), 0 if never migrated."""
+    global _schema_versions
+    if _schema_versions is None:
+        _schema_versions = jsonio.read_json(SCHEMA_FILE, default={})
+    return _schema_versions.get(name, 0)
+
+def set_schema_version(name, version):
+    """Record that a store has been migrated to the given schema version."""
+    global _schema_versions
+    versions = jsonio.read_json(SCHEMA_FILE, default={})
+    versions[name] = version
+    jsonio.write_json_atomic(SCHEMA_FILE, versions)
+    _schema_versions = versions
+
 # ---------------- File Handling ----------------
-def encrypt_file_and_store(filepath, filename, user_email, folder="/"):
-    """Encrypt a local file and store it in LOCAL_STORE. Update metadata and return info."""
-    os.makedirs(LOCAL_STORE, exist_ok=True)
-    safe_name = f"{user_email.replace('@','_at_')}_{filename}"
-    save_path = os.path.join(LOCAL_STORE, safe_name)
+def search_fields(filename):
+    """Lowercase name and extension stored with each file so searches don't recompute them."""
+    lower = filename.lower()
+    return {
+        "original_name_lower": lower,
+        "ext": lower.rsplit(".", 1)[-1] if "." in lower else ""
+    }
 
-    with open(filepath, "rb") as f:
-        data = f.read()
-    encrypted = fernet.encrypt(data)
+def backfill_search_fields(details):
+    """
+    Add the search fields (search_fields() and uploaded_at_epoch) to a record written before
+    they existed, in place. migrate_metadata_folders() stores them for good, but only runs
+    at startup under app.py's __main__ and gunicorn, not when app is imported (run.py).
+    """
+    if "ext" not in details or "original_name_lower" not in details:
+        details.update(search_fields(details.get("original_name") or ""))
+    if "uploaded_at_epoch" not in details:
+        details["uploaded_at_epoch"] = _iso_to_epoch(details.get("uploaded_at"))
 
-    with open(save_path, "wb") as f:
-        f.write(encrypted)
+# Shared by the bulk upload/download paths to encrypt or decrypt several files at once.
+# The cryptography backend releases the GIL, so the work spreads over cores.
+FILE_WORKERS = int(os.getenv("FILE_WORKERS", min(8, os.cpu_count() or 1)))
+_file_pool = ThreadPoolExecutor(max_workers=FILE_WORKERS, thread_name_prefix="file-crypto")
 
-    # remove the original uploaded temp file if it exists
+def _stored_name(filename, user_email):
+    return f"{user_email.replace('@','_at_')}_{filename}"
+
+def stage_encrypted_upload(stream, limit=None, chunk_size=FILE_CHUNK_SIZE):
+    """
+    Encrypt a plaintext stream into a temp file in LOCAL_STORE, not yet visible as a stored file.
+    Returns (temp path, size), or (None, bytes read) if the stream is larger than limit bytes.
+    Pass the temp path to commit_staged_uploads or discard_staged_uploads.
+    """
+    fd, tmp_path = tempfile.mkstemp(prefix=".upload.", suffix=".tmp", dir=LOCAL_STORE)
     try:
-        if os.path.exists(filepath):
-            os.remove(filepath)
-    except Exception as e:
-        print("⚠️ Could not remove temp upload file:", e)
+        with os.fdopen(fd, "wb") as out:
+            size = _encrypt_stream(stream, out, limit=limit, chunk_size=chunk_size)
+        if limit is not None and size > limit:
+            os.remove(tmp_path)
+            return None, size
+    except BaseException:
+        discard_staged_uploads([tmp_path])
+        raise
+    return tmp_path, size
+
+def discard_staged_uploads(tmp_paths):
+    """Delete staged temp files. Missing files are ignored."""
+    for tmp_path in tmp_paths:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
 
+def commit_staged_uploads(staged, user_email, folder="/"):
+    """
+    Move staged uploads into place and add their metadata records with a single load/save.
+
+    Args:
+        staged (list): (temp path, filename, size) from stage_encrypted_upload
+        user_email (str): owner
+        folder (str): destination folder for every file
+
+    Returns:
+        list: info dict per upload, in order
+    """
     meta = load_metadata()
-    meta[safe_name] = {
+    results = []
+    for tmp_path, filename, size in staged:
+        safe_name = _stored_name(filename, user_email)
+        os.replace(tmp_path, os.path.join(LOCAL_STORE, safe_name))
+        meta[safe_name] = _metadata_record(filename, user_email, folder, size)
+        results.append({"stored_as": safe_name, "original": filename, "owner": user_email, "folder": folder})
+    if staged:
+        save_metadata(meta)
+    return results
+
+def _encrypt_to_store(stream, filename, user_email, limit=None, chunk_size=FILE_CHUNK_SIZE):
+    """
+    Encrypt a plaintext stream into LOCAL_STORE (no metadata change).
+    Returns (stored name, size), or (None, bytes read) if the stream is larger than limit bytes.
+    The file is written under a temp name and renamed into place, so a failed or oversized
+    upload never replaces an existing file.
+    """
+    tmp_path, size = stage_encrypted_upload(stream, limit=limit, chunk_size=chunk_size)
+    if tmp_path is None:
+        return None, size
+    safe_name = _stored_name(filename, user_email)
+    os.replace(tmp_path, os.path.join(LOCAL_STORE, safe_name))
+    return safe_name, size
+
+def _metadata_record(filename, user_email, folder, size):
+    now = datetime.datetime.utcnow()
+    return {
         "owner": user_email,
         "original_name": filename,
-        "uploaded_at": datetime.datetime.utcnow().isoformat() + 'Z',
+        "uploaded_at": now.isoformat() + 'Z',
+        # Unix seconds of uploaded_at, so date filters compare ints instead of parsing
+        "uploaded_at_epoch": int(now.replace(tzinfo=datetime.timezone.utc).timestamp()),
         "folder": folder,
-        "size": len(data)
+        "size": size,
+        **search_fields(filename)
     }
+
+def _store_encrypted(stream, filename, user_email, folder, limit=None, chunk_size=FILE_CHUNK_SIZE):
+    """
+    Encrypt a plaintext stream into LOCAL_STORE and add the metadata record.
+    Returns (info, size), or (None, bytes read) if the stream is larger than limit bytes.
+    """
+    safe_name, size = _encrypt_to_store(stream, filename, user_email, limit=limit, chunk_size=chunk_size)
+    if safe_name is None:
+        return None, size
+
+    meta = load_metadata()
+    meta[safe_name] = _metadata_record(filename, user_email, folder, size)
     save_metadata(meta)
 
-    return {"stored_as": safe_name, "original": filename, "owner": user_email, "folder": folder}
+    return {"stored_as": safe_name, "original": filename, "owner": user_email, "folder": folder}, size
+
+def encrypt_file_and_store(filepath, filename, user_email, folder="/"):
+    """Encrypt a local file and store it in LOCAL_STORE. Update metadata and return info."""
+    with open(filepath, "rb") as f:
+        info, _ = _store_encrypted(f, filename, user_email, folder)
+
+    # remove the original uploaded temp file if it exists
+    try:
+        if os.path.exists(filepath):
+            os.remove(filepath)
+    except Exception as e:
+        print("⚠️ Could not remove temp upload file:", e)
+
+    return info
+
+def encrypt_stream_and_store(stream, filename, user_email, folder="/", limit=None, chunk_size=FILE_CHUNK_SIZE):
+    """
+    Encrypt an upload stream chunk by chunk into LOCAL_STORE, without writing the plaintext
+    to disk or holding the whole file in memory.
+    Returns (info, size), or (None, size_read) if the stream is larger than limit bytes.
+    """
+    return _store_encrypted(stream, filename, user_email, folder, limit=limit, chunk_size=chunk_size)
+
+def encrypt_streams_and_store(uploads, user_email, folder="/"):
+    """
+    Store several uploads at once: streams are read and encrypted in parallel on the file
+    pool, then all metadata records are saved with a single load/save.
+
+    Args:
+        uploads (list): (stream, filename) pairs; a repeated filename keeps its last upload,
+            as if they had been stored one after the other
+        user_email (str): owner
+        folder (str): destination folder for every file
+
+    Returns:
+        list: per upload, in order, (info, None) on success or (None, error message)
+    """
+    def encrypt_one(stream, filename):
+        return _encrypt_to_store(stream, filename, user_email)
+
+    last = {filename: i for i, (_, filename) in enumerate(uploads)}
+    futures = {i: _file_pool.submit(encrypt_one, stream, filename)
+               for i, (stream, filename) in enumerate(uploads) if last[filename] == i}
+
+    stored = {}
+    errors = {}
+    for i, future in futures.items():
+        try:
+            stored[i] = future.result()
+        except Exception as e:
+            errors[i] = str(e)
+
+    if stored:
+        meta = load_metadata()
+        for i, (safe_name, size) in stored.items():
+            meta[safe_name] = _metadata_record(uploads[i][1], user_email, folder, size)
+        save_metadata(meta)
+
+    results = []
+    for i, (_, filename) in enumerate(uploads):
+        j = last[filename]
+        if j in errors:
+            results.append((None, errors[j]))
+        else:
+            info = {"stored_as": stored[j][0], "original": filename, "owner": user_email, "folder": folder}
+            results.append((info, None))
+    return results
+
+def temp_output_path(name):
+    """
+    Path for a decrypted copy: TEMP_STORE/<unique dir>/<name>. Keeps the original file name
+    while concurrent downloads of the same file never share (or delete) each other's copy.
+    """
+    return os.path.join(tempfile.mkdtemp(dir=TEMP_STORE), name)
+
+def remove_temp_output(path):
+    """Delete a decrypted copy and its per-call directory. Missing files are ignored."""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        return False
+    parent = os.path.dirname(path)
+    if os.path.dirname(os.path.abspath(parent)) == os.path.abspath(TEMP_STORE):
+        try:
+            os.rmdir(parent)
+        except OSError:
+            pass
+    return True
+
+def find_user_file(filename, user_email):
+    """
+    Return (stored_name, details) of a user's file by original name, falling back to the
+    stored name, from the cached metadata; (None, None) if missing or not owned.
+    """
+    stored_filename, record = meta_cache.find_by_owner_and_name(user_email, filename)
+    if record is None:
+        record = meta_cache.get_metadata_cached().get(filename)
+        if not record or record.get("owner") != user_email:
+            return None, None
+        stored_filename = filename
+    return stored_filename, record
 
 def decrypt_and_get_file(filename, user_email):
     """
     Decrypt a stored file for the given owner+original name and write to TEMP_STORE.
     Returns the path to the temporary decrypted file (caller should remove it).
     """
-    meta = load_metadata()
-    record = None
-    stored_filename = None
-    for stored, details in meta.items():
-        if details.get("original_name") == filename and details.get("owner") == user_email:
-            record = details
-            stored_filename = stored
-            break
+    stored_filename, record = meta_cache.find_by_owner_and_name(user_email, filename)
     if not record:
         return None
 
+    return _decrypt_to_temp(stored_filename, record["original_name"])
+
+def _decrypt_to_temp(stored_filename, original_name):
+    """Decrypt LOCAL_STORE/stored_filename into a fresh temp path. Returns the path or None."""
     save_path = os.path.join(LOCAL_STORE, stored_filename)
     if not os.path.exists(save_path):
         return None
 
-    with open(save_path, "rb") as f:
-        encrypted = f.read()
+    out_file = temp_output_path(original_name)
     try:
-        decrypted = fernet.decrypt(encrypted)
+        with open(out_file, "wb") as f:
+            for chunk in iter_decrypted_chunks(stored_filename):
+                f.write(chunk)
     except Exception as e:
-        print("❌ Decryption failed:", e)
+        print(f"❌ Decryption failed for {stored_filename}: {e!r}")
+        remove_temp_output(out_file)
         return None
 
-    os.makedirs(TEMP_STORE, exist_ok=True)
-    out_file = os.path.join(TEMP_STORE, record["original_name"])
-    with open(out_file, "wb") as f:
-        f.write(decrypted)
-
     return out_file
 
 def decrypt_and_get_file_by_stored_name(stored_filename, user_email):
@@ -330,83 +882,66 @@ def decrypt_and_get_file_by_stored_name(stored_filename, user_email):
     Decrypt a file using the stored filename directly.
     Returns the path to the temporary decrypted file (caller should remove it).
     """
-    meta = load_metadata()
-    record = meta.get(stored_filename)
+    record = meta_cache.get_metadata_cached().get(stored_filename)
     
     if not record or record.get("owner") != user_email:
         return None
 
-    save_path = os.path.join(LOCAL_STORE, stored_filename)
-    if not os.path.exists(save_path):
-        return None
-
-    with open(save_path, "rb") as f:
-        encrypted = f.read()
-    try:
-        decrypted = fernet.decrypt(encrypted)
-    except Exception as e:
-        print("❌ Decryption failed:", e)
-        return None
-
-    os.makedirs(TEMP_STORE, exist_ok=True)
-    out_file = os.path.join(TEMP_STORE, record["original_name"])
-    with open(out_file, "wb") as f:
-        f.write(decrypted)
+    return _decrypt_to_temp(stored_filename, record["original_name"])
 
-    return out_file
+def _resolve_stored_name(meta, filename, user_email):
+    """
+    Stored name of a user's file given its stored name or original name, or None.
+    Both are hash lookups: meta itself, then the (owner, original_name) index in meta_cache,
+    checked against meta since the caller may have changed it (e.g. batch deletes).
+    """
+    details = meta.get(filename)
+    if details is not None and details["owner"] == user_email:
+        return filename
+    stored, _ = meta_cache.find_by_owner_and_name(user_email, filename)
+    details = meta.get(stored) if stored is not None else None
+    if details is not None and details["owner"] == user_email and details["original_name"] == filename:
+        return stored
+    return None
 
 def delete_file(filename, user_email):
     """Soft delete file by setting deleted_at timestamp. Returns True if deleted."""
     meta = load_metadata()
-    to_delete = None
-    
-    # Try to find by stored name first, then by original name
-    for stored_name, details in meta.items():
-        if details["owner"] == user_email:
-            if stored_name == filename or details["original_name"] == filename:
-                to_delete = stored_name
-                break
+    to_delete = _resolve_stored_name(meta, filename, user_email)
 
     if not to_delete:
         return False
 
     # Soft delete: set timestamp instead of removing
-    import datetime
-    meta[to_delete]["deleted_at"] = datetime.datetime.utcnow().isoformat() + 'Z'
+    now = datetime.datetime.utcnow()
+    meta[to_delete]["deleted_at"] = now.isoformat() + 'Z'
+    # Unix seconds of deleted_at, so the trash cleanup compares ints instead of parsing
+    meta[to_delete]["deleted_at_epoch"] = int(now.replace(tzinfo=datetime.timezone.utc).timestamp())
     save_metadata(meta)
     return True
 
 def restore_file(filename, user_email):
     """Restore a soft-deleted file. Returns True if restored."""
     meta = load_metadata()
-    to_restore = None
-    
-    # Try to find by stored name first, then by original name
-    for stored_name, details in meta.items():
-        if details["owner"] == user_email:
-            if stored_name == filename or details["original_name"] == filename:
-                to_restore = stored_name
-                break
+    to_restore = _resolve_stored_name(meta, filename, user_email)
 
     if not to_restore or "deleted_at" not in meta[to_restore]:
         return False
 
     # Remove deleted_at timestamp to restore
     meta[to_restore].pop("deleted_at", None)
+    meta[to_restore].pop("deleted_at_epoch", None)
     save_metadata(meta)
     return True
 
-def permanently_delete_file(filename, user_email):
-    """Permanently delete file and its metadata. Returns True if deleted."""
-    meta = load_metadata()
-    to_delete = None
-    
-    # Try to find by stored name first, then by original name
-    for stored_name, details in meta.items():
-        if details["owner"] == user_email:
-            if stored_name == filename or details["original_name"] == filename:
-                to_delete = stored_name
-                break
+def permanently_delete_file(filename, user_email, meta=None, save=True):
+    """
+    Permanently delete file and its metadata. Returns True if deleted.
+    For batches, pass an already-loaded meta with save=False and call save_metadata(meta) once.
+    """
+    if meta is None:
+        meta = load_metadata()
+    to_delete = _resolve_stored_name(meta, filename, user_email)
 
     if not to_delete:
         return False
@@ -419,21 +954,24 @@ def permanently_delete_file(filename, user_email):
         print("⚠️ Could not remove stored file:", e)
 
     meta.pop(to_delete, None)
-    save_metadata(meta)
+    if save:
+        save_metadata(meta)
     return True
 
+TRASH_RETENTION_DAYS = 30
+
 def cleanup_old_trash():
     """Permanently delete files in trash older than 30 days."""
-    import datetime
     meta = load_metadata()
-    now = datetime.datetime.utcnow()
+    cutoff = time.time() - TRASH_RETENTION_DAYS * 86400
     deleted_count = 0
     
     for stored_name, details in list(meta.items()):
         if "deleted_at" in details:
-            deleted_at = datetime.datetime.fromisoformat(details["deleted_at"].replace('Z', ''))
-            days_old = (now - deleted_at).days
-            if days_old >= 30:
+            deleted_at = details.get("deleted_at_epoch")
+            if deleted_at is None:
+                deleted_at = _iso_to_epoch(details["deleted_at"])
+            if 0 <= deleted_at <= cutoff:
                 # Permanently delete
                 filepath = os.path.join(LOCAL_STORE, stored_name)
                 try:
@@ -490,9 +1028,7 @@ Please keep it confidential.
 
     # Send the email
     try:
-        with smtplib.SMTP(SMTP_SERVER, SMTP_PORT, timeout=30) as server:
-            server.starttls()
-            server.login(EMAIL_USER, EMAIL_PASS)
+        with smtp_connection() as server:
             server.send_message(msg)
         print(f"📧 Shared file email sent to {receiver_email}")
         return True
@@ -511,25 +1047,18 @@ def record_access_log(filename, action, user_email, meta=None):
             "action": "upload|download|share|login|logout|delete|share_create|shared_download",
             "file": str,
             "timestamp": ISO8601 string,
+            "epoch": int (unix seconds of timestamp),
             "meta": dict (optional additional metadata)
         }
     """
-    os.makedirs(os.path.dirname(LOG_FILE), exist_ok=True)
-    
-    data = []
-    if os.path.exists(LOG_FILE):
-        with open(LOG_FILE, "r", encoding="utf-8") as f:
-            try:
-                data = json.load(f)
-            except Exception:
-                data = []
-    
     # Create standardized entry with new schema
+    now = datetime.datetime.utcnow()
     entry = {
         "user": user_email,
         "action": action,
         "file": filename,
-        "timestamp": datetime.datetime.utcnow().isoformat() + 'Z'
+        "timestamp": now.isoformat() + 'Z',
+        "epoch": int(now.replace(tzinfo=datetime.timezone.utc).timestamp())
     }
     
     # Initialize or preserve metadata
@@ -557,14 +1086,111 @@ def record_access_log(filename, action, user_email, meta=None):
     assert "timestamp" in entry, "Log entry must have 'timestamp' field"
     assert isinstance(entry["timestamp"], str), "timestamp must be ISO8601 string"
     
-    data.append(entry)
-    
-    with open(LOG_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
-    
-    # Post-write validation
-    with open(LOG_FILE, "r", encoding="utf-8") as f:
-        verified = json.load(f)
-        last_entry = verified[-1]
-        assert "action" in last_entry, "Written entry missing 'action'"
-        assert "timestamp" in last_entry, "Written entry missing 'timestamp'"
+    # One line per entry, appended in a single write: no read or rewrite of the existing log
+    jsonio.append_line(LOG_FILE, entry)
+
+
+# Parsed access log: {"mtime_ns", "size", "head", "entries", "by_user"}. The log is append-only,
+# so a grown file only has its new tail parsed; "by_user" maps user -> that user's entries
+# (same dicts, write order). Entries are shared between callers: do not modify them.
+_access_log_cache = {"mtime_ns": None, "size": 0, "head": b"", "entries": [], "by_user": {}, "by_action": {}}
+_access_log_lock = threading.Lock()
+_LOG_HEAD_BYTES = 64
+
+def _load_access_log():
+    """Return the cached access log state, parsing only lines appended since the last call."""
+    with _access_log_lock:
+        cached = _access_log_cache
+        try:
+            st = os.stat(LOG_FILE)
+        except OSError:
+            cached.update(mtime_ns=None, size=0, head=b"", entries=[], by_user={}, by_action={})
+            return cached
+        if cached["mtime_ns"] == st.st_mtime_ns and cached["size"] == st.st_size:
+            return cached
+
+        with open(LOG_FILE, "rb") as f:
+            head = f.read(_LOG_HEAD_BYTES)
+            if cached["size"] and st.st_size >= cached["size"] and head == cached["head"]:
+                # Same file, appended to: parse only the new lines
+                offset, entries = cached["size"], cached["entries"]
+                by_user, by_action = cached["by_user"], cached["by_action"]
+            else:
+                offset, entries, by_user, by_action = 0, [], {}, {}
+            f.seek(offset)
+            data = f.read()
+
+        # Leave a torn (still being written) last line for the next call
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            if not line.strip():
+                continue
+            try:
+                entry = jsonio.loads(line)
+            except ValueError:
+                continue
+            # Normalize old 'time' field to 'timestamp'
+            if "time" in entry and "timestamp" not in entry:
+                entry["timestamp"] = entry["time"]
+            entries.append(entry)
+            by_user.setdefault(entry.get("user"), []).append(entry)
+            by_action.setdefault((entry.get("user"), entry.get("action")), []).append(entry)
+        cached.update(mtime_ns=st.st_mtime_ns if end == len(data) else None, size=offset + end,
+                      head=head, entries=entries, by_user=by_user, by_action=by_action)
+        return cached
+
+
+def access_log_key():
+    """Cheap version key of the access log: changes whenever a line is appended."""
+    try:
+        st = os.stat(LOG_FILE)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def iter_access_log(user=None, action=None):
+    """
+    Yield access log entries in write order. Blank or torn lines are skipped.
+
+    Parsed entries are cached (see _load_access_log), so repeated reads of an unchanged log
+    cost no I/O. user (str, optional) is a lookup in the per-user index, and user together
+    with action (str, optional) a lookup in the per-(user, action) index.
+    """
+    state = _load_access_log()
+    if action is not None:
+        entries = [e for e in state["entries"] if e.get("action") == action] if user is None \
+            else state["by_action"].get((user, action), [])
+    else:
+        entries = state["entries"] if user is None else state["by_user"].get(user, [])
+    # Iterate over a copy: the cached lists grow in place when another request reloads
+    yield from entries[:]
+
+
+def migrate_legacy_access_log():
+    """
+    One-time conversion of the access_log.json array to JSON Lines, run at startup
+    (app.run_startup_migrations). The old file is claimed by renaming it to *.bak before it is
+    read, so only one process migrates it; a missing file means already migrated.
+    """
+    claimed = LEGACY_LOG_FILE + ".bak"
+    try:
+        os.replace(LEGACY_LOG_FILE, claimed)
+    except FileNotFoundError:
+        return
+    data = jsonio.read_json(claimed)
+    if not isinstance(data, list):
+        os.replace(claimed, LEGACY_LOG_FILE)
+        print("⚠️ Could not read legacy access log - skipping migration")
+        return
+    lines = b"".join(jsonio.dumps(entry) + b"\n" for entry in data if isinstance(entry, dict))
+    # Older entries go first, ahead of anything already appended to the new log
+    try:
+        with open(LOG_FILE, "rb") as f:
+            lines += f.read()
+    except FileNotFoundError:
+        pass
+    with open(LOG_FILE + ".tmp", "wb") as f:
+        f.write(lines)
+    os.replace(LOG_FILE + ".tmp", LOG_FILE)
+    print(f"🔄 Migrated {len(data)} access log entries to {os.path.basename(LOG_FILE)}")
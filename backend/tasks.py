@@ -0,0 +1,78 @@
+"""
+Background Task Queue
+=====================
+Small in-process task queue so slow I/O (SMTP, disk cleanup) runs off the request thread.
+
+Features:
+- One daemon worker thread per named queue (e.g. "mail"), started on first use
+- Tasks on a queue run one at a time, in submission order
+- Retries with exponential backoff for the exception types a task opts into
+- No broker or extra process required
+"""
+
+import queue
+import threading
+import time
+
+_queues = {}
+_queues_lock = threading.Lock()
+
+
+def _run(func, args, kwargs, retry_on, max_retries, backoff):
+    """Run one task, retrying on the given exception types."""
+    attempt = 0
+    while True:
+        try:
+            return func(*args, **kwargs)
+        except retry_on as e:
+            if attempt >= max_retries:
+                print(f"❌ Task {func.__name__} failed after {attempt + 1} attempts: {e}")
+                return None
+            delay = backoff * (2 ** attempt)
+            attempt += 1
+            print(f"🔁 Task {func.__name__} failed ({e}), retry {attempt}/{max_retries} in {delay:.0f}s")
+            time.sleep(delay)
+        except Exception as e:
+            print(f"❌ Task {func.__name__} failed: {e}")
+            return None
+
+
+def _worker(q):
+    while True:
+        task = q.get()
+        try:
+            _run(*task)
+        finally:
+            q.task_done()
+
+
+def _get_queue(name):
+    with _queues_lock:
+        q = _queues.get(name)
+        if q is None:
+            q = queue.Queue()
+            threading.Thread(target=_worker, args=(q,), name=f"tasks-{name}", daemon=True).start()
+            _queues[name] = q
+        return q
+
+
+def enqueue(name, func, *args, retry_on=(), max_retries=0, backoff=1.0, **kwargs):
+    """
+    Schedule func(*args, **kwargs) on the named background queue and return immediately.
+
+    Args:
+        name (str): queue name; each queue has its own worker thread
+        func (callable): task to run
+        retry_on (tuple): exception types that trigger a retry
+        max_retries (int): retries after the first attempt
+        backoff (float): delay before the first retry in seconds, doubled on each retry
+    """
+    _get_queue(name).put((func, args, kwargs, tuple(retry_on), max_retries, backoff))
+
+
+def wait(name):
+    """Block until every task queued so far on the named queue has finished."""
+    with _queues_lock:
+        q = _queues.get(name)
+    if q is not None:
+        q.join()
@@ -12,7 +12,10 @@ from datetime import datetime, timedelta, timezone
 # Add backend to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
 
-from ai_module import analyze_recent_logs, detect_anomalies, record_activity
+from ai_module import (
+    analyze_recent_logs, detect_anomalies, record_activity,
+    activity_files, activity_file_for
+)
 
 print("=" * 80)
 print("        AI FEATURES VERIFICATION TEST SUITE")
@@ -21,16 +24,35 @@ print("=" * 80)
 # Setup paths
 BASE_DIR = os.path.dirname(__file__)
 DB_DIR = os.path.join(BASE_DIR, "db")
-ACTIVITY_FILE = os.path.join(DB_DIR, "activity_log.json")
-BACKUP_FILE = os.path.join(DB_DIR, "activity_log_backup.json")
+BACKUP_DIR = os.path.join(DB_DIR, "activity_log_backup")
+
+
+def write_log(entries):
+    """Replace the activity log (daily JSON Lines bins) with the given entries."""
+    for path in activity_files():
+        os.remove(path)
+    for entry in entries:
+        with open(activity_file_for(entry["timestamp"][:10]), 'a') as f:
+            f.write(json.dumps(entry) + "\n")
+
+
+def read_log():
+    """Read all entries from the activity log (daily JSON Lines bins)."""
+    entries = []
+    for path in activity_files():
+        with open(path, 'r') as f:
+            entries.extend(json.loads(line) for line in f if line.strip())
+    return entries
+
 
 # Backup existing activity log
-if os.path.exists(ACTIVITY_FILE):
-    with open(ACTIVITY_FILE, 'r') as f:
-        backup_data = json.load(f)
-    with open(BACKUP_FILE, 'w') as f:
-        json.dump(backup_data, f, indent=2)
-    print(f"✅ Backed up existing activity log ({len(backup_data)} entries)")
+existing_files = activity_files()
+if existing_files:
+    backup_count = len(read_log())
+    os.makedirs(BACKUP_DIR, exist_ok=True)
+    for path in existing_files:
+        os.replace(path, os.path.join(BACKUP_DIR, os.path.basename(path)))
+    print(f"✅ Backed up existing activity log ({backup_count} entries)")
 
 # Test user
 TEST_USER = "test_ai_user@example.com"
@@ -40,8 +62,7 @@ print("TEST 1: PATTERN RECOGNITION - Activity Logging")
 print("=" * 80)
 
 # Clear activity log for clean test
-with open(ACTIVITY_FILE, 'w') as f:
-    json.dump([], f)
+write_log([])
 
 # Record various activities
 print("\n📝 Recording test activities...")
@@ -58,8 +79,7 @@ for action, filename in activities:
     print(f"   ✓ Recorded: {action} - {filename}")
 
 # Verify activities were logged
-with open(ACTIVITY_FILE, 'r') as f:
-    logged_activities = json.load(f)
+logged_activities = read_log()
 
 print(f"\n✅ Pattern Recognition Test:")
 print(f"   Expected: 5 activities")
@@ -82,8 +102,7 @@ print("TEST 2: ANOMALY DETECTION - Deletion Threshold (>2)")
 print("=" * 80)
 
 # Clear log
-with open(ACTIVITY_FILE, 'w') as f:
-    json.dump([], f)
+write_log([])
 
 print("\n📝 Test Case A: Normal deletions (2 files) - Should NOT alert")
 record_activity(TEST_USER, "delete", "file1.pdf")
@@ -112,8 +131,7 @@ print("TEST 3: ANOMALY DETECTION - Failed Login Threshold (≥3)")
 print("=" * 80)
 
 # Clear log
-with open(ACTIVITY_FILE, 'w') as f:
-    json.dump([], f)
+write_log([])
 
 print("\n📝 Test Case A: Few failed logins (2 attempts) - Should NOT alert")
 record_activity(TEST_USER, "failed_login", None)
@@ -142,8 +160,7 @@ print("TEST 4: TEMPORAL ANALYSIS - 24-Hour Window Filtering")
 print("=" * 80)
 
 # Clear log and add activities with different timestamps
-with open(ACTIVITY_FILE, 'w') as f:
-    json.dump([], f)
+write_log([])
 
 now = datetime.now(timezone.utc)
 
@@ -174,8 +191,7 @@ for i in range(3):
     print(f"   ✓ Added activity from {i} hours ago (INSIDE window)")
 
 # Save entries
-with open(ACTIVITY_FILE, 'w') as f:
-    json.dump(test_entries, f, indent=2)
+write_log(test_entries)
 
 # Analyze with 24-hour window
 stats, alert_msg = analyze_recent_logs(user_filter=TEST_USER, hours=24)
@@ -192,8 +208,7 @@ print("TEST 5: BULK OPERATION COUNTING")
 print("=" * 80)
 
 # Clear log
-with open(ACTIVITY_FILE, 'w') as f:
-    json.dump([], f)
+write_log([])
 
 print("\n📝 Testing bulk operation intelligence...")
 
@@ -218,8 +233,7 @@ print("TEST 6: ALERT PRIORITY (Deletions > Failed Logins)")
 print("=" * 80)
 
 # Clear log
-with open(ACTIVITY_FILE, 'w') as f:
-    json.dump([], f)
+write_log([])
 
 print("\n📝 Testing alert priority when both anomalies exist...")
 
@@ -240,8 +254,7 @@ print("TEST 7: MULTI-USER ISOLATION")
 print("=" * 80)
 
 # Clear log
-with open(ACTIVITY_FILE, 'w') as f:
-    json.dump([], f)
+write_log([])
 
 print("\n📝 Testing user-specific filtering...")
 
@@ -279,13 +292,12 @@ print("SUMMARY")
 print("=" * 80)
 
 # Restore original activity log
-if os.path.exists(BACKUP_FILE):
-    with open(BACKUP_FILE, 'r') as f:
-        original_data = json.load(f)
-    with open(ACTIVITY_FILE, 'w') as f:
-        json.dump(original_data, f, indent=2)
-    os.remove(BACKUP_FILE)
-    print(f"\n✅ Restored original activity log ({len(original_data)} entries)")
+if os.path.isdir(BACKUP_DIR):
+    write_log([])
+    for name in os.listdir(BACKUP_DIR):
+        os.replace(os.path.join(BACKUP_DIR, name), os.path.join(DB_DIR, name))
+    os.rmdir(BACKUP_DIR)
+    print(f"\n✅ Restored original activity log ({len(read_log())} entries)")
 
 print("\n🎯 All AI features have been verified!")
 print("\n📊 Test Results:")
@@ -0,0 +1,122 @@
+"""
+File Download Verification Test Suite
+=====================================
+Tests that user file downloads are sent uncompressed, whole or by Range, and that ZIP
+downloads are built without plaintext copies on disk
+"""
+
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import zipfile
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+import jwt
+
+import ai_module
+import storage
+import tasks
+import app as backend_app
+
+print("=" * 80)
+print("        FILE DOWNLOAD VERIFICATION TEST SUITE")
+print("=" * 80)
+
+results = []
+
+
+def status(ok):
+    results.append(ok)
+    print(f"   Status: {'PASS ✅' if ok else 'FAIL ❌'}")
+
+
+# Work on scratch metadata, file store and activity log, never the real ones
+work_dir = tempfile.mkdtemp(prefix="test_downloads.")
+for name in ("store", "temp", "db"):
+    os.makedirs(os.path.join(work_dir, name))
+storage.LOCAL_STORE = backend_app.UPLOAD_FOLDER = os.path.join(work_dir, "store")
+storage.TEMP_STORE = os.path.join(work_dir, "temp")
+storage.META_FILE = os.path.join(work_dir, "db", "files.json")
+storage.MONGODB_ENABLED = False
+ai_module.DB_DIR = os.path.join(work_dir, "db")
+
+TEST_USER = "test_download_user@example.com"
+token = jwt.encode({"sub": TEST_USER, "exp": int(time.time()) + 600}, backend_app.SECRET, algorithm="HS256")
+headers = {"Authorization": f"Bearer {token}", "Accept-Encoding": "br, gzip"}
+client = backend_app.app.test_client()
+
+# A user file whose name gives it a compressible text mimetype
+data = json.dumps([{"id": i, "name": f"record {i}"} for i in range(500)]).encode()
+storage.encrypt_stream_and_store(io.BytesIO(data), "export.json", TEST_USER)
+
+print("\n" + "=" * 80)
+print("TEST 1: WHOLE FILE - Streamed Without Compression")
+print("=" * 80)
+
+response = client.get("/api/download/export.json", headers=headers)
+body = response.get_data()
+print(f"\n   Status code: {response.status_code}")
+print(f"   Content-Type: {response.mimetype}")
+print(f"   Content-Encoding: {response.headers.get('Content-Encoding')}")
+print(f"   Content-Length: {response.content_length} (file is {len(data)} bytes)")
+status(response.status_code == 200 and "Content-Encoding" not in response.headers
+       and body == data and response.content_length == len(data))
+
+print("\n" + "=" * 80)
+print("TEST 2: RANGE - Partial Content Without Compression")
+print("=" * 80)
+
+response = client.get("/api/download/export.json", headers={**headers, "Range": "bytes=100-1099"})
+body = response.get_data()
+print(f"\n   Status code: {response.status_code}")
+print(f"   Content-Range: {response.headers.get('Content-Range')}")
+print(f"   Content-Encoding: {response.headers.get('Content-Encoding')}")
+status(response.status_code == 206 and "Content-Encoding" not in response.headers
+       and response.headers.get("Content-Range") == f"bytes 100-1099/{len(data)}" and body == data[100:1100])
+
+print("\n📝 Resuming from an offset rebuilds the original file")
+response = client.get("/api/download/export.json", headers={**headers, "Range": "bytes=1100-"})
+status(response.status_code == 206 and data[:1100] + response.get_data() == data)
+
+print("\n" + "=" * 80)
+print("TEST 3: ZIP DOWNLOADS - No Decrypted Copies on Disk")
+print("=" * 80)
+
+# Range downloads above went through decrypted temp files, removed in the background
+tasks.wait("cleanup")
+for route in ("/api/download-multiple", "/api/bulk-download"):
+    response = client.post(route, headers=headers, json={"filenames": ["export.json"]})
+    body = response.get_data()
+    archive = zipfile.ZipFile(io.BytesIO(body)) if response.status_code == 200 else None
+    leftovers = os.listdir(storage.TEMP_STORE)
+    print(f"\n📝 {route}: status {response.status_code}, temp files {len(leftovers)}")
+    status(archive is not None and archive.read("export.json") == data and not leftovers
+           and "Content-Encoding" not in response.headers)
+
+print("\n📝 Missing files are rejected before streaming")
+response = client.post("/api/download-multiple", headers=headers, json={"filenames": ["export.json", "missing.txt"]})
+status(response.status_code == 404 and response.get_json()["invalid_files"] == ["missing.txt"])
+
+print("\n" + "=" * 80)
+print("SUMMARY")
+print("=" * 80)
+
+for root, dirs, files in os.walk(work_dir, topdown=False):
+    for name in files:
+        os.remove(os.path.join(root, name))
+    for name in dirs:
+        os.rmdir(os.path.join(root, name))
+os.rmdir(work_dir)
+
+print(f"\n📊 {results.count(True)} of {len(results)} checks passed")
+print("   ✅ Whole downloads uncompressed")
+print("   ✅ Range downloads uncompressed")
+print("   ✅ ZIP downloads without temp files")
+
+print("\n" + "=" * 80)
+sys.exit(0 if all(results) else 1)
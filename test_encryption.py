@@ -0,0 +1,140 @@
+"""
+File Encryption Verification Test Suite
+=======================================
+Tests the chunked AES-GCM stored file format (and Fernet files stored before it)
+"""
+
+import io
+import os
+import sys
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+from cryptography.exceptions import InvalidTag
+
+import storage
+from storage import LOCAL_STORE, iter_decrypted_chunks, decrypted_size
+
+print("=" * 80)
+print("        FILE ENCRYPTION VERIFICATION TEST SUITE")
+print("=" * 80)
+
+# Small chunks so multi-chunk files stay tiny
+CHUNK = 64
+TEST_FILE = ".test_encryption.bin"
+TEST_PATH = os.path.join(LOCAL_STORE, TEST_FILE)
+
+results = []
+
+
+def status(ok):
+    results.append(ok)
+    print(f"   Status: {'PASS ✅' if ok else 'FAIL ❌'}")
+
+
+def store(data):
+    """Encrypt data into the test file; return the plaintext size reported by the encryptor."""
+    with open(TEST_PATH, "wb") as out:
+        return storage._encrypt_stream(io.BytesIO(data), out, chunk_size=CHUNK)
+
+
+def decrypt():
+    return b"".join(iter_decrypted_chunks(TEST_FILE))
+
+
+def decrypt_fails():
+    """True if decrypting the test file raises InvalidTag."""
+    try:
+        decrypt()
+    except InvalidTag:
+        return True
+    return False
+
+
+print("\n" + "=" * 80)
+print("TEST 1: ROUND TRIP - Empty, One Chunk, Several Chunks")
+print("=" * 80)
+
+cases = [
+    ("0 bytes", b""),
+    ("less than one chunk", os.urandom(CHUNK // 2)),
+    ("exactly one chunk", os.urandom(CHUNK)),
+    ("exactly three chunks", os.urandom(CHUNK * 3)),
+    ("several chunks and a partial one", os.urandom(CHUNK * 3 + 5)),
+]
+for label, data in cases:
+    written = store(data)
+    ok = decrypt() == data and written == len(data)
+    print(f"\n📝 {label}: {len(data)} bytes, decrypted {'✓' if ok else '✗'}")
+    status(ok)
+
+print("\n" + "=" * 80)
+print("TEST 2: DECRYPTED SIZE - From Length and Header Only")
+print("=" * 80)
+
+for label, data in cases:
+    store(data)
+    size = decrypted_size(TEST_FILE)
+    print(f"\n📝 {label}: expected {len(data)}, got {size}")
+    status(size == len(data))
+
+print("\n" + "=" * 80)
+print("TEST 3: TAMPERING - Modified Ciphertext Is Rejected")
+print("=" * 80)
+
+data = os.urandom(CHUNK * 3)
+store(data)
+with open(TEST_PATH, "r+b") as f:
+    f.seek(storage._FILE_HEADER.size + CHUNK + 20)  # inside the second record
+    byte = f.read(1)
+    f.seek(-1, os.SEEK_CUR)
+    f.write(bytes([byte[0] ^ 1]))
+
+print("\n📝 One flipped bit in the second chunk - Should raise InvalidTag")
+status(decrypt_fails())
+
+print("\n" + "=" * 80)
+print("TEST 4: TRUNCATION - Shortened Files Are Rejected")
+print("=" * 80)
+
+record = CHUNK + storage._GCM_TAG_SIZE
+truncations = [
+    ("last chunk dropped", storage._FILE_HEADER.size + 2 * record),
+    ("cut inside a chunk", storage._FILE_HEADER.size + record + 10),
+    ("header only", storage._FILE_HEADER.size),
+]
+for label, length in truncations:
+    store(data)
+    with open(TEST_PATH, "r+b") as f:
+        f.truncate(length)
+    print(f"\n📝 {label} - Should raise InvalidTag")
+    status(decrypt_fails())
+
+print("\n" + "=" * 80)
+print("TEST 5: LEGACY FORMAT - Fernet Files Still Decrypt")
+print("=" * 80)
+
+data = b"stored before AES-GCM " * 10
+with open(TEST_PATH, "wb") as f:
+    f.write(storage.fernet.encrypt(data))
+
+print("\n📝 Fernet token file")
+print(f"   Decrypted size (not known without decrypting): {decrypted_size(TEST_FILE)}")
+status(decrypt() == data and decrypted_size(TEST_FILE) is None)
+
+print("\n" + "=" * 80)
+print("SUMMARY")
+print("=" * 80)
+
+os.remove(TEST_PATH)
+
+print(f"\n📊 {results.count(True)} of {len(results)} checks passed")
+print("   ✅ Round trips (0 bytes, one chunk, several chunks)")
+print("   ✅ Decrypted size without decrypting")
+print("   ✅ Tampered ciphertext rejected")
+print("   ✅ Truncated files rejected")
+print("   ✅ Fernet files still readable")
+
+print("\n" + "=" * 80)
+sys.exit(0 if all(results) else 1)
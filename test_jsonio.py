@@ -0,0 +1,134 @@
+"""
+JSON Helpers Verification Test Suite
+====================================
+Tests the jsonio wrapper (orjson with a stdlib json fallback)
+"""
+
+import os
+import sys
+import tempfile
+import threading
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+import jsonio
+
+print("=" * 80)
+print("        JSON HELPERS VERIFICATION TEST SUITE")
+print("=" * 80)
+
+results = []
+
+
+def status(ok):
+    results.append(ok)
+    print(f"   Status: {'PASS ✅' if ok else 'FAIL ❌'}")
+
+
+SAMPLE = {"owner": "user@example.com", "name": "résumé 📄.pdf", "size": 1024, "tags": [1, 2.5, None, True]}
+work_dir = tempfile.mkdtemp(prefix="test_jsonio.")
+
+print("\n" + "=" * 80)
+print("TEST 1: ROUND TRIP - Same Output With and Without orjson")
+print("=" * 80)
+
+fast = (jsonio.dumps(SAMPLE), jsonio.dumps(SAMPLE, indent=True))
+saved = jsonio.orjson
+jsonio.orjson = None
+try:
+    fallback = (jsonio.dumps(SAMPLE), jsonio.dumps(SAMPLE, indent=True))
+    fallback_loaded = jsonio.loads(fallback[0])
+finally:
+    jsonio.orjson = saved
+
+print(f"\n📝 orjson installed: {'✓' if saved is not None else '✗'}")
+print(f"   Compact output: {fast[0][:60]!r}...")
+status(isinstance(fast[0], bytes) and jsonio.loads(fast[0]) == SAMPLE and fallback_loaded == SAMPLE)
+
+print("\n📝 Compact and indented bytes match the stdlib fallback")
+status(fast == fallback)
+
+print("\n" + "=" * 80)
+print("TEST 2: READ - Missing, Corrupt and Large Files")
+print("=" * 80)
+
+missing = os.path.join(work_dir, "missing.json")
+corrupt = os.path.join(work_dir, "corrupt.json")
+with open(corrupt, "wb") as f:
+    f.write(b'{"truncated": ')
+
+print("\n📝 Missing and corrupt files return the default")
+status(jsonio.read_json(missing, default={}) == {} and jsonio.read_json(corrupt) is None)
+
+large_path = os.path.join(work_dir, "large.json")
+large = {f"user{i}@example.com_file{i}.txt": {"size": i, "folder": "/"} for i in range(10000)}
+jsonio.write_json(large_path, large)
+size = os.path.getsize(large_path)
+print(f"\n📝 {size} byte file (memory-mapped above {jsonio.MMAP_MIN_SIZE} bytes)")
+status(size >= jsonio.MMAP_MIN_SIZE and jsonio.read_json(large_path) == large)
+
+print("\n" + "=" * 80)
+print("TEST 3: ATOMIC WRITE - Replaces the File, No Temp Files Left")
+print("=" * 80)
+
+path = os.path.join(work_dir, "files.json")
+jsonio.write_json_atomic(path, {"old": 1})
+jsonio.write_json_atomic(path, SAMPLE, fsync=True)
+leftovers = [name for name in os.listdir(work_dir) if name.endswith(".tmp")]
+
+print(f"\n   Temp files left: {len(leftovers)}")
+status(jsonio.read_json(path) == SAMPLE and not leftovers)
+
+print("\n📝 A failed write keeps the previous document")
+try:
+    jsonio.write_json_atomic(path, {"bad": object()})
+    raised = False
+except TypeError:
+    raised = True
+leftovers = [name for name in os.listdir(work_dir) if name.endswith(".tmp")]
+status(raised and jsonio.read_json(path) == SAMPLE and not leftovers)
+
+print("\n" + "=" * 80)
+print("TEST 4: APPEND - Concurrent JSON Lines Writers")
+print("=" * 80)
+
+log_path = os.path.join(work_dir, "log.jsonl")
+THREADS, LINES = 8, 200
+
+
+def writer(n):
+    for i in range(LINES):
+        jsonio.append_line(log_path, {"thread": n, "i": i, "file": "x" * 100})
+
+
+threads = [threading.Thread(target=writer, args=(n,)) for n in range(THREADS)]
+for t in threads:
+    t.start()
+for t in threads:
+    t.join()
+
+with open(log_path, "rb") as f:
+    records = [jsonio.loads(line) for line in f]
+complete = sorted((r["thread"], r["i"]) for r in records) == [(n, i) for n in range(THREADS) for i in range(LINES)]
+
+print(f"\n   Expected lines: {THREADS * LINES}")
+print(f"   Actual lines: {len(records)}")
+status(complete)
+
+print("\n" + "=" * 80)
+print("SUMMARY")
+print("=" * 80)
+
+for name in os.listdir(work_dir):
+    os.remove(os.path.join(work_dir, name))
+os.rmdir(work_dir)
+
+print(f"\n📊 {results.count(True)} of {len(results)} checks passed")
+print("   ✅ Round trip and stdlib fallback")
+print("   ✅ Missing, corrupt and memory-mapped reads")
+print("   ✅ Atomic writes")
+print("   ✅ Concurrent appends")
+
+print("\n" + "=" * 80)
+sys.exit(0 if all(results) else 1)
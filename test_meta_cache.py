@@ -0,0 +1,137 @@
+"""
+Metadata Cache Verification Test Suite
+======================================
+Tests the metadata cache indexes used by file listing and search
+"""
+
+import os
+import sys
+import tempfile
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+import jsonio
+import storage
+import meta_cache
+
+print("=" * 80)
+print("        METADATA CACHE VERIFICATION TEST SUITE")
+print("=" * 80)
+
+results = []
+
+
+def status(ok):
+    results.append(ok)
+    print(f"   Status: {'PASS ✅' if ok else 'FAIL ❌'}")
+
+
+def names(pairs):
+    return sorted(stored for stored, _ in pairs)
+
+
+# Work on a scratch files.json, never the real metadata
+work_dir = tempfile.mkdtemp(prefix="test_meta_cache.")
+storage.META_FILE = os.path.join(work_dir, "files.json")
+storage.MONGODB_ENABLED = False
+
+USER_A = "user_a@example.com"
+USER_B = "user_b@example.com"
+
+
+def record(owner, name, folder, uploaded_at, deleted=False):
+    details = {
+        "owner": owner,
+        "original_name": name,
+        "uploaded_at": uploaded_at,
+        "uploaded_at_epoch": storage._iso_to_epoch(uploaded_at),
+        "folder": folder,
+        "size": 10,
+        **storage.search_fields(name)
+    }
+    if deleted:
+        details["deleted_at"] = "2025-03-01T00:00:00Z"
+    return details
+
+
+storage.save_metadata({
+    "a_report.pdf": record(USER_A, "report.pdf", "/", "2025-01-10T09:00:00Z"),
+    "a_notes.TXT": record(USER_A, "notes.TXT", "/docs", "2025-02-15T12:00:00Z"),
+    "a_old.pdf": record(USER_A, "old.pdf", "/docs", "2024-12-31T23:59:59Z", deleted=True),
+    "a_README": record(USER_A, "README", "/docs/sub", "2025-02-20T08:00:00Z"),
+    "b_report.pdf": record(USER_B, "report.pdf", "/", "2025-01-10T09:00:00Z"),
+})
+
+print("\n" + "=" * 80)
+print("TEST 1: FOLDER INDEXES - Live and Trashed Files")
+print("=" * 80)
+
+live = names(meta_cache.files_in_folder(USER_A, "/docs"))
+print(f"\n📝 Live files in /docs: {live}")
+status(live == ["a_notes.TXT"])
+
+print("\n📝 Trashed files still count for folder checks and subtree lookups")
+under = sorted(meta_cache.files_under_folder(USER_A, "/docs"))
+print(f"   Files under /docs: {under}")
+status(meta_cache.folder_has_files(USER_A, "/docs") and under == ["a_README", "a_notes.TXT", "a_old.pdf"]
+       and not meta_cache.folder_has_files(USER_B, "/docs"))
+
+print("\n📝 Lookup by original name stays per owner")
+stored, details = meta_cache.find_by_owner_and_name(USER_B, "report.pdf")
+status(stored == "b_report.pdf" and details["owner"] == USER_B
+       and meta_cache.find_by_owner_and_name(USER_B, "notes.TXT") == (None, None))
+
+print("\n" + "=" * 80)
+print("TEST 2: SEARCH CANDIDATES - Extension, Folder and Date Filters")
+print("=" * 80)
+
+checks = [
+    ("ext pdf", dict(ext="pdf"), ["a_old.pdf", "a_report.pdf"]),
+    ("ext txt (case-insensitive)", dict(ext="txt"), ["a_notes.TXT"]),
+    ("no extension", dict(ext=""), ["a_README"]),
+    ("folder /docs", dict(folder="/docs"), ["a_notes.TXT", "a_old.pdf"]),
+    ("2025 only", dict(date_from="2025-01-01"), ["a_README", "a_notes.TXT", "a_report.pdf"]),
+    ("up to the exact upload time", dict(date_to="2025-01-10T09:00:00Z"), ["a_old.pdf", "a_report.pdf"]),
+    ("pdf in 2025", dict(ext="pdf", date_from="2025-01-01"), ["a_report.pdf"]),
+    ("no filters", dict(), ["a_README", "a_notes.TXT", "a_old.pdf", "a_report.pdf"]),
+]
+for label, filters, expected in checks:
+    found = names(meta_cache.search_candidates(USER_A, **filters))
+    print(f"\n📝 {label}: {found}")
+    status(found == expected)
+
+print("\n" + "=" * 80)
+print("TEST 3: RELOAD - Saves and Outside Changes")
+print("=" * 80)
+
+meta = storage.load_metadata()
+meta["a_new.csv"] = record(USER_A, "new.csv", "/", "2025-03-01T00:00:00Z")
+storage.save_metadata(meta)
+print("\n📝 File saved through storage.save_metadata()")
+status(names(meta_cache.search_candidates(USER_A, ext="csv")) == ["a_new.csv"])
+
+# Another worker rewriting files.json, with a record from before the search fields existed
+meta = jsonio.read_json(storage.META_FILE)
+meta["a_legacy.PNG"] = {"owner": USER_A, "original_name": "legacy.PNG", "folder": "/",
+                        "uploaded_at": "2025-04-01T00:00:00Z", "size": 10}
+jsonio.write_json_atomic(storage.META_FILE, meta)
+print("\n📝 files.json rewritten by another process, record without search fields")
+found = meta_cache.search_candidates(USER_A, ext="png")
+status(names(found) == ["a_legacy.PNG"] and found[0][1]["uploaded_at_epoch"] == storage._iso_to_epoch("2025-04-01T00:00:00Z"))
+
+print("\n" + "=" * 80)
+print("SUMMARY")
+print("=" * 80)
+
+for name in os.listdir(work_dir):
+    os.remove(os.path.join(work_dir, name))
+os.rmdir(work_dir)
+
+print(f"\n📊 {results.count(True)} of {len(results)} checks passed")
+print("   ✅ Folder and name indexes")
+print("   ✅ Search filters")
+print("   ✅ Reload after saves and outside changes")
+
+print("\n" + "=" * 80)
+sys.exit(0 if all(results) else 1)
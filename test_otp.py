@@ -0,0 +1,145 @@
+"""
+OTP Verification Test Suite
+===========================
+Tests OTP storage, expiry cleanup and verification
+"""
+
+import heapq
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+import jsonio
+import storage
+from storage import save_otp, load_otps, get_otp, verify_otp, delete_otp
+
+print("=" * 80)
+print("        OTP VERIFICATION TEST SUITE")
+print("=" * 80)
+
+results = []
+
+
+def status(ok):
+    results.append(ok)
+    print(f"   Status: {'PASS ✅' if ok else 'FAIL ❌'}")
+
+
+# Work on a scratch otp.json, and never send email
+work_dir = tempfile.mkdtemp(prefix="test_otp.")
+storage.OTP_FILE = os.path.join(work_dir, "otp.json")
+storage.EMAIL_USER = None
+
+
+def otp_record(code, age):
+    """An OTP record created age seconds ago, as save_otp writes it."""
+    created = int(time.time()) - age
+    created_at = datetime.fromtimestamp(created, timezone.utc).replace(tzinfo=None).isoformat() + 'Z'
+    return {"otp": code, "created_at": created_at, "created_epoch": created}
+
+
+def write_otps(data):
+    """Write otp.json the way another worker process would."""
+    jsonio.write_json_atomic(storage.OTP_FILE, data)
+    # Make sure the file key changes even within the same mtime tick
+    os.utime(storage.OTP_FILE, ns=(time.time_ns(), time.time_ns() + 1))
+
+
+EXPIRY = storage.OTP_EXPIRY
+
+print("\n" + "=" * 80)
+print("TEST 1: EXPIRY CLEANUP - Expired Codes Dropped on Save")
+print("=" * 80)
+
+legacy = otp_record("333333", 10)
+legacy.pop("created_epoch")  # written before created_epoch existed
+write_otps({
+    "expired@example.com": otp_record("111111", EXPIRY + 60),
+    "fresh@example.com": otp_record("222222", 10),
+    "legacy@example.com": legacy,
+    "broken@example.com": {"otp": "444444", "created_at": "not a date"},
+})
+save_otp("new@example.com", "555555")
+remaining = sorted(load_otps())
+
+print(f"\n   Remaining: {remaining}")
+status(remaining == ["fresh@example.com", "legacy@example.com", "new@example.com"])
+
+print("\n📝 Records added by another process are picked up by the next save")
+data = load_otps()
+data["expired2@example.com"] = otp_record("666666", EXPIRY + 1)
+write_otps(data)
+save_otp("new2@example.com", "777777")
+remaining = sorted(load_otps())
+print(f"   Remaining: {remaining}")
+status("expired2@example.com" not in remaining and "fresh@example.com" in remaining)
+
+print("\n" + "=" * 80)
+print("TEST 2: REPLACED CODES - Stale Heap Entries Are Skipped")
+print("=" * 80)
+
+# An already expired heap entry left behind by a code that has since been replaced
+with storage._otp_lock:
+    heapq.heappush(storage._otp_heap, (0, "fresh@example.com", "2000-01-01T00:00:00Z"))
+save_otp("new3@example.com", "888888")
+
+print("\n📝 The current code for the same user survives the stale entry")
+status(load_otps().get("fresh@example.com", {}).get("otp") == "222222")
+
+print("\n" + "=" * 80)
+print("TEST 3: VERIFICATION - Codes, Expiry and Input Handling")
+print("=" * 80)
+
+save_otp("verify@example.com", "246810")
+data = load_otps()
+data["old@example.com"] = otp_record("135790", EXPIRY + 1)
+legacy = otp_record("975310", 10)
+legacy.pop("created_epoch")
+data["legacy2@example.com"] = legacy
+write_otps(data)
+
+checks = [
+    ("correct code", verify_otp("verify@example.com", "246810"), True),
+    ("correct code with surrounding spaces", verify_otp("verify@example.com", " 246810 "), True),
+    ("code given as int", verify_otp("verify@example.com", 246810), True),
+    ("wrong code", verify_otp("verify@example.com", "246811"), False),
+    ("prefix of the code", verify_otp("verify@example.com", "2468"), False),
+    ("empty code", verify_otp("verify@example.com", ""), False),
+    ("no code", verify_otp("verify@example.com", None), False),
+    ("unknown user", verify_otp("nobody@example.com", "246810"), False),
+    ("expired code", verify_otp("old@example.com", "135790"), False),
+    ("record without created_epoch", verify_otp("legacy2@example.com", "975310"), True),
+]
+for label, got, expected in checks:
+    print(f"\n📝 {label}: {got}")
+    status(got is expected)
+
+print("\n📝 get_otp returns a copy of just that record")
+record = get_otp("verify@example.com")
+record["otp"] = "000000"
+status(get_otp("verify@example.com")["otp"] == "246810" and get_otp("nobody@example.com") is None)
+
+print("\n📝 A used code is deleted and no longer verifies")
+delete_otp("verify@example.com")
+status(not verify_otp("verify@example.com", "246810") and "verify@example.com" not in load_otps())
+
+print("\n" + "=" * 80)
+print("SUMMARY")
+print("=" * 80)
+
+for name in os.listdir(work_dir):
+    os.remove(os.path.join(work_dir, name))
+os.rmdir(work_dir)
+
+print(f"\n📊 {results.count(True)} of {len(results)} checks passed")
+print("   ✅ Expired codes cleaned up")
+print("   ✅ Replaced codes kept")
+print("   ✅ Code verification")
+
+print("\n" + "=" * 80)
+sys.exit(0 if all(results) else 1)
@@ -0,0 +1,111 @@
+"""
+Streaming ZIP Verification Test Suite
+=====================================
+Tests the ZIP archive streamed by the multi-file download, decrypted straight from the store
+"""
+
+import io
+import os
+import sys
+import tempfile
+import zipfile
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+import storage
+from app import stream_zip, zip_compression_for
+
+print("=" * 80)
+print("        STREAMING ZIP VERIFICATION TEST SUITE")
+print("=" * 80)
+
+results = []
+
+
+def status(ok):
+    results.append(ok)
+    print(f"   Status: {'PASS ✅' if ok else 'FAIL ❌'}")
+
+
+# Work on a scratch file store, never the real one
+work_dir = tempfile.mkdtemp(prefix="test_stream_zip.")
+storage.LOCAL_STORE = work_dir
+
+files = {
+    "notes.txt": b"hello zip\n" * 2000,
+    "photo.PNG": os.urandom(10000),
+    "empty.log": b"",
+    "README": b"no extension",
+    "legacy.txt": b"stored before AES-GCM",
+}
+entries = []
+for name, data in files.items():
+    stored_name = "stored_" + name
+    with open(os.path.join(work_dir, stored_name), "wb") as f:
+        if name == "legacy.txt":
+            f.write(storage.fernet.encrypt(data))
+        else:
+            # Small chunks so multi-chunk entries stay tiny
+            storage._encrypt_stream(io.BytesIO(data), f, chunk_size=4096)
+    entries.append((stored_name, name))
+
+print("\n" + "=" * 80)
+print("TEST 1: ARCHIVE - Streamed Output Is a Valid ZIP")
+print("=" * 80)
+
+chunks = list(stream_zip(entries))
+archive = zipfile.ZipFile(io.BytesIO(b"".join(chunks)))
+contents = {info.filename: archive.read(info) for info in archive.infolist()}
+
+print(f"\n   Chunks yielded: {len(chunks)}")
+print(f"   Entries: {sorted(contents)}")
+print(f"   CRC check: {'✓' if archive.testzip() is None else '✗'}")
+status(contents == files and archive.testzip() is None)
+
+print("\n📝 Output comes out while entries are written, not all at the end")
+status(len([c for c in chunks if c]) > len(files))
+
+print("\n" + "=" * 80)
+print("TEST 2: COMPRESSION - Chosen per Entry by Extension")
+print("=" * 80)
+
+types = {info.filename: info.compress_type for info in archive.infolist()}
+expected = {
+    "notes.txt": zipfile.ZIP_DEFLATED,
+    "photo.PNG": zipfile.ZIP_STORED,
+    "empty.log": zipfile.ZIP_DEFLATED,
+    "README": zipfile.ZIP_DEFLATED,
+    "legacy.txt": zipfile.ZIP_DEFLATED,
+}
+print(f"\n   Stored (already compressed): {[n for n, t in types.items() if t == zipfile.ZIP_STORED]}")
+status(types == expected and all(zip_compression_for(n) == t for n, t in expected.items()))
+
+print("\n📝 Explicit compression applies to every entry")
+forced = zipfile.ZipFile(io.BytesIO(b"".join(stream_zip(entries, compression=zipfile.ZIP_STORED))))
+status(all(info.compress_type == zipfile.ZIP_STORED for info in forced.infolist())
+       and {info.filename: forced.read(info) for info in forced.infolist()} == files)
+
+print("\n" + "=" * 80)
+print("TEST 3: EMPTY - No Entries")
+print("=" * 80)
+
+empty = zipfile.ZipFile(io.BytesIO(b"".join(stream_zip([]))))
+print(f"\n   Entries: {len(empty.infolist())}")
+status(empty.infolist() == [])
+
+print("\n" + "=" * 80)
+print("SUMMARY")
+print("=" * 80)
+
+for name in os.listdir(work_dir):
+    os.remove(os.path.join(work_dir, name))
+os.rmdir(work_dir)
+
+print(f"\n📊 {results.count(True)} of {len(results)} checks passed")
+print("   ✅ Valid streamed archive (AES-GCM and Fernet files)")
+print("   ✅ Per-entry compression")
+print("   ✅ Empty archive")
+
+print("\n" + "=" * 80)
+sys.exit(0 if all(results) else 1)
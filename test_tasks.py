@@ -0,0 +1,122 @@
+"""
+Background Task Queue Verification Test Suite
+=============================================
+Tests ordering, retries and isolation of the in-process task queues
+"""
+
+import os
+import sys
+import threading
+import time
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+import tasks
+
+print("=" * 80)
+print("        BACKGROUND TASK QUEUE VERIFICATION TEST SUITE")
+print("=" * 80)
+
+results = []
+
+
+def status(ok):
+    results.append(ok)
+    print(f"   Status: {'PASS ✅' if ok else 'FAIL ❌'}")
+
+
+print("\n" + "=" * 80)
+print("TEST 1: ORDERING - One Task at a Time, in Submission Order")
+print("=" * 80)
+
+order = []
+running = []
+overlap = []
+
+
+def record(n):
+    running.append(n)
+    if len(running) > 1:
+        overlap.append(n)
+    time.sleep(0.001)
+    order.append(n)
+    running.remove(n)
+
+
+start = time.perf_counter()
+for n in range(50):
+    tasks.enqueue("test-order", record, n)
+queued_in = time.perf_counter() - start
+tasks.wait("test-order")
+
+print(f"\n   Enqueued 50 tasks in {queued_in * 1000:.1f} ms")
+print(f"   Ran in order: {'✓' if order == list(range(50)) else '✗'}")
+print(f"   Overlapping tasks: {len(overlap)}")
+status(order == list(range(50)) and not overlap)
+
+print("\n" + "=" * 80)
+print("TEST 2: RETRIES - Opted-in Exceptions Only")
+print("=" * 80)
+
+attempts = {"flaky": 0, "fatal": 0, "hopeless": 0}
+
+
+def flaky():
+    attempts["flaky"] += 1
+    if attempts["flaky"] < 3:
+        raise ConnectionError("temporary")
+
+
+def fatal():
+    attempts["fatal"] += 1
+    raise ValueError("not retried")
+
+
+def hopeless():
+    attempts["hopeless"] += 1
+    raise ConnectionError("always")
+
+
+tasks.enqueue("test-retry", flaky, retry_on=(ConnectionError,), max_retries=5, backoff=0.01)
+tasks.enqueue("test-retry", fatal, retry_on=(ConnectionError,), max_retries=5, backoff=0.01)
+tasks.enqueue("test-retry", hopeless, retry_on=(ConnectionError,), max_retries=2, backoff=0.01)
+tasks.wait("test-retry")
+
+print(f"\n📝 Succeeds on 3rd attempt: {attempts['flaky']} attempts")
+status(attempts["flaky"] == 3)
+print(f"\n📝 Other exception types are not retried: {attempts['fatal']} attempt")
+status(attempts["fatal"] == 1)
+print(f"\n📝 Gives up after max_retries: {attempts['hopeless']} attempts")
+status(attempts["hopeless"] == 3)
+
+print("\n" + "=" * 80)
+print("TEST 3: ISOLATION - A Slow Queue Does Not Block Another")
+print("=" * 80)
+
+release = threading.Event()
+done = threading.Event()
+tasks.enqueue("test-slow", release.wait, 5)
+tasks.enqueue("test-fast", done.set)
+finished = done.wait(2)
+release.set()
+tasks.wait("test-slow")
+
+print(f"\n   Fast queue ran while slow queue was busy: {'✓' if finished else '✗'}")
+status(finished)
+
+print("\n📝 Waiting on a queue that was never used returns immediately")
+tasks.wait("test-unused")
+status(True)
+
+print("\n" + "=" * 80)
+print("SUMMARY")
+print("=" * 80)
+
+print(f"\n📊 {results.count(True)} of {len(results)} checks passed")
+print("   ✅ Ordered, serial execution")
+print("   ✅ Retries with backoff")
+print("   ✅ Independent queues")
+
+print("\n" + "=" * 80)
+sys.exit(0 if all(results) else 1)